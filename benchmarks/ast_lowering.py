@@ -0,0 +1,86 @@
+"""Node count and memory of the concrete syntax tree against the lowered AST.
+
+Without files, programs from benchmarks.generator are measured. Memory is
+what each tree keeps alive (tokens, shared by both, are not counted).
+
+Usage: python -m benchmarks.ast_lowering [ARQUIVO.mc ...] [--statements 1000 10000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.abstract_tree import iter_nodes, lower
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.token import TokenStream
+
+
+def _count_concrete(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def _retained(function):
+    # Bytes still allocated once *function* returns, and its result.
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def measure(name: str, scanner) -> None:
+    tokens = []
+    token = scanner.next_token()
+    while token is not None:
+        tokens.append(token)
+        token = scanner.next_token()
+
+    def parse():
+        parser = Parser(TokenStream(tokens))
+        if parser.parse():
+            raise SystemExit(f"{name}: {parser.errors[0]}")
+        return parser.root
+
+    concrete_bytes, root = _retained(parse)
+    ast_bytes, program = _retained(lambda: lower(root))
+    start = time.perf_counter()
+    lower(root)
+    seconds = time.perf_counter() - start
+    concrete = _count_concrete(root)
+    abstract = sum(1 for _ in iter_nodes(program))
+    print(
+        f"{name:<24} {concrete:>9} {abstract:>9} {concrete / abstract:>6.1f}x "
+        f"{concrete_bytes / 2**20:>9.1f} {ast_bytes / 2**20:>8.1f} {seconds:>9.3f}"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filenames", nargs="*")
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[1000, 10000])
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    print(f"{'programa':<24} {'nós CST':>9} {'nós AST':>9} {'razão':>7} {'CST MB':>9} {'AST MB':>8} {'lowering s':>9}")
+    if args.filenames:
+        for filename in args.filenames:
+            measure(filename, Scanner(filename))
+    else:
+        for statements in args.statements:
+            shape = ProgramShape(20, statements, seed=args.seed)
+            measure(f"gerado ({statements} comandos)", Scanner.from_source(generate(shape)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Cost of one statement dispatch: ``_check`` chain vs. FIRST-set table.
+
+Usage: python -m benchmarks.dispatch [--number 200000]
+"""
+
+import argparse
+import timeit
+
+from lexical.grammar import token_kind
+from lexical.parser import Parser
+from lexical.token import Token, TokenType
+
+STATEMENT_STARTS = {
+    "atribuicao": Token(TokenType.IDENTIFIER, "x"),
+    "leitura": Token(TokenType.RESERVED, "input"),
+    "escrita": Token(TokenType.RESERVED, "print"),
+    "condicional": Token(TokenType.RESERVED, "if"),
+    "repeticao": Token(TokenType.RESERVED, "while"),
+    "bloco": Token(TokenType.LBRACE, "{"),
+    "(inválido)": Token(TokenType.RESERVED, "then"),
+}
+
+
+class _Probe(Parser):
+    """A Parser positioned on a fixed token, without a scanner."""
+
+    def __init__(self, token):
+        self.current = token
+        self.kind = token_kind(token)
+
+    def chain_dispatch(self):
+        # The if/elif chain comando used before the FIRST-set table.
+        if self._check(TokenType.IDENTIFIER):
+            return "atribuicao"
+        elif self._check_kw("input"):
+            return "leitura"
+        elif self._check_kw("print"):
+            return "escrita"
+        elif self._check_kw("if"):
+            return "condicional"
+        elif self._check_kw("while"):
+            return "repeticao"
+        elif self._check(TokenType.LBRACE):
+            return "bloco"
+        return None
+
+    def table_dispatch(self):
+        return self._COMANDO_RULES.get(self.kind)
+
+    def kind_and_table_dispatch(self):
+        # Includes the per-token kind computation done in _advance.
+        return self._COMANDO_RULES.get(token_kind(self.current))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--number", type=int, default=200_000)
+    args = arg_parser.parse_args()
+
+    print(f"{'comando':<12} {'cadeia ns':>10} {'tabela ns':>10} {'kind+tabela ns':>15}")
+    for name, token in STATEMENT_STARTS.items():
+        probe = _Probe(token)
+        timings = [
+            min(timeit.repeat(method, number=args.number, repeat=3)) / args.number * 1e9
+            for method in (probe.chain_dispatch, probe.table_dispatch, probe.kind_and_table_dispatch)
+        ]
+        print(f"{name:<12} {timings[0]:>10.1f} {timings[1]:>10.1f} {timings[2]:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
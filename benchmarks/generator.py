@@ -0,0 +1,168 @@
+"""Seeded generator of synthetic .mc programs.
+
+Usage: python -m benchmarks.generator [--statements 1000] [--depth 3] [--seed 0] > programa.mc
+"""
+
+import argparse
+import random
+import sys
+from dataclasses import asdict, dataclass
+from typing import List
+
+_ARITH_OPERATORS = ("+", "-", "*", "/")
+_REL_OPERATORS = (">", "<", ">=", "<=", "==", "!=")
+
+
+@dataclass(frozen=True)
+class ProgramShape:
+    """Size and style of a generated program.
+
+    *statements* counts top-level statements; compound ones (if, while,
+    blocks) nest up to *depth* levels and hold one to three statements
+    each. *expression_depth* bounds the nesting of arithmetic expressions.
+    Each simple statement gets a syntax error with probability
+    *error_rate*. Equal shapes generate equal programs.
+    """
+
+    declarations: int = 10
+    statements: int = 100
+    depth: int = 3
+    expression_depth: int = 2
+    error_rate: float = 0.0
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Generator:
+    def __init__(self, shape: ProgramShape):
+        self.shape = shape
+        self.random = random.Random(shape.seed)
+        self.names = [f"v{index}" for index in range(max(1, shape.declarations))]
+        self.lines: List[str] = []
+
+    def program(self) -> str:
+        lines = self.lines
+        lines.append("main {")
+        lines.append("var {")
+        for index, name in enumerate(self.names):
+            lines.append(f"{name}: {'real' if index % 3 == 2 else 'int'};")
+        lines.append("}")
+        for _ in range(self.shape.statements):
+            self.statement(self.shape.depth, 0)
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def name(self) -> str:
+        return self.random.choice(self.names)
+
+    def factor(self, depth: int) -> str:
+        roll = self.random.random()
+        if depth > 0 and roll < 0.2:
+            return f"({self.expression(depth - 1)})"
+        if roll < 0.45:
+            return str(self.random.randint(0, 999))
+        if roll < 0.55:
+            return f"{self.random.randint(0, 99)}.{self.random.randint(0, 99)}"
+        if roll < 0.6:
+            return self.name() + self.random.choice(("++", "--"))
+        return self.name()
+
+    def expression(self, depth: int) -> str:
+        parts = [self.factor(depth)]
+        for _ in range(self.random.randint(0, depth + 1)):
+            parts.append(self.random.choice(_ARITH_OPERATORS))
+            parts.append(self.factor(depth))
+        return " ".join(parts)
+
+    def condition(self, depth: int) -> str:
+        # A '(' at the start of a relational term opens a relational
+        # expression, so the left operand never starts with one.
+        left = self.name()
+        if self.random.random() < 0.5:
+            left += f" {self.random.choice(_ARITH_OPERATORS)} {self.expression(depth)}"
+        term = f"{left} {self.random.choice(_REL_OPERATORS)} {self.expression(depth)}"
+        roll = self.random.random()
+        if roll < 0.1:
+            return f"NAO {term}"
+        if roll < 0.2:
+            return f"({term}) {self.random.choice(('E', 'OU'))} {self.condition(max(depth - 1, 0))}"
+        return term
+
+    def statement(self, depth: int, indent: int) -> None:
+        pad = "  " * indent
+        roll = self.random.random()
+        if depth > 0 and roll < 0.25:
+            kind = self.random.choice(("if", "while", "block"))
+            count = self.random.randint(1, 3)
+            if kind == "block":
+                self.lines.append(pad + "{")
+                for _ in range(count):
+                    self.statement(depth - 1, indent + 1)
+                self.lines.append(pad + "}")
+                return
+            condition = self.condition(self.shape.expression_depth)
+            if kind == "if":
+                self.lines.append(f"{pad}if {condition} then")
+                self.statement(depth - 1, indent + 1)
+                if self.random.random() < 0.4:
+                    self.lines.append(pad + "else")
+                    self.statement(depth - 1, indent + 1)
+            else:
+                self.lines.append(f"{pad}while {condition}")
+                self.statement(depth - 1, indent + 1)
+            return
+        if roll < 0.75:
+            line = f"{self.name()} <- {self.expression(self.shape.expression_depth)};"
+        elif roll < 0.85:
+            line = f"input({self.name()});"
+        elif self.random.random() < 0.5:
+            line = f"print({self.name()});"
+        else:
+            line = f'print("valor {self.random.randint(0, 999)}");'
+        if self.random.random() < self.shape.error_rate:
+            line = self.corrupt(line)
+        self.lines.append(pad + line)
+
+    def corrupt(self, line: str) -> str:
+        # Each corruption is a local error the parser recovers from at the
+        # end of the statement, so the rest of the program is still parsed.
+        roll = self.random.random()
+        if roll < 0.3 and "<-" in line:
+            return line.replace("<-", "=", 1)
+        if roll < 0.5 and "(" in line:
+            return line.replace(")", "", 1)
+        if roll < 0.75:
+            return line[:-1] + " + ;"
+        return line[:-1] + " * * 1;"
+
+
+def generate(shape: ProgramShape) -> str:
+    """The source of a program of the given *shape*."""
+
+    return _Generator(shape).program()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--declarations", type=int, default=10)
+    arg_parser.add_argument("--statements", type=int, default=100)
+    arg_parser.add_argument("--depth", type=int, default=3)
+    arg_parser.add_argument("--expression-depth", type=int, default=2)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+    shape = ProgramShape(
+        args.declarations,
+        args.statements,
+        args.depth,
+        args.expression_depth,
+        args.error_rate,
+        args.seed,
+    )
+    sys.stdout.write(generate(shape))
+
+
+if __name__ == "__main__":
+    main()
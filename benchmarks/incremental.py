@@ -0,0 +1,65 @@
+"""Latency of incremental re-parsing against a full parse after each edit.
+
+Each edit renames one occurrence of an identifier or inserts a statement at
+a random line; the result is checked against a full parse of the new source.
+
+Usage: python -m benchmarks.incremental ARQUIVO.mc [--edits 20] [--seed 0]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from lexical.incremental import IncrementalDocument, TextEdit
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.token import TokenBuffer, TokenStream
+
+_IDENTIFIER = re.compile(rb"\b(?!main\b|var\b|int\b|real\b|if\b|then\b|else\b|while\b|print\b|input\b)[a-z]\w*\b")
+
+
+def random_edit(rnd: random.Random, source: bytes) -> TextEdit:
+    if rnd.random() < 0.5:
+        matches = list(_IDENTIFIER.finditer(source, rnd.randrange(len(source))))[:1]
+        if matches:
+            match = matches[0]
+            return TextEdit(match.start(), match.end() - match.start(), match.group().decode() + "2")
+    line = source.rfind(b"\n", 0, rnd.randrange(len(source))) + 1
+    return TextEdit(line, 0, "x <- x + 1;\n")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filename")
+    arg_parser.add_argument("--edits", type=int, default=20)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    document = IncrementalDocument.from_file(args.filename)
+    print(f"{len(document.tokens)} tokens, análise completa em {time.perf_counter() - start:.2f} s")
+    rnd = random.Random(args.seed)
+    latencies = []
+    full = []
+    for _ in range(args.edits):
+        edit = random_edit(rnd, document.source)
+        start = time.perf_counter()
+        errors = document.apply(edit)
+        latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tokens = list(TokenBuffer.from_scanner(Scanner.from_source(document.source)))
+        parser = Parser(TokenStream(tokens))
+        expected = parser.parse()
+        full.append(time.perf_counter() - start)
+        if expected != errors or len(tokens) != len(document.tokens):
+            raise SystemExit(f"resultado incremental difere da análise completa após {edit}")
+    print(f"{'':<12} {'mediana ms':>10} {'máximo ms':>10}")
+    for name, times in (("incremental", latencies), ("completa", full)):
+        print(f"{name:<12} {statistics.median(times) * 1000:>10.1f} {max(times) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Throughput of ``parallel_tokenize`` per worker count.
+
+Usage: python -m benchmarks.parallel_lex ARQUIVO.mc [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import time
+
+from lexical.parallel import parallel_tokenize
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filename")
+    arg_parser.add_argument("--workers", default="1,2,4,8")
+    arg_parser.add_argument("--engine", default="regex")
+    args = arg_parser.parse_args()
+
+    size_mb = os.path.getsize(args.filename) / (1 << 20)
+    baseline = None
+    print(f"{'workers':>7} {'tokens':>10} {'seconds':>8} {'MB/s':>8} {'speedup':>7}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        start = time.perf_counter()
+        tokens = parallel_tokenize(args.filename, workers, engine=args.engine)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>7} {len(tokens):>10} {elapsed:>8.2f} {size_mb / elapsed:>8.1f} {baseline / elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
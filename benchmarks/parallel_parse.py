@@ -0,0 +1,69 @@
+"""Wall-clock time of ``parallel_parse`` per worker count on one large program.
+
+Without a file, a program from benchmarks.generator is written to a
+temporary file. The sequential row is a plain Parser over the same lexer;
+every run must find the same errors and build a tree of the same size.
+
+Usage: python -m benchmarks.parallel_parse [ARQUIVO.mc] [--statements 100000] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.parallel import parallel_parse
+from lexical.parser import Parser
+from lexical.scanner import ENGINES
+
+
+def _count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filename", nargs="?")
+    arg_parser.add_argument("--statements", type=int, default=100000)
+    arg_parser.add_argument("--workers", default="1,2,4,8")
+    arg_parser.add_argument("--engine", default="regex")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    path = args.filename
+    if path is None:
+        with tempfile.NamedTemporaryFile("w", suffix=".mc", delete=False, encoding="utf-8") as source_file:
+            source_file.write(generate(ProgramShape(20, args.statements, seed=args.seed)))
+        path = source_file.name
+    try:
+        size_mb = os.path.getsize(path) / (1 << 20)
+        start = time.perf_counter()
+        parser = Parser(ENGINES[args.engine](path))
+        parser.parse()
+        baseline = time.perf_counter() - start
+        expected = (parser.errors, _count_nodes(parser.root) if parser.root is not None else 0)
+        print(f"{size_mb:.1f} MB, {os.cpu_count()} núcleos")
+        print(f"{'workers':>10} {'seconds':>8} {'MB/s':>8} {'speedup':>7}")
+        print(f"{'sequencial':>10} {baseline:>8.2f} {size_mb / baseline:>8.1f} {1:>7.2f}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            start = time.perf_counter()
+            parser = parallel_parse(path, workers, engine=args.engine)
+            elapsed = time.perf_counter() - start
+            result = (parser.errors, _count_nodes(parser.root) if parser.root is not None else 0)
+            if result != expected:
+                raise SystemExit(f"{workers} workers: resultado difere do parser sequencial")
+            print(f"{workers:>10} {elapsed:>8.2f} {size_mb / elapsed:>8.1f} {baseline / elapsed:>7.2f}")
+    finally:
+        if args.filename is None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
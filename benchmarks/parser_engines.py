@@ -0,0 +1,44 @@
+"""Parse time of the recursive-descent and LL(1) parser engines.
+
+Tokens are lexed once up front, so only parsing is timed.
+
+Usage: python -m benchmarks.parser_engines ARQUIVO.mc [--repeat 3]
+"""
+
+import argparse
+import time
+
+from lexical.events import NullSink
+from lexical.ll1 import PARSER_ENGINES
+from lexical.scanner import Scanner
+from lexical.token import TokenBuffer, TokenStream
+
+MODES = {
+    "árvore": {},
+    "árvore+eventos": {"sink": NullSink()},
+    "só validação": {"build_tree": False},
+}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filename")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    tokens = list(TokenBuffer.from_scanner(Scanner(args.filename)))
+    print(f"{len(tokens)} tokens")
+    print(f"{'modo':<16} {'motor':<10} {'segundos':>8} {'tokens/s':>10}")
+    for mode, options in MODES.items():
+        for name, engine in PARSER_ENGINES.items():
+            best = float("inf")
+            for _ in range(args.repeat):
+                parser = engine(TokenStream(tokens), **options)
+                start = time.perf_counter()
+                parser.parse()
+                best = min(best, time.perf_counter() - start)
+            print(f"{mode:<16} {name:<10} {best:>8.2f} {len(tokens) / best:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Indexed tree queries against recursive walks of the whole tree.
+
+A generated program is parsed once and indexed once. Each query is then
+answered by a recursive walk, by TreeIndex.select on a fresh index cache
+(indexes only) and again with the cache warm; all must return the same
+nodes.
+
+Usage: python -m benchmarks.query [--statements 20000] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.parser import Parser
+from lexical.query import TreeIndex
+from lexical.scanner import Scanner
+
+
+def _collect(node, found: list, predicate) -> list:
+    if predicate(node):
+        found.append(node)
+    for child in node.children:
+        _collect(child, found, predicate)
+    return found
+
+
+def _contains(node, label: str) -> bool:
+    return any(child.label == label or _contains(child, label) for child in node.children)
+
+
+def _inside(node, found: list, outer: str, label: str, inside: bool = False) -> list:
+    if inside and node.label == label:
+        found.append(node)
+    inside = inside or node.label == outer
+    for child in node.children:
+        _inside(child, found, outer, label, inside)
+    return found
+
+
+# name -> (selector, the same query as a recursive walk)
+QUERIES = {
+    "atribuições a v0": (
+        "atribuicao:has(> IDENTIFIER[value=v0])",
+        lambda root: _collect(
+            root, [], lambda node: node.label == "atribuicao" and node.children[0].token.value == "v0"
+        ),
+    ),
+    "while com input": (
+        "repeticao:has(leitura)",
+        lambda root: _collect(root, [], lambda node: node.label == "repeticao" and _contains(node, "leitura")),
+    ),
+    "print em if": (
+        "condicional escrita",
+        lambda root: _inside(root, [], "condicional", "escrita"),
+    ),
+}
+
+
+def _best(function, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    parser = Parser(Scanner.from_source(generate(ProgramShape(20, args.statements, seed=args.seed))))
+    if parser.parse():
+        raise SystemExit(parser.errors[0])
+    root = parser.root
+    start = time.perf_counter()
+    index = TreeIndex(root)
+    print(f"{len(index)} nós, índice em {time.perf_counter() - start:.3f} s")
+    print(f"{'consulta':<18} {'nós':>6} {'recursiva s':>11} {'índice s':>9} {'cache s':>9} {'ganho':>7}")
+    for name, (selector, walk) in QUERIES.items():
+        walk_seconds, expected = _best(lambda: walk(root), args.repeat)
+
+        def uncached():
+            index._results.clear()
+            return index.select(selector)
+
+        index_seconds, result = _best(uncached, args.repeat)
+        cached_seconds, _ = _best(lambda: index.select(selector), args.repeat)
+        if [id(node) for node in result] != [id(node) for node in expected]:
+            raise SystemExit(f"{name}: resultados diferem")
+        print(
+            f"{name:<18} {len(result):>6} {walk_seconds:>11.4f} {index_seconds:>9.4f} "
+            f"{cached_seconds:>9.6f} {walk_seconds / index_seconds:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
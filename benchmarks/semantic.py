@@ -0,0 +1,61 @@
+"""Overhead of semantic checking (SemanticParser) over parsing alone.
+
+Tokens are lexed once up front, so only parsing is timed. Without a file,
+a generated program (see benchmarks.generator) is used.
+
+Usage: python -m benchmarks.semantic [ARQUIVO.mc] [--statements 10000] [--repeat 3]
+"""
+
+import argparse
+import time
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.semantic import SemanticParser
+from lexical.token import TokenBuffer, TokenStream
+
+MODES = {
+    "árvore": {},
+    "só validação": {"build_tree": False},
+}
+
+
+def _best(engine, tokens, options, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        parser = engine(TokenStream(tokens), **options)
+        start = time.perf_counter()
+        parser.parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("filename", nargs="?")
+    arg_parser.add_argument("--statements", type=int, default=10000)
+    arg_parser.add_argument("--declarations", type=int, default=20)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    if args.filename:
+        scanner = Scanner(args.filename)
+    else:
+        shape = ProgramShape(args.declarations, args.statements, seed=args.seed)
+        scanner = Scanner.from_source(generate(shape))
+    tokens = list(TokenBuffer.from_scanner(scanner))
+    semantic = SemanticParser(TokenStream(tokens), build_tree=False)
+    syntax_errors = len(Parser(TokenStream(tokens), build_tree=False).parse())
+    semantic_errors = len(semantic.parse()) - syntax_errors
+    print(f"{len(tokens)} tokens, {syntax_errors} erros sintáticos, {semantic_errors} erros semânticos")
+    print(f"{'modo':<14} {'só parser s':>11} {'semântica s':>11} {'custo':>7}")
+    for mode, options in MODES.items():
+        plain = _best(Parser, tokens, options, args.repeat)
+        checked = _best(SemanticParser, tokens, options, args.repeat)
+        print(f"{mode:<14} {plain:>11.3f} {checked:>11.3f} {checked / plain - 1:>+7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Time to first error and peak memory: push parsing against buffering the whole source.
+
+A generated program gets one syntax error at --error-at (a fraction of its
+statements) and is delivered in --chunk-size pieces. Buffering waits for
+every chunk, then lexes and parses with the LL(1) engine; PushParser
+handles each chunk as it comes. Both run without building a tree.
+
+Usage: python -m benchmarks.stream [--statements 50000] [--error-at 0.05] [--chunk-size 65536]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.ll1 import LL1Parser
+from lexical.scanner import RegexScanner
+from lexical.stream import DEFAULT_CHUNK_SIZE, PushParser
+
+
+def _chunks(source: bytes, size: int) -> list:
+    return [source[pos:pos + size] for pos in range(0, len(source), size)]
+
+
+def buffered(chunks: list):
+    start = time.perf_counter()
+    source = b"".join(chunks)
+    parser = LL1Parser(RegexScanner.from_source(source), build_tree=False)
+    errors = parser.parse()
+    # Errors only reach the caller once parse() returns.
+    seconds = time.perf_counter() - start
+    return seconds, seconds, errors
+
+
+def pushed(chunks: list):
+    start = time.perf_counter()
+    first = None
+    parser = PushParser()
+    for chunk in chunks:
+        if parser.feed(chunk) and first is None:
+            first = time.perf_counter() - start
+    parser.close()
+    total = time.perf_counter() - start
+    return first if first is not None else total, total, parser.errors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=50000)
+    arg_parser.add_argument("--error-at", type=float, default=0.05)
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    lines = generate(ProgramShape(20, args.statements, seed=args.seed)).split("\n")
+    # Right after the var section's closing brace, plus the requested share
+    # of the rest.
+    body = lines.index("}") + 1
+    at = body + int((len(lines) - body) * args.error_at)
+    lines.insert(at, "v0 <- ;")
+    source = "\n".join(lines).encode("utf-8")
+    chunks = _chunks(source, args.chunk_size)
+    print(f"{len(source) / 2**20:.1f} MB em {len(chunks)} blocos, erro na linha {at + 1}")
+    print(f"{'modo':<10} {'1º erro s':>9} {'total s':>8} {'pico MB':>8}")
+    results = {}
+    for name, run in (("buffer", buffered), ("push", pushed)):
+        first, total, errors = run(chunks)
+        tracemalloc.start()
+        run(chunks)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = errors
+        print(f"{name:<10} {first:>9.3f} {total:>8.3f} {peak / 2**20:>8.1f}")
+    if results["buffer"] != results["push"]:
+        raise SystemExit("os erros diferem entre os modos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Lexer, parser, DOT export and memory benchmarks over a grid of generated programs.
+
+Every case is a generated program (see benchmarks.generator); the grid is
+the product of --statements, --depths and --error-rates. Results are
+written as JSON; with --baseline, cases slower or bigger than the stored
+run by more than --threshold are flagged and the exit status is 1.
+
+Usage: python -m benchmarks.suite [--statements 1000 10000] [--output resultados.json]
+                                  [--baseline base.json] [--threshold 0.1]
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.parser import Parser
+from lexical.scanner import ENGINES
+from lexical.syntax_tree import syntax_tree_to_dot
+from lexical.token import TokenStream
+
+# metric -> True when higher is better.
+METRICS = {
+    "lex_tokens_per_second": True,
+    "parse_nodes_per_second": True,
+    "dot_seconds": False,
+    "peak_bytes": False,
+}
+
+
+def _lex(engine, source: bytes) -> list:
+    scanner = engine.from_source(source)
+    tokens = []
+    token = scanner.next_token()
+    while token is not None:
+        tokens.append(token)
+        token = scanner.next_token()
+    return tokens
+
+
+def _count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def _best(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(shape: ProgramShape, repeat: int) -> dict:
+    """Measure one generated program; times are the best of *repeat* runs."""
+
+    source = generate(shape).encode("utf-8")
+    case = {"shape": shape.to_dict(), "bytes": len(source)}
+    lex_rates = {}
+    for name, engine in ENGINES.items():
+        tokens = _lex(engine, source)
+        lex_rates[name] = len(tokens) / _best(lambda: _lex(engine, source), repeat)
+    case["tokens"] = len(tokens)
+    case["lex_tokens_per_second"] = lex_rates
+
+    parser = Parser(TokenStream(tokens))
+    case["errors"] = len(parser.parse())
+    root = parser.root
+    case["nodes"] = _count_nodes(root) if root is not None else 0
+    parse_seconds = _best(lambda: Parser(TokenStream(tokens)).parse(), repeat)
+    case["parse_nodes_per_second"] = case["nodes"] / parse_seconds if case["nodes"] else None
+    case["parse_tokens_per_second"] = len(tokens) / parse_seconds
+    case["dot_seconds"] = _best(lambda: syntax_tree_to_dot(root), repeat) if root is not None else None
+
+    # Peak of a full lex + parse with the default engines, measured apart
+    # because tracemalloc slows everything down.
+    del tokens, parser, root
+    gc.collect()
+    tracemalloc.start()
+    Parser(ENGINES["classic"].from_source(source)).parse()
+    case["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return case
+
+
+def _case_key(case: dict) -> str:
+    return json.dumps(case["shape"], sort_keys=True)
+
+
+def _values(case: dict, metric: str) -> dict:
+    value = case.get(metric)
+    if isinstance(value, dict):
+        return value
+    return {"": value}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of *results* against *baseline* beyond *threshold* (a fraction)."""
+
+    previous = {_case_key(case): case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        old = previous.get(_case_key(case))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old_values = _values(old, metric)
+            for variant, value in _values(case, metric).items():
+                before = old_values.get(variant)
+                if not value or not before:
+                    continue
+                change = value / before - 1
+                worse = -change if higher_is_better else change
+                if worse > threshold:
+                    regressions.append({
+                        "shape": case["shape"],
+                        "metric": f"{metric}[{variant}]" if variant else metric,
+                        "baseline": before,
+                        "current": value,
+                        "change": change,
+                    })
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, nargs="+", default=[1000, 10000])
+    arg_parser.add_argument("--depths", type=int, nargs="+", default=[3])
+    arg_parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0])
+    arg_parser.add_argument("--declarations", type=int, default=20)
+    arg_parser.add_argument("--expression-depth", type=int, default=2)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", help="arquivo JSON dos resultados (padrão: saída padrão)")
+    arg_parser.add_argument("--baseline", help="resultados anteriores para comparar")
+    arg_parser.add_argument("--threshold", type=float, default=0.10, help="piora tolerada (padrão: 0.10)")
+    args = arg_parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "cases": [],
+    }
+    grid = itertools.product(args.statements, args.depths, args.error_rates)
+    print(f"{'comandos':>9} {'prof.':>5} {'erros':>5} {'tokens':>9} {'léxico tok/s':>13} "
+          f"{'parser nós/s':>13} {'DOT s':>7} {'pico MB':>8}", file=sys.stderr)
+    for statements, depth, error_rate in grid:
+        shape = ProgramShape(args.declarations, statements, depth, args.expression_depth, error_rate, args.seed)
+        case = run_case(shape, args.repeat)
+        results["cases"].append(case)
+        dot = "-" if case["dot_seconds"] is None else f"{case['dot_seconds']:.3f}"
+        nodes = "-" if case["parse_nodes_per_second"] is None else f"{case['parse_nodes_per_second']:.0f}"
+        print(
+            f"{statements:>9} {depth:>5} {error_rate:>5.2f} {case['tokens']:>9} "
+            f"{case['lex_tokens_per_second']['classic']:>13.0f} {nodes:>13} {dot:>7} "
+            f"{case['peak_bytes'] / 2**20:>8.1f}",
+            file=sys.stderr,
+        )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        results["regressions"] = regressions
+        for regression in regressions:
+            print(
+                f"REGRESSÃO {regression['metric']} em {regression['shape']}: "
+                f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['change']:+.1%})",
+                file=sys.stderr,
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if results.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
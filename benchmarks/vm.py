@@ -0,0 +1,118 @@
+"""Bytecode VM against the tree-walking interpreter on loop-heavy programs.
+
+Each program is parsed once; compiling is timed apart from running. Both
+executors must print the same output and leave the same variables.
+
+Usage: python -m benchmarks.vm [--size 200] [--repeat 3]
+"""
+
+import argparse
+import io
+import time
+
+from lexical.compiler import Bytecode, compile_tree
+from lexical.interpreter import TreeInterpreter
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.vm import execute
+
+# {n} is replaced by --size.
+PROGRAMS = {
+    "soma": """main {
+var { i: int; j: int; soma: int; }
+while i < {n} {
+  j <- 0;
+  while j < {n} {
+    soma <- soma + i * j - (j / 3);
+    j <- j + 1;
+  }
+  i <- i + 1;
+}
+print(soma);
+}
+""",
+    "primos": """main {
+var { n: int; d: int; primo: int; total: int; }
+n <- 2;
+while n < {n} * 20 {
+  d <- 2;
+  primo <- 1;
+  while d * d <= n E primo == 1 {
+    if n - (n / d) * d == 0 then primo <- 0;
+    d <- d + 1;
+  }
+  if primo == 1 then total <- total + 1;
+  n <- n + 1;
+}
+print(total);
+}
+""",
+    "collatz": """main {
+var { inicio: int; x: int; passos: int; maior: int; media: real; }
+inicio <- 1;
+while inicio <= {n} * 5 {
+  x <- inicio;
+  passos <- 0;
+  while x != 1 {
+    if x - (x / 2) * 2 == 0 then x <- x / 2; else x <- 3 * x + 1;
+    passos <- passos + 1;
+  }
+  if passos > maior then maior <- passos;
+  media <- media + passos / ({n} * 5.0);
+  inicio <- inicio + 1;
+}
+print(maior);
+print(media);
+}
+""",
+}
+
+
+def _best(function, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--size", type=int, default=200)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{'programa':<10} {'instr.':>6} {'compilar s':>10} {'carregar s':>10} {'árvore s':>9} {'VM s':>8} {'ganho':>6}")
+    for name, template in PROGRAMS.items():
+        parser = Parser(Scanner.from_source(template.replace("{n}", str(args.size))))
+        errors = parser.parse()
+        if errors:
+            raise SystemExit(f"{name}: {errors[0]}")
+        root = parser.root
+        compile_seconds, (errors, bytecode) = _best(lambda: compile_tree(root), args.repeat)
+        if errors:
+            raise SystemExit(f"{name}: {errors[0]}")
+        data = bytecode.to_bytes()
+        load_seconds, _ = _best(lambda: Bytecode.from_bytes(data), args.repeat)
+
+        def interpret():
+            output = io.StringIO()
+            return TreeInterpreter(root, io.StringIO(), output).run(), output.getvalue()
+
+        def run_vm():
+            output = io.StringIO()
+            return execute(bytecode, io.StringIO(), output), output.getvalue()
+
+        tree_seconds, expected = _best(interpret, args.repeat)
+        vm_seconds, result = _best(run_vm, args.repeat)
+        if result != expected:
+            raise SystemExit(f"{name}: VM {result!r} != árvore {expected!r}")
+        print(
+            f"{name:<10} {len(bytecode.lines):>6} {compile_seconds:>10.4f} {load_seconds:>10.4f} "
+            f"{tree_seconds:>9.3f} {vm_seconds:>8.3f} {tree_seconds / vm_seconds:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+from typing import Iterator, List, Optional
+
+from lexical.token import Token
+
+
+class Node:
+    """Base of the abstract syntax tree.
+
+    Subclasses list their child fields in ``_fields`` (each holding a node,
+    a list of nodes or ``None``) and their other attributes in
+    ``__slots__``. Leaves and statements keep the token they start at, for
+    positions in messages.
+    """
+
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def children(self) -> Iterator["Node"]:
+        for name in self._fields:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                yield from value
+            elif value is not None:
+                yield value
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != "token")
+        return f"{type(self).__name__}({values})"
+
+
+class Program(Node):
+    __slots__ = ("declarations", "body")
+    _fields = ("declarations", "body")
+
+    def __init__(self, declarations: List["Declaration"], body: List[Node]):
+        self.declarations = declarations
+        self.body = body
+
+
+class Declaration(Node):
+    __slots__ = ("name", "type", "token")
+
+    def __init__(self, name: str, type_: str, token: Token):
+        self.name = name
+        self.type = type_
+        self.token = token
+
+
+class Assign(Node):
+    __slots__ = ("target", "value", "token")
+    _fields = ("target", "value")
+
+    def __init__(self, target: "Var", value: Node, token: Token):
+        self.target = target
+        self.value = value
+        self.token = token
+
+
+class Read(Node):
+    __slots__ = ("target", "token")
+    _fields = ("target",)
+
+    def __init__(self, target: "Var", token: Token):
+        self.target = target
+        self.token = token
+
+
+class Print(Node):
+    __slots__ = ("value", "token")
+    _fields = ("value",)
+
+    def __init__(self, value: Node, token: Token):
+        self.value = value
+        self.token = token
+
+
+class If(Node):
+    __slots__ = ("condition", "then", "otherwise", "token")
+    _fields = ("condition", "then", "otherwise")
+
+    def __init__(self, condition: Node, then: Node, otherwise: Optional[Node], token: Token):
+        self.condition = condition
+        self.then = then
+        self.otherwise = otherwise
+        self.token = token
+
+
+class While(Node):
+    __slots__ = ("condition", "body", "token")
+    _fields = ("condition", "body")
+
+    def __init__(self, condition: Node, body: Node, token: Token):
+        self.condition = condition
+        self.body = body
+        self.token = token
+
+
+class Block(Node):
+    __slots__ = ("body", "token")
+    _fields = ("body",)
+
+    def __init__(self, body: List[Node], token: Token):
+        self.body = body
+        self.token = token
+
+
+class BinOp(Node):
+    """Arithmetic ``+ - * /``."""
+
+    __slots__ = ("op", "left", "right")
+    _fields = ("left", "right")
+
+    def __init__(self, op: str, left: Node, right: Node):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Compare(Node):
+    __slots__ = ("op", "left", "right")
+    _fields = ("left", "right")
+
+    def __init__(self, op: str, left: Node, right: Node):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Logic(Node):
+    """``E`` / ``OU`` between two conditions."""
+
+    __slots__ = ("op", "left", "right")
+    _fields = ("left", "right")
+
+    def __init__(self, op: str, left: Node, right: Node):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Not(Node):
+    __slots__ = ("operand",)
+    _fields = ("operand",)
+
+    def __init__(self, operand: Node):
+        self.operand = operand
+
+
+class Var(Node):
+    __slots__ = ("name", "token")
+
+    def __init__(self, name: str, token: Token):
+        self.name = name
+        self.token = token
+
+
+class PostIncrement(Node):
+    """``x++`` (*delta* 1) or ``x--`` (*delta* -1): the old value, then the update."""
+
+    __slots__ = ("target", "delta")
+    _fields = ("target",)
+
+    def __init__(self, target: Var, delta: int):
+        self.target = target
+        self.delta = delta
+
+
+class Num(Node):
+    """An ``int`` or ``real`` literal; *value* is an int or a float."""
+
+    __slots__ = ("value", "token")
+
+    def __init__(self, value, token: Token):
+        self.value = value
+        self.token = token
+
+
+class Str(Node):
+    __slots__ = ("value", "token")
+
+    def __init__(self, value: str, token: Token):
+        self.value = value
+        self.token = token
+
+
+def _left_fold(node_class, children):
+    # operand (op operand)* -> left-associative nodes; one operand passes
+    # through, which is what removes the expressaoAritmetica -> termo ->
+    # fator chains.
+    result = children[0]
+    for index in range(1, len(children), 2):
+        result = node_class(children[index].label, result, children[index + 1])
+    return result
+
+
+def _fator(children):
+    first = children[0]
+    label = first.label
+    if label == "LPAREN":
+        return children[1]
+    token = first.token
+    if label == "NUMINT":
+        return Num(int(token.value), token)
+    if label == "NUMREAL":
+        return Num(float(token.value), token)
+    var = Var(token.value, token)
+    if len(children) > 1:
+        return PostIncrement(var, 1 if children[1].label == "INCREMENT" else -1)
+    return var
+
+
+def _termo_relacional(children):
+    first = children[0]
+    if isinstance(first, Node):
+        return Compare(children[1].token.value, first, children[2])
+    if first.label == "NAO":
+        return Not(children[1])
+    return children[1]
+
+
+def _escrita(children):
+    token = children[2].token
+    value = Str(token.value, token) if children[2].label == "STRING" else Var(token.value, token)
+    return Print(value, children[0].token)
+
+
+# Concrete label -> builder taking the lowered children. Token leaves
+# reach the builders as the concrete nodes themselves.
+_BUILDERS = {
+    "programa": lambda children: children[2],
+    "corpo": lambda children: Program(children[0], children[1]),
+    "secaoDeclaracoes": lambda children: children[2],
+    "listaDeclaracoes": list,
+    "declaracao": lambda children: Declaration(children[0].token.value, children[2], children[0].token),
+    "tipo": lambda children: children[0].token.value,
+    "listaComandos": list,
+    "comando": lambda children: children[0],
+    "atribuicao": lambda children: Assign(Var(children[0].token.value, children[0].token), children[2], children[0].token),
+    "leitura": lambda children: Read(Var(children[2].token.value, children[2].token), children[0].token),
+    "escrita": _escrita,
+    "condicional": lambda children: If(
+        children[1], children[3], children[5] if len(children) > 5 else None, children[0].token
+    ),
+    "repeticao": lambda children: While(children[1], children[2], children[0].token),
+    "bloco": lambda children: Block(children[1], children[0].token),
+    "expressaoAritmetica": lambda children: _left_fold(BinOp, children),
+    "termo": lambda children: _left_fold(BinOp, children),
+    "fator": _fator,
+    "expressaoRelacional": lambda children: _left_fold(Logic, children),
+    "termoRelacional": _termo_relacional,
+}
+
+
+def lower(root) -> Program:
+    """The abstract tree of an error-free concrete tree, built in one iterative pass.
+
+    Raises ``ValueError`` on a tree the parser left incomplete after a
+    syntax error: an inner node without children, a label with no builder,
+    or children of the wrong shape.
+    """
+
+    if root is None:
+        raise ValueError("no concrete tree to lower")
+    builders = _BUILDERS
+    results = []
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        children = node.children
+        if not children:
+            if node.token is None:
+                raise ValueError(f"incomplete '{node.label}' node: the concrete tree has syntax errors")
+            results.append(node)
+            continue
+        if not done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        builder = builders.get(node.label)
+        if builder is None:
+            raise ValueError(f"no abstract node for '{node.label}'")
+        count = len(children)
+        lowered = results[-count:]
+        del results[-count:]
+        try:
+            results.append(builder(lowered))
+        except (AttributeError, IndexError, TypeError) as exc:
+            raise ValueError(f"malformed '{node.label}' node: the concrete tree has syntax errors") from exc
+    if not isinstance(results[0], Program):
+        raise ValueError(f"'{root.label}' does not lower to a program")
+    return results[0]
+
+
+def iter_nodes(root: Node) -> Iterator[Node]:
+    """All nodes under *root*, in pre-order."""
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = list(node.children())
+        children.reverse()
+        stack.extend(children)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Iterable, List, Optional
+
+from lexical.cache import DEFAULT_MAX_BYTES, ParseCache, parse_path
+from lexical.syntax_tree import export_syntax_tree
+
+SOURCE_PATTERN = "*.mc"
+CHUNKS_PER_JOB = 8
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    """How each file of a batch is parsed and where its tree goes."""
+
+    output_dir: str = "saida"
+    lexer: str = "classic"
+    parser: str = "recursive"
+    check: bool = False
+    fmt: str = "dot"
+    collapse_chains: bool = False
+    max_depth: Optional[int] = None
+    cache_dir: Optional[str] = None
+    cache_max_bytes: int = DEFAULT_MAX_BYTES
+
+
+def collect_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories (recursively, ``*.mc``) and globs; keep order, drop repeats."""
+
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, "**", SOURCE_PATTERN), recursive=True))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+        for match in matches:
+            if match not in seen and not os.path.isdir(match):
+                seen.add(match)
+                files.append(match)
+    return files
+
+
+def output_path(path: str, options: BatchOptions) -> str:
+    """Where the tree of *path* is written: its relative path under the output dir."""
+
+    relative = os.path.relpath(path)
+    if relative.startswith(os.pardir):
+        relative = os.path.splitdrive(os.path.abspath(path))[1].lstrip(os.sep)
+    return os.path.join(options.output_dir, os.path.splitext(relative)[0] + f".{options.fmt}")
+
+
+def _count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+_caches = {}
+
+
+def _cache(options: BatchOptions) -> ParseCache:
+    # One cache object per worker process, reused across its files.
+    key = (options.cache_dir, options.cache_max_bytes)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = ParseCache(options.cache_dir, options.cache_max_bytes)
+    return cache
+
+
+def parse_file(path: str, options: BatchOptions) -> dict:
+    """Lex, parse and export one file; never raises, failures go in the result."""
+
+    result = {
+        "file": path,
+        "status": "ok",
+        "errors": [],
+        "tokens": 0,
+        "nodes": 0,
+        "output": None,
+        "lex_seconds": None,
+        "parse_seconds": None,
+        "export_seconds": None,
+    }
+    try:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"arquivo '{path}' não encontrado")
+        build_tree = not options.check
+        if options.cache_dir is None:
+            parsed = parse_path(path, options.lexer, options.parser, build_tree)
+        else:
+            parsed = _cache(options).parse(path, options.lexer, options.parser, build_tree)
+            result["cache"] = "hit" if parsed.cached else "miss"
+        errors = parsed.errors
+        result["tokens"] = parsed.tokens
+        result["lex_seconds"] = parsed.lex_seconds
+        result["parse_seconds"] = parsed.parse_seconds
+        exported = time.perf_counter()
+        if errors:
+            result["status"] = "error"
+            result["errors"] = errors
+        elif parsed.root is not None:
+            result["nodes"] = _count_nodes(parsed.root)
+            output = output_path(path, options)
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            export_syntax_tree(
+                parsed.root,
+                output,
+                options.fmt,
+                collapse_chains=options.collapse_chains,
+                max_depth=options.max_depth,
+            )
+            result["output"] = output
+            result["export_seconds"] = time.perf_counter() - exported
+    except Exception as exc:
+        result["status"] = "failure"
+        result["errors"] = [f"{type(exc).__name__}: {exc}"]
+    return result
+
+
+def run_batch(paths: Iterable[str], options: BatchOptions, jobs: Optional[int] = None) -> dict:
+    """Parse every file matched by *paths* over *jobs* processes and build the report."""
+
+    files = collect_files(paths)
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    worker = partial(parse_file, options=options)
+    if jobs == 1 or len(files) <= 1:
+        results = [worker(path) for path in files]
+    else:
+        chunksize = max(1, len(files) // (jobs * CHUNKS_PER_JOB))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(worker, files, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    statuses = [result["status"] for result in results]
+    return {
+        "summary": {
+            "files": len(results),
+            "ok": statuses.count("ok"),
+            "error": statuses.count("error"),
+            "failure": statuses.count("failure"),
+            "tokens": sum(result["tokens"] for result in results),
+            "nodes": sum(result["nodes"] for result in results),
+            "cache_hits": sum(result.get("cache") == "hit" for result in results),
+            "cache_misses": sum(result.get("cache") == "miss" for result in results),
+            "jobs": jobs,
+            "seconds": elapsed,
+            "files_per_second": len(results) / elapsed if elapsed else None,
+        },
+        "files": results,
+    }
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from lexical import grammar
+from lexical.ll1 import PARSER_ENGINES
+from lexical.scanner import ENGINES
+from lexical.source_map import SourceMap
+from lexical.syntax_tree import SyntaxNode, read_binary, write_binary
+from lexical.token import TokenStream
+
+# Bump when the parsers change their output without a grammar change.
+CACHE_FORMAT = 1
+DEFAULT_MAX_BYTES = 256 << 20
+EVICT_TO = 0.9
+RESCAN_EVERY = 64
+_SUFFIX = ".entry"
+
+
+@dataclass
+class ParseResult:
+    """Errors, tree and token count of one parse; *cached* tells if it was a hit."""
+
+    errors: List[str]
+    root: Optional[SyntaxNode]
+    tokens: int
+    cached: bool = False
+    lex_seconds: Optional[float] = None
+    parse_seconds: Optional[float] = None
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class ParseCache:
+    """Content-addressed on-disk cache of parse results.
+
+    Entries are keyed by the SHA-256 of the source bytes, the grammar
+    version and the lexer/parser engines, and hold the error list, the token
+    count and the tree in the binary export format. Entries are written to
+    a temporary file and renamed into place, so several processes can share
+    a directory. A hit refreshes the entry's mtime; when the directory grows
+    past *max_bytes* the least recently used entries are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._size: Optional[int] = None
+        self._stores_since_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: bytes, lexer: str = "classic", parser: str = "recursive") -> str:
+        digest = hashlib.sha256(f"{CACHE_FORMAT}:{grammar.VERSION}:{lexer}:{parser}\0".encode("utf-8"))
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def get(self, key: str, source: Optional[bytes] = None, need_tree: bool = True) -> Optional[ParseResult]:
+        """Return the cached result for *key*, or ``None`` on a miss.
+
+        An entry stored without a tree only satisfies lookups that do not
+        *need_tree*. *source* gives the tree's tokens their line and column.
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry:
+                data = entry.read()
+            header, _, tree = data.partition(b"\n")
+            meta = json.loads(header)
+            if need_tree and not meta["tree"]:
+                raise LookupError
+            root = None
+            if need_tree and tree:
+                root = read_binary(tree, None if source is None else SourceMap(source))
+        except (OSError, LookupError, ValueError, IndexError):
+            self.stats.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats.hits += 1
+        return ParseResult(meta["errors"], root, meta["tokens"], cached=True)
+
+    def put(self, key: str, result: ParseResult, built_tree: bool = True) -> None:
+        """Store *result*; *built_tree* says whether it came from a tree-building parse."""
+
+        buffer = io.BytesIO()
+        meta = {"errors": result.errors, "tokens": result.tokens, "tree": built_tree}
+        buffer.write(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        buffer.write(b"\n")
+        if result.root is not None:
+            write_binary(result.root, buffer)
+        data = buffer.getvalue()
+        write_atomically(self._path(key), data)
+        self.stats.stores += 1
+        self._stores_since_scan += 1
+        if self._size is None or self._stores_since_scan >= RESCAN_EVERY:
+            self.evict()
+        else:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> None:
+        """Measure the directory and drop least recently used entries past the limit."""
+
+        entries = []
+        total = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * EVICT_TO
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    self.stats.evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._size = total
+        self._stores_since_scan = 0
+
+    def parse(
+        self,
+        path: str,
+        lexer: str = "classic",
+        parser: str = "recursive",
+        build_tree: bool = True,
+        sink=None,
+    ) -> ParseResult:
+        """Parse *path* through the cache; a hit neither lexes, parses nor emits events."""
+
+        with open(path, "rb") as source_file:
+            source = source_file.read()
+        key = self.key(source, lexer, parser)
+        result = self.get(key, source, need_tree=build_tree)
+        if result is not None:
+            return result
+        result = parse_path(path, lexer, parser, build_tree, sink)
+        self.put(key, result, build_tree)
+        return result
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """Write *data* to a temporary file next to *path* and rename it into place."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as entry:
+            entry.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def parse_path(path: str, lexer: str = "classic", parser: str = "recursive", build_tree: bool = True, sink=None) -> ParseResult:
+    """Lex and parse *path* without the cache.
+
+    The file's memory map is released before returning: errors are
+    already formatted, but the tokens in the tree no longer resolve their
+    line and column.
+    """
+
+    start = time.perf_counter()
+    with ENGINES[lexer](path) as scanner:
+        return _lex_and_parse(scanner, start, parser, build_tree, sink)
+
+
+def parse_source(source, lexer: str = "classic", parser: str = "recursive", build_tree: bool = True, sink=None) -> ParseResult:
+    """Lex and parse in-memory *source* (bytes, or a str) without the cache."""
+
+    start = time.perf_counter()
+    return _lex_and_parse(ENGINES[lexer].from_source(source), start, parser, build_tree, sink)
+
+
+def _lex_and_parse(scanner, start: float, parser: str, build_tree: bool, sink) -> ParseResult:
+    tokens = []
+    token = scanner.next_token()
+    while token is not None:
+        tokens.append(token)
+        token = scanner.next_token()
+    lexed = time.perf_counter()
+    engine = PARSER_ENGINES[parser](TokenStream(tokens), build_tree=build_tree, sink=sink)
+    errors = engine.parse()
+    return ParseResult(errors, engine.root, len(tokens), False, lexed - start, time.perf_counter() - lexed)
@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import math
+import os
+import struct
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from lexical import grammar
+from lexical.cache import CacheStats, write_atomically
+from lexical.parser import semantic_error
+from lexical.semantic import INT, REAL
+
+# Opcodes. Every instruction is an (opcode, argument) pair; instructions
+# without an argument carry 0.
+(
+    LOAD_CONST,
+    LOAD_VAR,
+    STORE_VAR,
+    POST_INC,
+    POST_DEC,
+    ADD,
+    SUB,
+    MUL,
+    DIV,
+    DIV_INT,
+    TO_INT,
+    TO_REAL,
+    COMPARE,
+    JUMP,
+    JUMP_IF_TRUE,
+    JUMP_IF_FALSE,
+    PRINT,
+    INPUT,
+    HALT,
+) = range(19)
+
+OPCODE_NAMES = (
+    "LOAD_CONST", "LOAD_VAR", "STORE_VAR", "POST_INC", "POST_DEC",
+    "ADD", "SUB", "MUL", "DIV", "DIV_INT", "TO_INT", "TO_REAL", "COMPARE",
+    "JUMP", "JUMP_IF_TRUE", "JUMP_IF_FALSE", "PRINT", "INPUT", "HALT",
+)
+JUMPS = frozenset((JUMP, JUMP_IF_TRUE, JUMP_IF_FALSE))
+# COMPARE's argument indexes this tuple.
+REL_OPERATORS = (">", "<", ">=", "<=", "==", "!=")
+
+# Bump when the compiler's output changes.
+BYTECODE_FORMAT = 1
+_MAGIC = b"MCBC\x01"
+_SUFFIX = ".mcbc"
+
+_ARITH_OPCODES = {"+": ADD, "-": SUB, "*": MUL}
+
+
+def truncate(value) -> int:
+    """``int(value)``, raising OverflowError for nan as int() does for inf."""
+
+    if value != value:
+        raise OverflowError("cannot convert float NaN to integer")
+    return int(value)
+
+
+def divide_int(a: int, b: int) -> int:
+    """Integer division truncating toward zero, as for ``int`` operands."""
+
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def arithmetic(op: str, a, b):
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if type(a) is int and type(b) is int:
+        return divide_int(a, b)
+    return a / b
+
+
+def compare(op: str, a, b) -> bool:
+    if op == ">":
+        return a > b
+    if op == "<":
+        return a < b
+    if op == ">=":
+        return a >= b
+    if op == "<=":
+        return a <= b
+    if op == "==":
+        return a == b
+    return a != b
+
+
+@dataclass
+class Bytecode:
+    """A compiled program.
+
+    *code* holds (opcode, argument) pairs back to back and *lines* the
+    source line of each instruction. Variables live in numbered slots,
+    named and typed as in the ``var`` section.
+    """
+
+    code: array = field(default_factory=lambda: array("i"))
+    lines: array = field(default_factory=lambda: array("i"))
+    constants: list = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+
+    def instructions(self) -> List[Tuple[int, int]]:
+        code = self.code
+        return list(zip(code[0::2], code[1::2]))
+
+    def disassemble(self) -> str:
+        lines = []
+        for index, (op, arg) in enumerate(self.instructions()):
+            name = OPCODE_NAMES[op]
+            if op == LOAD_CONST:
+                detail = repr(self.constants[arg])
+            elif op in (LOAD_VAR, STORE_VAR, POST_INC, POST_DEC, INPUT):
+                detail = self.names[arg]
+            elif op == COMPARE:
+                detail = REL_OPERATORS[arg]
+            elif op in JUMPS:
+                detail = f"-> {arg}"
+            else:
+                detail = ""
+            lines.append(f"{index:>5} {self.lines[index]:>5}  {name:<14}{detail}".rstrip())
+        return "\n".join(lines)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        buffer.write(_MAGIC)
+        header = {
+            "constants": self.constants,
+            "names": self.names,
+            "types": self.types,
+            "instructions": len(self.lines),
+        }
+        buffer.write(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+        buffer.write(b"\n")
+        buffer.write(struct.pack(f"<{len(self.code)}i", *self.code))
+        buffer.write(struct.pack(f"<{len(self.lines)}i", *self.lines))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Bytecode":
+        if not data.startswith(_MAGIC):
+            raise ValueError("not a bytecode file")
+        newline = data.index(b"\n", len(_MAGIC))
+        header = json.loads(data[len(_MAGIC):newline])
+        count = header["instructions"]
+        body = data[newline + 1:]
+        if len(body) != 12 * count:
+            raise ValueError("truncated bytecode file")
+        code = array("i", struct.unpack_from(f"<{2 * count}i", body))
+        lines = array("i", struct.unpack_from(f"<{count}i", body, 8 * count))
+        return cls(code, lines, header["constants"], header["names"], header["types"])
+
+
+class _Fragment:
+    # Code of one arithmetic subexpression; a constant one has no code yet,
+    # so constants fold until they meet a variable.
+    __slots__ = ("code", "value", "type")
+
+    def __init__(self, code, value, type_):
+        self.code = code
+        self.value = value
+        self.type = type_
+
+
+_STATEMENT, _CONDITION, _EMIT, _PLACE = range(4)
+
+
+class Compiler:
+    """Compiles an error-free syntax tree into :class:`Bytecode`.
+
+    Arithmetic on constants is folded. Conditions compile to jumps, so
+    ``E``/``OU``/``NAO`` short-circuit without ever building a truth
+    value; jumps to jumps are threaded, and code the jumps leave
+    unreachable (branches of constant conditions) is dropped. Like the
+    parser, the compiler walks the tree with explicit stacks.
+
+    Undeclared and redeclared variables are reported in :attr:`errors` in
+    the parser's format; :meth:`compile` then returns ``None``.
+    """
+
+    def __init__(self):
+        self.errors: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._types: List[str] = []
+        self._constants: list = []
+        self._constant_index: Dict[tuple, int] = {}
+        # Instructions as [opcode, argument, line]; jump arguments are
+        # label numbers until _resolve().
+        self._code: List[list] = []
+        self._labels: List[Optional[int]] = []
+
+    def compile(self, root) -> Optional[Bytecode]:
+        corpo = root.children[2]
+        self._declarations(corpo.children[0])
+        tasks = [(_STATEMENT, corpo.children[1])]
+        while tasks:
+            task = tasks.pop()
+            kind = task[0]
+            if kind == _STATEMENT:
+                self._statement(task[1], tasks)
+            elif kind == _CONDITION:
+                self._condition(*task[1:], tasks)
+            elif kind == _EMIT:
+                self._code.append([task[1], task[2], task[3]])
+            else:
+                self._labels[task[1]] = len(self._code)
+        closing = root.children[3].token
+        self._code.append([HALT, 0, closing.line if closing is not None else 0])
+        if self.errors:
+            return None
+        self._resolve()
+        self._thread_jumps()
+        self._compact()
+        bytecode = Bytecode(constants=self._constants, names=list(self._slots), types=self._types)
+        for op, arg, line in self._code:
+            bytecode.code.append(op)
+            bytecode.code.append(arg)
+            bytecode.lines.append(line)
+        return bytecode
+
+    def _declarations(self, secao) -> None:
+        for declaracao in secao.children[2].children:
+            identifier = declaracao.children[0].token
+            if identifier.value in self._slots:
+                self.errors.append(semantic_error(identifier, f"variável '{identifier.value}' já declarada"))
+                continue
+            self._slots[identifier.value] = len(self._types)
+            self._types.append(declaracao.children[2].children[0].token.value)
+
+    def _slot(self, token) -> int:
+        slot = self._slots.get(token.value)
+        if slot is None:
+            self.errors.append(semantic_error(token, f"variável '{token.value}' não declarada"))
+            return 0
+        return slot
+
+    def _constant(self, value) -> int:
+        # repr keeps 0.0 and -0.0 apart; 1 and 1.0 differ by type.
+        key = (type(value), repr(value))
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self._constants)
+            self._constants.append(value)
+        return index
+
+    def _new_label(self) -> int:
+        self._labels.append(None)
+        return len(self._labels) - 1
+
+    def _emit(self, code, line: int) -> None:
+        self._code.extend([op, arg, line] for op, arg in code)
+
+    def _statement(self, node, tasks) -> None:
+        label = node.label
+        children = node.children
+        if label == "listaComandos":
+            tasks.extend((_STATEMENT, child) for child in reversed(children))
+        elif label in ("comando", "bloco"):
+            tasks.extend((_STATEMENT, child) for child in reversed(children) if child.token is None)
+        elif label == "atribuicao":
+            target = children[0].token
+            slot = self._slot(target)
+            fragment = self._expression(children[2])
+            target_type = self._types[slot] if self._types else INT
+            if target_type == INT and fragment.type == REAL:
+                fragment = self._convert(fragment, TO_INT, truncate, INT)
+            elif target_type == REAL and fragment.type == INT:
+                fragment = self._convert(fragment, TO_REAL, float, REAL)
+            self._emit(self._materialize(fragment) + [(STORE_VAR, slot)], target.line)
+        elif label == "leitura":
+            target = children[2].token
+            self._emit([(INPUT, self._slot(target))], target.line)
+        elif label == "escrita":
+            value = children[2].token
+            if children[2].label == "STRING":
+                load = (LOAD_CONST, self._constant(value.value))
+            else:
+                load = (LOAD_VAR, self._slot(value))
+            self._emit([load, (PRINT, 0)], value.line)
+        elif label == "condicional":
+            line = children[0].token.line
+            end = self._new_label()
+            if len(children) > 4:
+                otherwise = self._new_label()
+                tasks.append((_PLACE, end))
+                tasks.append((_STATEMENT, children[5]))
+                tasks.append((_PLACE, otherwise))
+                tasks.append((_EMIT, JUMP, end, line))
+                tasks.append((_STATEMENT, children[3]))
+                tasks.append((_CONDITION, children[1], 0, otherwise, False, line))
+            else:
+                tasks.append((_PLACE, end))
+                tasks.append((_STATEMENT, children[3]))
+                tasks.append((_CONDITION, children[1], 0, end, False, line))
+        elif label == "repeticao":
+            # The test sits after the body, so each iteration takes one jump.
+            line = children[0].token.line
+            body, test = self._new_label(), self._new_label()
+            tasks.append((_CONDITION, children[1], 0, body, True, line))
+            tasks.append((_PLACE, test))
+            tasks.append((_STATEMENT, children[2]))
+            tasks.append((_PLACE, body))
+            tasks.append((_EMIT, JUMP, test, line))
+        else:
+            raise ValueError(f"unexpected node in statement list: {label}")
+
+    def _condition(self, node, terms: int, target: int, jump_if: bool, line: int, tasks) -> None:
+        """Jump to *target* when *node* evaluates to *jump_if*, else fall through.
+
+        For an expressaoRelacional, *terms* > 0 stands for its first *terms*
+        termoRelacional, joined left to right by E/OU.
+        """
+
+        children = node.children
+        if node.label == "expressaoRelacional":
+            if terms == 0:
+                terms = (len(children) + 1) // 2
+            if terms == 1:
+                tasks.append((_CONDITION, children[0], 0, target, jump_if, line))
+                return
+            right = children[2 * terms - 2]
+            connector = children[2 * terms - 3].label
+            # Pushed in reverse: the left part runs first.
+            if (connector == "E") != jump_if:
+                # E that jumps when false, OU that jumps when true: either
+                # side alone decides.
+                tasks.append((_CONDITION, right, 0, target, jump_if, line))
+                tasks.append((_CONDITION, node, terms - 1, target, jump_if, line))
+            else:
+                skip = self._new_label()
+                tasks.append((_PLACE, skip))
+                tasks.append((_CONDITION, right, 0, target, jump_if, line))
+                tasks.append((_CONDITION, node, terms - 1, skip, not jump_if, line))
+            return
+        first = children[0].label
+        if first == "NAO":
+            tasks.append((_CONDITION, children[1], 0, target, not jump_if, line))
+            return
+        if first == "LPAREN":
+            tasks.append((_CONDITION, children[1], 0, target, jump_if, line))
+            return
+        left = self._expression(children[0])
+        operator = children[1].token.value
+        right = self._expression(children[2])
+        if left.code is None and right.code is None:
+            if compare(operator, left.value, right.value) == jump_if:
+                self._code.append([JUMP, target, line])
+            return
+        code = self._materialize(left) + self._materialize(right)
+        code.append((COMPARE, REL_OPERATORS.index(operator)))
+        code.append((JUMP_IF_TRUE if jump_if else JUMP_IF_FALSE, target))
+        self._emit(code, line)
+
+    def _expression(self, root) -> _Fragment:
+        # Post-order over expressaoAritmetica / termo / fator; each finished
+        # node leaves one fragment on *results*.
+        results: List[_Fragment] = []
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            children = node.children
+            if node.label == "fator":
+                first = children[0]
+                if first.label == "LPAREN":
+                    stack.append((children[1], False))
+                    continue
+                token = first.token
+                if first.label == "NUMINT":
+                    results.append(_Fragment(None, int(token.value), INT))
+                elif first.label == "NUMREAL":
+                    results.append(_Fragment(None, float(token.value), REAL))
+                else:
+                    slot = self._slot(token)
+                    type_ = self._types[slot] if self._types else INT
+                    if len(children) > 1:
+                        op = POST_INC if children[1].label == "INCREMENT" else POST_DEC
+                        results.append(_Fragment([(op, slot)], None, type_))
+                    else:
+                        results.append(_Fragment([(LOAD_VAR, slot)], None, type_))
+                continue
+            if not done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children) if child.token is None)
+                continue
+            count = (len(children) + 1) // 2
+            operands = results[-count:]
+            del results[-count:]
+            fragment = operands[0]
+            for index in range(1, count):
+                fragment = self._binary(children[2 * index - 1].label, fragment, operands[index])
+            results.append(fragment)
+        return results[0]
+
+    def _binary(self, op: str, left: _Fragment, right: _Fragment) -> _Fragment:
+        type_ = REAL if REAL in (left.type, right.type) else INT
+        if left.code is None and right.code is None and not (op == "/" and right.value == 0):
+            try:
+                value = arithmetic(op, left.value, right.value)
+            except OverflowError:
+                value = None
+            # inf and nan are left to the VM, which reports what they lead
+            # to with the statement's line.
+            if value is not None and (type(value) is int or math.isfinite(value)):
+                return _Fragment(None, value, type_)
+        code = self._materialize(left)
+        code.extend(self._materialize(right))
+        if op == "/":
+            code.append((DIV_INT if type_ == INT else DIV, 0))
+        else:
+            code.append((_ARITH_OPCODES[op], 0))
+        return _Fragment(code, None, type_)
+
+    def _convert(self, fragment: _Fragment, op: int, function, type_: str) -> _Fragment:
+        if fragment.code is None:
+            try:
+                return _Fragment(None, function(fragment.value), type_)
+            except OverflowError:
+                pass
+        return _Fragment(self._materialize(fragment) + [(op, 0)], None, type_)
+
+    def _materialize(self, fragment: _Fragment) -> list:
+        if fragment.code is None:
+            return [(LOAD_CONST, self._constant(fragment.value))]
+        return fragment.code
+
+    def _resolve(self) -> None:
+        labels = self._labels
+        for instruction in self._code:
+            if instruction[0] in JUMPS:
+                instruction[1] = labels[instruction[1]]
+
+    def _thread_jumps(self) -> None:
+        code = self._code
+        for instruction in code:
+            if instruction[0] not in JUMPS:
+                continue
+            target = instruction[1]
+            seen = set()
+            while code[target][0] == JUMP and target not in seen:
+                seen.add(target)
+                target = code[target][1]
+            instruction[1] = target
+
+    def _compact(self) -> None:
+        # Drops unreachable instructions, then jumps to the next instruction
+        # left, until neither remains.
+        code = self._code
+        keep = [False] * len(code)
+        pending = [0]
+        while pending:
+            index = pending.pop()
+            while index < len(code) and not keep[index]:
+                keep[index] = True
+                op = code[index][0]
+                if op in JUMPS:
+                    pending.append(code[index][1])
+                if op in (JUMP, HALT):
+                    break
+                index += 1
+        while True:
+            # new_index[i]: position of instruction i, or of the next kept
+            # one, once the dropped ones are gone.
+            new_index = []
+            position = 0
+            for kept in keep:
+                new_index.append(position)
+                position += kept
+            new_index.append(position)
+            dropped = False
+            for index, instruction in enumerate(code):
+                if keep[index] and instruction[0] == JUMP and new_index[instruction[1]] == new_index[index] + 1:
+                    keep[index] = False
+                    dropped = True
+            if not dropped:
+                break
+        self._code = [
+            [op, new_index[arg] if op in JUMPS else arg, line]
+            for (op, arg, line), kept in zip(code, keep)
+            if kept
+        ]
+
+
+def compile_tree(root) -> Tuple[List[str], Optional[Bytecode]]:
+    """Errors and bytecode of an error-free syntax tree (``None`` on errors)."""
+
+    compiler = Compiler()
+    bytecode = compiler.compile(root)
+    return compiler.errors, bytecode
+
+
+class BytecodeCache:
+    """Compiled programs on disk, keyed like :class:`~lexical.cache.ParseCache` entries.
+
+    Only programs that compiled are stored. Entries are small and are not
+    evicted.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: bytes, lexer: str = "classic", parser: str = "recursive") -> str:
+        digest = hashlib.sha256(f"{BYTECODE_FORMAT}:{grammar.VERSION}:{lexer}:{parser}\0".encode("utf-8"))
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Bytecode]:
+        try:
+            with open(self._path(key), "rb") as entry:
+                bytecode = Bytecode.from_bytes(entry.read())
+        except (OSError, LookupError, ValueError, struct.error):
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return bytecode
+
+    def put(self, key: str, bytecode: Bytecode) -> None:
+        write_atomically(self._path(key), bytecode.to_bytes())
+        self.stats.stores += 1
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from typing import ClassVar, List, Optional, TextIO
+
+from lexical.token import Token
+
+
+@dataclass(frozen=True, slots=True)
+class ParseEvent:
+    """Something the parser reports while it works, anchored at *token*."""
+
+    kind: ClassVar[str] = "event"
+
+    token: Optional[Token]
+
+    @property
+    def name(self) -> Optional[str]:
+        return None if self.token is None else self.token.value
+
+    @property
+    def position(self) -> tuple[Optional[int], Optional[int]]:
+        if self.token is None or self.token.source_map is None:
+            return None, None
+        return self.token.source_map.position(self.token.offset)
+
+    def message(self) -> str:
+        return self.kind
+
+    def to_dict(self) -> dict:
+        line, column = self.position
+        return {"event": self.kind, "name": self.name, "line": line, "column": column}
+
+
+@dataclass(frozen=True, slots=True)
+class DeclarationEvent(ParseEvent):
+    kind: ClassVar[str] = "declaration"
+
+    def message(self) -> str:
+        return f"Declarado identificador: {self.name}"
+
+
+@dataclass(frozen=True, slots=True)
+class AssignmentEvent(ParseEvent):
+    kind: ClassVar[str] = "assignment"
+
+    def message(self) -> str:
+        return f"Atribuição feita para: {self.name}"
+
+
+@dataclass(frozen=True, slots=True)
+class ReadEvent(ParseEvent):
+    kind: ClassVar[str] = "read"
+
+    def message(self) -> str:
+        return f"Leitura de variável: {self.name}"
+
+
+@dataclass(frozen=True, slots=True)
+class BlockParsedEvent(ParseEvent):
+    """Emitted once the program body has been parsed; *token* is its first token."""
+
+    kind: ClassVar[str] = "block_parsed"
+
+    @property
+    def name(self) -> Optional[str]:
+        return None
+
+    def message(self) -> str:
+        return "Bloco de comandos analisado"
+
+
+class NullSink:
+    """Discard every event; base class for the other sinks."""
+
+    def emit(self, event: ParseEvent) -> None:
+        pass
+
+
+class ListSink(NullSink):
+    """Buffer events in :attr:`events` for later inspection."""
+
+    def __init__(self) -> None:
+        self.events: List[ParseEvent] = []
+
+    def emit(self, event: ParseEvent) -> None:
+        self.events.append(event)
+
+
+class ConsoleSink(NullSink):
+    """Print the parser's classic progress messages."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream
+
+    def emit(self, event: ParseEvent) -> None:
+        print(event.message(), file=self.stream or sys.stdout)
+
+
+class JsonLinesSink(NullSink):
+    """Write one JSON object per event to *stream*."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def emit(self, event: ParseEvent) -> None:
+        self.stream.write(json.dumps(event.to_dict(), ensure_ascii=False))
+        self.stream.write("\n")
+
+
+class LoggingSink(NullSink):
+    """Forward events to a :mod:`logging` logger."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> None:
+        self.logger = logger or logging.getLogger("lexical.parser")
+        self.level = level
+
+    def emit(self, event: ParseEvent) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, event.message(), extra={"parse_event": event.to_dict()})
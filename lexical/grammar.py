@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Hashable, Optional, Tuple
+
+from lexical.events import AssignmentEvent, BlockParsedEvent, DeclarationEvent, ReadEvent
+from lexical.token import Token, TokenType
+
+# Terminals are token *kinds*: the keyword for RESERVED tokens, the operator
+# for MATH_OPERATOR tokens and the TokenType for everything else. END is the
+# kind of the end of input.
+END = None
+EMPTY = "ε"
+
+_VALUE_KINDS = frozenset((TokenType.RESERVED, TokenType.MATH_OPERATOR))
+
+Kind = Optional[Hashable]
+
+
+@dataclass(frozen=True)
+class Expect:
+    """A terminal in a production and the error reported when it is missing."""
+
+    kind: Kind
+    message: str
+
+
+@dataclass(frozen=True)
+class Capture:
+    """Action: remember the current token for a later :class:`Emit`."""
+
+
+@dataclass(frozen=True)
+class Emit:
+    """Action: report *event* for the token remembered by :class:`Capture`."""
+
+    event: type
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A nonterminal of :data:`SPEC`.
+
+    Alternatives are tuples of rule names, terminal kinds, :class:`Expect`
+    terminals and actions. When two alternatives claim the same lookahead
+    the first one listed wins. A rule whose lookahead selects no alternative
+    reports *error*, or takes alternative *default*; without either, a rule
+    with a single alternative or an empty one defaults to it. A rule with
+    ``node=False`` builds no tree node: its children go to the enclosing one.
+    """
+
+    alternatives: Tuple[tuple, ...]
+    node: bool = True
+    error: Optional[str] = None
+    default: Optional[int] = None
+
+    def default_alternative(self) -> Optional[int]:
+        if self.error is not None:
+            return None
+        if self.default is not None:
+            return self.default
+        if len(self.alternatives) == 1:
+            return 0
+        if () in self.alternatives:
+            return self.alternatives.index(())
+        return None
+
+
+SPEC: Dict[str, Rule] = {
+    "programa": Rule((
+        (
+            Expect("main", "esperado 'main' no início do programa"),
+            Expect(TokenType.LBRACE, "esperado '{' após 'main'"),
+            "corpo",
+            Expect(TokenType.RBRACE, "esperado '}' ao final do programa"),
+        ),
+    )),
+    "corpo": Rule((
+        (Capture(), "secaoDeclaracoes", "listaComandos", Emit(BlockParsedEvent)),
+    )),
+    "secaoDeclaracoes": Rule((
+        (
+            Expect("var", "esperado 'var' no início da seção de declarações"),
+            Expect(TokenType.LBRACE, "esperado '{' após 'var'"),
+            "listaDeclaracoes",
+            Expect(TokenType.RBRACE, "esperado '}' ao final da seção 'var'"),
+        ),
+    )),
+    "listaDeclaracoes": Rule((("declaracao", "restoDeclaracoes"),)),
+    "restoDeclaracoes": Rule((("declaracao", "restoDeclaracoes"), ()), node=False),
+    "declaracao": Rule((
+        (
+            Capture(),
+            Expect(TokenType.IDENTIFIER, "esperado identificador na declaração"),
+            Emit(DeclarationEvent),
+            Expect(TokenType.COLON, "esperado ':' após identificador"),
+            "tipo",
+            Expect(TokenType.SEMICOLON, "esperado ';' ao final da declaração"),
+        ),
+    )),
+    "tipo": Rule((("int",), ("real",)), error="esperado tipo 'int' ou 'real'"),
+    "listaComandos": Rule((("comando", "restoComandos"),)),
+    "restoComandos": Rule((("comando", "restoComandos"), ()), node=False),
+    "comando": Rule(
+        (
+            ("atribuicao",),
+            ("leitura",),
+            ("escrita",),
+            ("condicional",),
+            ("repeticao",),
+            ("bloco",),
+        ),
+        error="comando inválido",
+    ),
+    "atribuicao": Rule((
+        (
+            Capture(),
+            Expect(TokenType.IDENTIFIER, "esperado identificador na atribuição"),
+            Expect(TokenType.ASSIGN_LEFT, "esperado '<-' após identificador"),
+            "expressaoAritmetica",
+            Expect(TokenType.SEMICOLON, "esperado ';' ao final da atribuição"),
+            Emit(AssignmentEvent),
+        ),
+    )),
+    "leitura": Rule((
+        (
+            Expect("input", "esperado 'input'"),
+            Expect(TokenType.LPAREN, "esperado '(' após 'input'"),
+            Capture(),
+            Expect(TokenType.IDENTIFIER, "esperado identificador dentro de input(...)"),
+            Expect(TokenType.RPAREN, "esperado ')' após input(...)"),
+            Expect(TokenType.SEMICOLON, "esperado ';' ao final de input(...)"),
+            Emit(ReadEvent),
+        ),
+    )),
+    "escrita": Rule((
+        (
+            Expect("print", "esperado 'print'"),
+            Expect(TokenType.LPAREN, "esperado '(' após 'print'"),
+            "valorEscrita",
+            Expect(TokenType.RPAREN, "esperado ')' após print(...)"),
+            Expect(TokenType.SEMICOLON, "esperado ';' ao final de print(...)"),
+        ),
+    )),
+    "valorEscrita": Rule(
+        ((TokenType.IDENTIFIER,), (TokenType.STRING,)),
+        node=False,
+        error="esperado identificador ou cadeia de caracteres em print(...)",
+    ),
+    "condicional": Rule((
+        (
+            Expect("if", "esperado 'if'"),
+            "expressaoRelacional",
+            Expect("then", "esperado 'then' após condição do if"),
+            "comando",
+            "senao",
+        ),
+    )),
+    # Dangling else: the first alternative wins, so 'else' binds to the
+    # nearest if.
+    "senao": Rule((("else", "comando"), ()), node=False),
+    "repeticao": Rule((
+        (Expect("while", "esperado 'while'"), "expressaoRelacional", "comando"),
+    )),
+    "bloco": Rule((
+        (
+            Expect(TokenType.LBRACE, "esperado '{' para iniciar bloco"),
+            "listaComandos",
+            Expect(TokenType.RBRACE, "esperado '}' para finalizar bloco"),
+        ),
+    )),
+    "expressaoAritmetica": Rule((("termo", "restoExpressao"),)),
+    "restoExpressao": Rule(
+        (("+", "termo", "restoExpressao"), ("-", "termo", "restoExpressao"), ()),
+        node=False,
+    ),
+    "termo": Rule((("fator", "restoTermo"),)),
+    "restoTermo": Rule(
+        (("*", "fator", "restoTermo"), ("/", "fator", "restoTermo"), ()),
+        node=False,
+    ),
+    "fator": Rule(
+        (
+            (TokenType.NUMINT,),
+            (TokenType.NUMREAL,),
+            (TokenType.IDENTIFIER, "incremento"),
+            (
+                TokenType.LPAREN,
+                "expressaoAritmetica",
+                Expect(TokenType.RPAREN, "esperado ')' após expressão"),
+            ),
+        ),
+        error="esperado fator (número, identificador ou '(expr)')",
+    ),
+    "incremento": Rule(((TokenType.INCREMENT,), (TokenType.DECREMENT,), ()), node=False),
+    "expressaoRelacional": Rule((("termoRelacional", "restoRelacional"),)),
+    "restoRelacional": Rule(
+        (("E", "termoRelacional", "restoRelacional"), ("OU", "termoRelacional", "restoRelacional"), ()),
+        node=False,
+    ),
+    # '(' opens a parenthesized relational expression, never an arithmetic
+    # one: the second alternative wins over the third. Anything else is
+    # left to the arithmetic alternative to report.
+    "termoRelacional": Rule(
+        (
+            ("NAO", "termoRelacional"),
+            (
+                TokenType.LPAREN,
+                "expressaoRelacional",
+                Expect(TokenType.RPAREN, "esperado ')' após expressão relacional"),
+            ),
+            (
+                "expressaoAritmetica",
+                Expect(TokenType.REL_OPERATOR, "esperado operador relacional (>, <, >=, <=, ==, !=)"),
+                "expressaoAritmetica",
+            ),
+        ),
+        default=2,
+    ),
+}
+
+START = "programa"
+
+
+def terminal_kind(symbol) -> Kind:
+    return symbol.kind if isinstance(symbol, Expect) else symbol
+
+
+def plain_grammar(spec: Dict[str, Rule] = SPEC) -> Dict[str, Tuple[Tuple[Kind, ...], ...]]:
+    """*spec* as bare BNF: rule names and terminal kinds, without actions."""
+
+    return {
+        name: tuple(
+            tuple(terminal_kind(symbol) for symbol in alternative if not isinstance(symbol, (Capture, Emit)))
+            for alternative in rule.alternatives
+        )
+        for name, rule in spec.items()
+    }
+
+
+GRAMMAR = plain_grammar()
+# Changes whenever a rule, label or error message of SPEC changes.
+VERSION = hashlib.sha256(repr(SPEC).encode("utf-8")).hexdigest()[:16]
+
+
+def token_kind(token: Optional[Token]) -> Kind:
+    """Return the grammar terminal *token* stands for (``END`` for ``None``)."""
+
+    if token is None:
+        return END
+    if token.type in _VALUE_KINDS:
+        return token.value
+    return token.type
+
+
+def first_of(symbols, first: Dict[str, FrozenSet]) -> FrozenSet:
+    """FIRST set of a symbol sequence; contains ``EMPTY`` if it can derive nothing."""
+
+    result = set()
+    for symbol in symbols:
+        if symbol not in first:
+            result.add(symbol)
+            return frozenset(result)
+        result |= first[symbol] - {EMPTY}
+        if EMPTY not in first[symbol]:
+            return frozenset(result)
+    result.add(EMPTY)
+    return frozenset(result)
+
+
+def first_sets(grammar=GRAMMAR) -> Dict[str, FrozenSet]:
+    """FIRST set of every nonterminal of *grammar*, by fixed-point iteration."""
+
+    first = {name: frozenset() for name in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in grammar.items():
+            current = set(first[name])
+            for alternative in alternatives:
+                current |= first_of(alternative, first)
+            if len(current) != len(first[name]):
+                first[name] = frozenset(current)
+                changed = True
+    return first
+
+
+def follow_sets(grammar=GRAMMAR, first=None, start: str = START) -> Dict[str, FrozenSet]:
+    """FOLLOW set of every nonterminal of *grammar*; ``END`` follows *start*."""
+
+    first = first or first_sets(grammar)
+    follow = {name: set() for name in grammar}
+    follow[start].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for name, alternatives in grammar.items():
+            for alternative in alternatives:
+                for index, symbol in enumerate(alternative):
+                    if symbol not in grammar:
+                        continue
+                    rest = first_of(alternative[index + 1:], first)
+                    size = len(follow[symbol])
+                    follow[symbol] |= rest - {EMPTY}
+                    if EMPTY in rest:
+                        follow[symbol] |= follow[name]
+                    changed = changed or len(follow[symbol]) != size
+    return {name: frozenset(kinds) for name, kinds in follow.items()}
+
+
+FIRST = first_sets()
+FOLLOW = follow_sets(first=FIRST)
+
+# Error recovery resumes at the innermost comando, skipping to a ';' or a
+# token in RECOVERY. Identifiers also occur inside expressions and '{'
+# usually opens the body of a broken if/while, so stopping at them restarts
+# mid-statement. 'else' only counts (RECOVERY_ELSE) when the enclosing
+# condicional can still take it.
+RECOVERY_RULE = "comando"
+RECOVERY_ELSE = FOLLOW[RECOVERY_RULE] - {TokenType.IDENTIFIER, TokenType.LBRACE}
+RECOVERY = RECOVERY_ELSE - {"else"}
+# Recovery set by the rule pending right after the recovering comando.
+RECOVERY_BEFORE = {"senao": RECOVERY_ELSE}
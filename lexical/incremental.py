@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from itertools import accumulate, islice
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+from lexical.grammar import token_kind
+from lexical.parser import Parser
+from lexical.scanner import ENGINES
+from lexical.source_map import SourceMap
+from lexical.syntax_tree import SyntaxNode
+from lexical.token import Token
+
+_offset = attrgetter("offset")
+
+# Statements nested in a top-level comando, keyed by start token index
+# relative to it: start -> (end, comando node). Only error-free statements
+# are kept; their parse depends on nothing but their tokens and the
+# lookahead token at end.
+Spans = Dict[int, Tuple[int, SyntaxNode]]
+
+
+@dataclass(frozen=True)
+class TextEdit:
+    """Replace *removed* bytes at byte *offset* of the source with *inserted*."""
+
+    offset: int
+    removed: int = 0
+    inserted: str = ""
+
+
+@dataclass
+class _Statements:
+    """The top-level comandos of a parse, in order.
+
+    Statement ``i`` is ``nodes[i]``, ``lengths[i]`` tokens long; statements
+    are contiguous from token *start*. ``spans[i]`` holds its nested
+    statements, or ``None`` if it had errors; those positions are also
+    listed in *dirty*.
+    """
+
+    start: Optional[int] = None
+    lengths: List[int] = field(default_factory=list)
+    nodes: List[SyntaxNode] = field(default_factory=list)
+    spans: List[Optional[Spans]] = field(default_factory=list)
+    dirty: List[int] = field(default_factory=list)
+
+
+class _Damage:
+    """Where the statements of the previous parse sit in the new token stream.
+
+    Old tokens ``[first, end)`` were replaced by new tokens ``[first,
+    fresh_end)``. Statements ``[0, prefix)`` end, lookahead included, before
+    *first*; statements ``[suffix, n)`` start at or after *end* and moved by
+    *shift* tokens.
+    """
+
+    def __init__(self, previous: _Statements, first: int, end: int, fresh_end: int):
+        self.previous = previous
+        self.first = first
+        self.end = end
+        self.fresh_end = fresh_end
+        self.shift = fresh_end - end
+        count = len(previous.lengths)
+        self.starts = starts = list(accumulate(previous.lengths, initial=previous.start or 0))
+        self.prefix = max(bisect_left(starts, first) - 1, 0)
+        self.suffix = bisect_left(starts, end, 0, count)
+        self.count = count
+
+    def run(self, index: int) -> Optional[Tuple[int, int, int]]:
+        """The reusable statements starting at new token *index*.
+
+        Returns ``(first, last, shift)``: statements ``[first, last)`` are
+        error free, untouched and contiguous, and their old token indexes
+        plus *shift* are the new ones.
+        """
+
+        if self.previous.start is None:
+            return None
+        if index < self.first:
+            shift, low, high = 0, 0, self.prefix
+        elif index >= self.fresh_end:
+            shift, low, high = self.shift, self.suffix, self.count
+        else:
+            return None
+        position = bisect_left(self.starts, index - shift, low, high)
+        if position >= high or self.starts[position] != index - shift:
+            return None
+        dirty = self.previous.dirty
+        next_dirty = bisect_left(dirty, position)
+        if next_dirty < len(dirty):
+            high = min(high, dirty[next_dirty])
+        if high == position:
+            return None
+        return position, high, shift
+
+    def spans(self) -> Spans:
+        """Nested statements of the damaged top-level ones that can still be reused."""
+
+        reusable = {}
+        spans = self.previous.spans
+        for position in range(self.prefix, self.suffix):
+            nested = spans[position]
+            if not nested:
+                continue
+            base = self.starts[position]
+            for start, (end, node) in nested.items():
+                start += base
+                end += base
+                if end < self.first:
+                    reusable[start] = (end, node)
+                elif start >= self.end:
+                    reusable[start + self.shift] = (end + self.shift, node)
+        return reusable
+
+
+class _ReusingParser(Parser):
+    """Parser over a token list that grafts in statements of a previous parse.
+
+    A statement that parsed without errors parses the same way wherever it
+    appears, as long as its tokens and the lookahead token after it are
+    unchanged. At the top level whole runs of such statements are attached
+    at once and the parser jumps past them; nested ones are attached one
+    at a time.
+    """
+
+    def __init__(self, tokens: List[Token], damage: Optional[_Damage] = None, reusable: Optional[Spans] = None):
+        self._tokens = tokens
+        self._index = -1
+        self._damage = damage
+        self._reusable = reusable or {}
+        self._reusable_starts = sorted(self._reusable)
+        self._starts: List[Tuple[int, int]] = []
+        self._pending: List[Tuple[int, int, SyntaxNode]] = []
+        self._grafted = False
+        self.statements = _Statements()
+        self.reused = 0
+        super().__init__(None)
+
+    def _advance(self):
+        index = self._index = min(self._index + 1, len(self._tokens))
+        token = self.current = self._tokens[index] if index < len(self._tokens) else None
+        self.kind = token_kind(token)
+
+    def _jump(self, index: int):
+        self._index = index - 1
+        self._advance()
+
+    def _open_comando(self, node, stack):
+        start = self._index
+        outermost = not self._starts
+        self._starts.append((start, len(self.errors)))
+        if outermost and self.statements.start is None:
+            self.statements.start = start
+        run = self._damage.run(start) if self._damage is not None else None
+        if run is not None:
+            first, last, shift = run
+            previous = self._damage.previous
+            if outermost:
+                # Statements before the last one go straight into the list;
+                # the last one fills *node*, which the list takes when it
+                # completes.
+                stack[-2][1].children.extend(previous.nodes[first:last - 1])
+                statements = self.statements
+                statements.lengths += previous.lengths[first:last]
+                statements.nodes += previous.nodes[first:last]
+                statements.spans += previous.spans[first:last]
+                self._grafted = True
+            else:
+                last = first + 1
+                base = self._damage.starts[first] + shift
+                nested = previous.spans[first]
+                self._pending.extend((base + s, base + e, n) for s, (e, n) in nested.items())
+            for child in previous.nodes[last - 1].children:
+                node.add_child(child)
+            self._jump(self._damage.starts[last] + shift)
+            self.reused += last - first
+            return False
+        reuse = self._reusable.get(start)
+        if reuse is None:
+            return super()._open_comando(node, stack)
+        end, previous_node = reuse
+        for child in previous_node.children:
+            node.add_child(child)
+        starts = self._reusable_starts
+        for position in range(bisect_left(starts, start) + 1, bisect_left(starts, end)):
+            inner = starts[position]
+            self._pending.append((inner, *self._reusable[inner]))
+        self._jump(end)
+        self.reused += 1
+        return False
+
+    def _comando_done(self, node):
+        start, errors = self._starts.pop()
+        clean = len(self.errors) == errors
+        if self._starts:
+            if clean:
+                self._pending.append((start, self._index, node))
+            return
+        pending, self._pending = self._pending, []
+        if self._grafted:
+            self._grafted = False
+            return
+        statements = self.statements
+        if clean:
+            nested = {s - start: (e - start, n) for s, e, n in pending}
+        else:
+            nested = None
+            statements.dirty.append(len(statements.nodes))
+        statements.lengths.append(self._index - start)
+        statements.nodes.append(node)
+        statements.spans.append(nested)
+
+
+class IncrementalDocument:
+    """A source kept lexed and parsed across editor-style edits.
+
+    :meth:`apply` re-lexes from the start of the edited line until the new
+    tokens line up with the old ones again, then re-parses only the
+    top-level statements the edit touched: untouched error-free ``comando``
+    subtrees, with any ``bloco``, ``condicional`` or ``repeticao`` in them,
+    are attached as they are, including nested ones inside the statements
+    being re-parsed. Tokens, tree and errors always equal those of a full
+    parse of the new source.
+
+    Tokens after an edit are the same objects as before with their offsets
+    shifted, and subtrees are shared between versions, so the tree of an
+    earlier version is not a snapshot.
+    """
+
+    def __init__(self, source, lexer: str = "classic"):
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        self.lexer = lexer
+        self.source = bytes(source)
+        self.source_map = SourceMap(self.source)
+        self.tokens: List[Token] = self._lex(0)
+        self.errors: List[str] = []
+        self.root: Optional[SyntaxNode] = None
+        self.relexed = len(self.tokens)
+        self.reused = 0
+        self._statements = _Statements()
+        self._parse(None, None)
+
+    @classmethod
+    def from_file(cls, filename: str, lexer: str = "classic") -> IncrementalDocument:
+        with open(filename, "rb") as source_file:
+            return cls(source_file.read(), lexer)
+
+    def _lex(self, start: int) -> List[Token]:
+        scanner = ENGINES[self.lexer].from_source(self.source, start, source_map=self.source_map)
+        tokens = []
+        token = scanner.next_token()
+        while token is not None:
+            tokens.append(token)
+            token = scanner.next_token()
+        return tokens
+
+    def _parse(self, damage: Optional[_Damage], reusable: Optional[Spans]) -> None:
+        parser = _ReusingParser(self.tokens, damage, reusable)
+        self.errors = parser.parse()
+        self.root = parser.root
+        self.reused = parser.reused
+        self._statements = parser.statements
+
+    def apply(self, edit: TextEdit) -> List[str]:
+        """Apply *edit* and return the syntax errors of the new source."""
+
+        offset, removed = edit.offset, edit.removed
+        if not 0 <= offset <= offset + removed <= len(self.source):
+            raise ValueError(f"edit {edit} is outside the source")
+        inserted = edit.inserted.encode("utf-8")
+        edit_end = offset + removed
+        delta = len(inserted) - removed
+        # Tokens never span a line break, so lexing can restart at the start
+        # of the edited line with the scanner in its initial state.
+        restart = self.source.rfind(b"\n", 0, offset) + 1
+        self.source = self.source[:offset] + inserted + self.source[edit_end:]
+        self.source_map.reset(self.source)
+
+        tokens = self.tokens
+        count = len(tokens)
+        first = bisect_left(tokens, restart, key=_offset)
+        # Once a new token starts where an old token past the edit started
+        # (shifted by delta), the rest of the stream is the old one.
+        fresh = []
+        old = first
+        end = count
+        scanner = ENGINES[self.lexer].from_source(self.source, restart, source_map=self.source_map)
+        token = scanner.next_token()
+        while token is not None:
+            target = token.offset - delta
+            while old < count and tokens[old].offset < target:
+                old += 1
+            if old < count and target >= edit_end and tokens[old].offset == target:
+                end = old
+                break
+            fresh.append(token)
+            token = scanner.next_token()
+        tokens[first:end] = fresh
+        if delta:
+            for token in islice(tokens, first + len(fresh), None):
+                token.offset += delta
+        self.relexed = len(fresh)
+
+        damage = _Damage(self._statements, first, end, first + len(fresh))
+        self._parse(damage, damage.spans())
+        return self.errors
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import sys
+from typing import Dict, TextIO
+
+from lexical.compiler import arithmetic, compare, truncate
+from lexical.semantic import INT
+from lexical.vm import ExecutionError, initial_value, read_value
+
+
+class TreeInterpreter:
+    """Runs a program straight from its syntax tree.
+
+    The straightforward recursive evaluator, kept as the reference for the
+    bytecode VM (same semantics, see benchmarks.vm). The tree must be free
+    of syntax errors and every variable declared.
+    """
+
+    def __init__(self, root, stdin: TextIO | None = None, stdout: TextIO | None = None):
+        self.root = root
+        self.stdin = sys.stdin if stdin is None else stdin
+        self.stdout = sys.stdout if stdout is None else stdout
+        self.types: Dict[str, str] = {}
+        self.variables: Dict[str, object] = {}
+        self._line = None
+
+    def run(self) -> Dict[str, object]:
+        corpo = self.root.children[2]
+        for declaracao in corpo.children[0].children[2].children:
+            name = declaracao.children[0].token.value
+            type_ = declaracao.children[2].children[0].token.value
+            self.types[name] = type_
+            self.variables[name] = initial_value(type_)
+        try:
+            self.statements(corpo.children[1])
+        except ZeroDivisionError:
+            raise ExecutionError("divisão por zero", self._line) from None
+        except OverflowError:
+            raise ExecutionError("valor fora do intervalo representável", self._line) from None
+        except ExecutionError as exc:
+            exc.line = self._line
+            raise
+        return dict(self.variables)
+
+    def statements(self, lista) -> None:
+        for comando in lista.children:
+            self.statement(comando.children[0])
+
+    def statement(self, node) -> None:
+        children = node.children
+        label = node.label
+        if label == "atribuicao":
+            target = children[0].token
+            self._line = target.line
+            value = self.expression(children[2])
+            self.variables[target.value] = truncate(value) if self.types[target.value] == INT else float(value)
+        elif label == "leitura":
+            target = children[2].token
+            self._line = target.line
+            self.variables[target.value] = read_value(self.stdin, self.types[target.value], target.value)
+        elif label == "escrita":
+            value = children[2].token
+            self._line = value.line
+            text = value.value if children[2].label == "STRING" else self.variables[value.value]
+            self.stdout.write(f"{text}\n")
+        elif label == "condicional":
+            self._line = children[0].token.line
+            if self.condition(children[1]):
+                self.statement(children[3].children[0])
+            elif len(children) > 4:
+                self.statement(children[5].children[0])
+        elif label == "repeticao":
+            self._line = children[0].token.line
+            while self.condition(children[1]):
+                self.statement(children[2].children[0])
+                self._line = children[0].token.line
+        elif label == "bloco":
+            self.statements(children[1])
+        else:
+            raise ValueError(f"unexpected statement node: {label}")
+
+    def condition(self, node) -> bool:
+        children = node.children
+        if node.label == "expressaoRelacional":
+            value = self.condition(children[0])
+            for index in range(1, len(children), 2):
+                if children[index].label == "E":
+                    value = value and self.condition(children[index + 1])
+                else:
+                    value = value or self.condition(children[index + 1])
+            return value
+        first = children[0].label
+        if first == "NAO":
+            return not self.condition(children[1])
+        if first == "LPAREN":
+            return self.condition(children[1])
+        return compare(children[1].token.value, self.expression(children[0]), self.expression(children[2]))
+
+    def expression(self, node):
+        children = node.children
+        if node.label == "fator":
+            first = children[0]
+            if first.label == "LPAREN":
+                return self.expression(children[1])
+            if first.label == "NUMINT":
+                return int(first.token.value)
+            if first.label == "NUMREAL":
+                return float(first.token.value)
+            name = first.token.value
+            value = self.variables[name]
+            if len(children) > 1:
+                self.variables[name] = value + 1 if children[1].label == "INCREMENT" else value - 1
+            return value
+        value = self.expression(children[0])
+        for index in range(1, len(children), 2):
+            value = arithmetic(children[index].label, value, self.expression(children[index + 1]))
+        return value
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from lexical.events import NullSink
+from lexical.grammar import (
+    EMPTY,
+    FIRST,
+    FOLLOW,
+    RECOVERY,
+    RECOVERY_BEFORE,
+    RECOVERY_RULE,
+    SPEC,
+    START,
+    Capture,
+    Emit,
+    Expect,
+    Rule,
+    first_of,
+    first_sets,
+    follow_sets,
+    plain_grammar,
+    terminal_kind,
+    token_kind,
+)
+from lexical.parser import Parser, syntax_error
+from lexical.scanner import Scanner
+from lexical.syntax_tree import SyntaxNode
+from lexical.token import TokenType
+from lexical.tree_arena import SyntaxTreeArena
+
+# Parse stack entries are tuples tagged with one of these opcodes:
+# (_TERMINAL, kind, message, label), (_RULE, rule), (_CLOSE, rule),
+# (_CAPTURE,) and (_EMIT, event class).
+_TERMINAL, _RULE, _CLOSE, _CAPTURE, _EMIT = range(5)
+
+
+class CompiledRule:
+    """A rule of the LL(1) table: lookahead kind -> production to push."""
+
+    __slots__ = ("name", "label", "table", "default", "error", "entry", "close")
+
+    def __init__(self, name: str, rule: Rule):
+        self.name = name
+        self.label = name if rule.node else None
+        self.error = rule.error
+        self.table: Dict = {}
+        self.default: Optional[tuple] = None
+        self.entry = (_RULE, self)
+        self.close = (_CLOSE, self)
+
+    def __repr__(self) -> str:
+        return f"CompiledRule({self.name!r})"
+
+
+@dataclass
+class LL1Table:
+    """Compiled parse table; :attr:`conflicts` lists ``(rule, kind, winner, loser)``."""
+
+    rules: Dict[str, CompiledRule]
+    start: CompiledRule
+    conflicts: List[Tuple[str, object, int, int]] = field(default_factory=list)
+
+
+def _terminal_label(kind) -> str:
+    return kind if isinstance(kind, str) else kind.name
+
+
+def _compile_symbol(symbol, rules: Dict[str, CompiledRule]):
+    if isinstance(symbol, Capture):
+        return (_CAPTURE,)
+    if isinstance(symbol, Emit):
+        return (_EMIT, symbol.event)
+    if isinstance(symbol, str) and symbol in rules:
+        return rules[symbol].entry
+    kind = terminal_kind(symbol)
+    label = _terminal_label(kind)
+    message = symbol.message if isinstance(symbol, Expect) else f"esperado '{label}'"
+    return (_TERMINAL, kind, message, label)
+
+
+def build_table(spec: Dict[str, Rule] = SPEC, start: str = START, events: bool = True) -> LL1Table:
+    """Build the LL(1) table of *spec*.
+
+    Productions are stored reversed, ready to be pushed on the parse stack.
+    Without *events*, :class:`Capture` and :class:`Emit` actions are left
+    out so a parser without a sink never executes them.
+    """
+
+    grammar = plain_grammar(spec)
+    first = FIRST if spec is SPEC else first_sets(grammar)
+    follow = FOLLOW if spec is SPEC else follow_sets(grammar, first, start)
+    rules = {name: CompiledRule(name, rule) for name, rule in spec.items()}
+    table = LL1Table(rules, rules[start])
+    for name, rule in spec.items():
+        compiled = rules[name]
+        for index, alternative in enumerate(rule.alternatives):
+            symbols = [
+                symbol for symbol in alternative
+                if events or not isinstance(symbol, (Capture, Emit))
+            ]
+            production = tuple(_compile_symbol(symbol, rules) for symbol in reversed(symbols))
+            lookahead = first_of(grammar[name][index], first)
+            if EMPTY in lookahead:
+                lookahead = (lookahead - {EMPTY}) | follow[name]
+            for kind in lookahead:
+                winner = compiled.table.setdefault(kind, (index, production))[0]
+                if winner != index:
+                    table.conflicts.append((name, kind, winner, index))
+            if index == rule.default_alternative():
+                compiled.default = production
+        compiled.table = {kind: production for kind, (_, production) in compiled.table.items()}
+    return table
+
+
+TABLES = {events: build_table(events=events) for events in (False, True)}
+
+
+class LL1Parser:
+    """Table-driven parser for the grammar in :data:`lexical.grammar.SPEC`.
+
+    Same interface, trees, events and error messages as :class:`Parser`, but
+    the grammar lives in a generated LL(1) table walked by a single loop over
+    an explicit stack. The loop is a generator that is sent one token at a
+    time, so it does not care where the tokens come from.
+    """
+
+    def __init__(
+        self,
+        scanner: Scanner,
+        build_tree: bool = True,
+        sink: Optional[NullSink] = None,
+        arena: Optional[SyntaxTreeArena] = None,
+    ):
+        self.scanner = scanner
+        self.build_tree = build_tree
+        self.sink = sink
+        self.arena = arena
+        self.errors: List[str] = []
+        self.root: Optional[SyntaxNode] = None
+        self.table = TABLES[sink is not None]
+        if not build_tree:
+            self._node = Parser._discarded_node
+        elif arena is not None:
+            self._node = arena.node
+        else:
+            self._node = SyntaxNode
+
+    def parse(self) -> List[str]:
+        driver = self._drive()
+        next(driver)
+        send = driver.send
+        next_token = self.scanner.next_token
+        try:
+            while True:
+                send(next_token())
+        except StopIteration:
+            pass
+        return self.errors
+
+    def _drive(self):
+        # Receives tokens through send(); yields whenever the current token
+        # has been consumed and the next one is needed.
+        new_node = self._node
+        build_tree = self.build_tree
+        sink = self.sink
+        errors = self.errors
+        recovery_rule = self.table.rules[RECOVERY_RULE]
+        holder = SyntaxNode("")
+        nodes = [holder]
+        marks = {}
+        stack = [self.table.start.entry]
+        pop = stack.pop
+        push = stack.append
+        extend = stack.extend
+        token = yield
+        kind = token_kind(token)
+        while stack:
+            entry = pop()
+            op = entry[0]
+            if op == _TERMINAL:
+                if kind == entry[1]:
+                    if build_tree:
+                        nodes[-1].add_child(new_node(entry[3], token=token))
+                    token = yield
+                    kind = token_kind(token)
+                    continue
+                message = entry[2]
+            elif op == _RULE:
+                rule = entry[1]
+                if rule.label is not None:
+                    nodes.append(new_node(rule.label))
+                    push(rule.close)
+                production = rule.table.get(kind, rule.default)
+                if production is not None:
+                    extend(production)
+                    continue
+                message = rule.error
+            elif op == _CLOSE:
+                node = nodes.pop()
+                nodes[-1].add_child(node)
+                continue
+            elif op == _CAPTURE:
+                marks[len(nodes)] = token
+                continue
+            else:
+                sink.emit(entry[1](marks.pop(len(nodes))))
+                continue
+
+            # Syntax error: drop everything above the innermost comando,
+            # skip to a recovery token and let that comando complete.
+            errors.append(syntax_error(token, message))
+            while stack and stack[-1] is not recovery_rule.close:
+                if pop()[0] == _CLOSE:
+                    nodes.pop()
+            if not stack:
+                return
+            recovery = RECOVERY
+            if len(stack) > 1 and stack[-2][0] == _RULE:
+                recovery = RECOVERY_BEFORE.get(stack[-2][1].name, RECOVERY)
+            while token is not None:
+                if kind == TokenType.SEMICOLON:
+                    token = yield
+                    kind = token_kind(token)
+                    break
+                if kind in recovery:
+                    break
+                token = yield
+                kind = token_kind(token)
+
+        if build_tree:
+            self.root = holder.children[0]
+        if token is not None:
+            errors.append(syntax_error(token, "tokens após o fechamento de 'main'."))
+
+
+PARSER_ENGINES = {
+    "recursive": Parser,
+    "ll1": LL1Parser,
+}
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import itertools
+import os
+import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+from lexical.events import AssignmentEvent, BlockParsedEvent, ListSink, NullSink, ReadEvent
+from lexical.parser import Parser
+from lexical.scanner import ENGINES
+from lexical.syntax_tree import SyntaxNode, _gc_paused
+from lexical.token import Token, TokenBuffer, TokenStream, TokenType
+from lexical.tree_arena import NO_NODE, SyntaxTreeArena
+
+MIN_CHUNK_SIZE = 1 << 20
+CHUNKS_PER_WORKER = 4
+
+
+def split_at_newlines(source, parts: int, min_size: int = MIN_CHUNK_SIZE) -> list[tuple[int, int]]:
+    """Cut *source* into at most *parts* ``(start, end)`` ranges ending after a newline.
+
+    No token spans a newline (strings stop with an error there and comments
+    end there), so every range can be scanned on its own.
+    """
+
+    size = len(source)
+    step = max(min_size, -(-size // max(parts, 1)))
+    ranges = []
+    start = 0
+    while start < size:
+        cut = start + step
+        if cut >= size:
+            ranges.append((start, size))
+            break
+        newline = source.find(b"\n", cut - 1)
+        end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _lex_range(path: str, start: int, end: int, engine: str) -> TokenBuffer:
+    # Only the columns are merged, so the chunk's own map can go.
+    with ENGINES[engine](path, start, end) as scanner:
+        return TokenBuffer.from_scanner(scanner)
+
+
+def parallel_tokenize(path: str, workers: int | None = None, engine: str = "regex") -> TokenBuffer:
+    """Lex *path* in newline-aligned chunks spread over a process pool.
+
+    Chunks are scanned with the selected ``Scanner`` engine and merged in
+    file order. Offsets are absolute, so the merged buffer resolves
+    positions through the file's own ``SourceMap``; wrap it in a
+    ``TokenStream`` to feed the ``Parser``.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    scanner = ENGINES[engine](path)
+    merged = TokenBuffer(scanner.source_code, scanner.source_map)
+    ranges = split_at_newlines(scanner.source_code, workers * CHUNKS_PER_WORKER)
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            merged.extend(_lex_range(path, start, end, engine))
+        return merged
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_lex_range, path, start, end, engine) for start, end in ranges]
+        for future in futures:
+            merged.extend(future.result())
+    return merged
+
+
+MIN_PARSE_TOKENS = 50_000
+_EVENTS = {event.kind: event for event in (AssignmentEvent, ReadEvent)}
+_TOKEN_TYPES = {int(token_type): token_type for token_type in TokenType}
+# Braces and semicolons, as token type bytes.
+_STRUCTURE_RE = re.compile(b"[" + bytes([TokenType.LBRACE, TokenType.RBRACE, TokenType.SEMICOLON]) + b"]")
+
+
+def _header_end(tokens: TokenBuffer) -> int | None:
+    """Index after ``main { var { ... }``, if the header is free of syntax errors."""
+
+    types = tokens.types
+    size = len(types)
+    if size < 4 or [types[1], types[3]] != [TokenType.LBRACE, TokenType.LBRACE]:
+        return None
+    if (types[0], tokens.value(0), types[2], tokens.value(2)) != (TokenType.RESERVED, "main", TokenType.RESERVED, "var"):
+        return None
+    index = 4
+    # One or more 'IDENTIFIER : int|real ;'.
+    while index + 3 < size and types[index] == TokenType.IDENTIFIER:
+        if types[index + 1] != TokenType.COLON or types[index + 3] != TokenType.SEMICOLON:
+            return None
+        if types[index + 2] != TokenType.RESERVED or tokens.value(index + 2) not in ("int", "real"):
+            return None
+        index += 4
+    if index == 4 or index >= size or types[index] != TokenType.RBRACE:
+        return None
+    return index + 1
+
+
+def top_level_cuts(tokens: TokenBuffer, start: int) -> list[int]:
+    """Token indexes from *start* on where a statement of the program body starts.
+
+    A statement ends at a ';' or a '}' at brace depth 0 that 'else' does
+    not follow. The last index is where the statements stop: at the '}'
+    closing 'main', or at whatever follows the last complete statement.
+    Only braces and semicolons are visited.
+    """
+
+    types = tokens.types
+    # One byte per token (types are small), for the regex to search.
+    kinds = bytes(types.tolist())
+    size = len(kinds)
+    lbrace, rbrace = TokenType.LBRACE, TokenType.RBRACE
+    cuts = [start]
+    depth = 0
+    for m in _STRUCTURE_RE.finditer(kinds, start):
+        index = m.start()
+        kind = kinds[index]
+        if kind == lbrace:
+            depth += 1
+            continue
+        if kind == rbrace:
+            depth -= 1
+            if depth < 0:
+                break
+        if depth == 0:
+            following = index + 1
+            if following < size and types[following] == TokenType.RESERVED and tokens.value(following) == "else":
+                continue
+            cuts.append(following)
+    return cuts
+
+
+def _parse_range(path: str, start: int, end: int, engine: str, build_tree: bool, events: bool):
+    # Statements in [start, end) bytes, or None if they need the sequential
+    # parser: any error, or anything the statement list does not consume.
+    # The tree goes back as its arena, whose columns pickle as plain arrays.
+    sink = ListSink() if events else None
+    arena = SyntaxTreeArena() if build_tree else None
+    with ENGINES[engine](path, start, end) as scanner:
+        parser = Parser(scanner, build_tree=build_tree, sink=sink, arena=arena)
+        parser.listaComandos()
+        if parser.errors or parser.current is not None:
+            return None
+        return arena, [(event.kind, event.token.offset) for event in sink.events] if events else []
+
+
+def _arena_statements(arena: SyntaxTreeArena, tokens: TokenBuffer) -> list:
+    # The comando nodes under the arena's listaComandos (its first node),
+    # as SyntaxNodes whose tokens resolve through *tokens*' source.
+    buffer = TokenBuffer(tokens.source, tokens.source_map)
+    buffer.extend(arena.tokens)
+    value = buffer.value
+    source_map = tokens.source_map
+    token_types = _TOKEN_TYPES
+    token_list = [
+        Token(token_types[token_type], value(index), offset, length, source_map)
+        for index, (token_type, offset, length) in enumerate(zip(buffer.types, buffer.offsets, buffer.lengths))
+    ]
+    names = arena.label_names
+    nodes = [
+        SyntaxNode(names[label], [], None if token_index == NO_NODE else token_list[token_index])
+        for label, token_index in zip(arena.labels, arena.token_indexes)
+    ]
+    first_child = arena.first_child
+    next_sibling = arena.next_sibling
+    for node, child in zip(nodes, first_child):
+        children = node.children
+        while child != NO_NODE:
+            children.append(nodes[child])
+            child = next_sibling[child]
+    return nodes[0].children
+
+
+class _ResumedParser(Parser):
+    """Parses the header and whatever follows the statements parsed in parallel.
+
+    Its token stream skips those statements; *statements* holds their
+    comando nodes and *events* their events, which are emitted between the
+    declarations and the rest, as the sequential parser would.
+    """
+
+    def __init__(self, scanner, statements: list, parsed: bool, events: list, **options):
+        self._parsed_statements = statements
+        self._parsed = parsed
+        self._parsed_events = events
+        super().__init__(scanner, **options)
+
+    def corpo(self):
+        node = self._node("corpo")
+        start = self.current
+        node.add_child(self.secaoDeclaracoes())
+        if self.sink is not None:
+            for event in self._parsed_events:
+                self.sink.emit(event)
+        if self._parsed and self.kind not in self._COMANDO_FIRST:
+            statements = self._node("listaComandos")
+        else:
+            statements = self.listaComandos()
+        if self.build_tree:
+            statements.children[:0] = self._parsed_statements
+        node.add_child(statements)
+        if self.sink is not None:
+            self.sink.emit(BlockParsedEvent(start))
+        return node
+
+
+def parallel_parse(
+    path: str,
+    workers: int | None = None,
+    engine: str = "regex",
+    build_tree: bool = True,
+    sink: NullSink | None = None,
+) -> Parser:
+    """Parse *path* with its top-level statements split over a process pool.
+
+    Tokens come from :func:`parallel_tokenize`. The body is cut between
+    top-level statements (see :func:`top_level_cuts`) into ranges that
+    workers lex and parse with the recursive-descent ``comando`` rules,
+    sending back their subtrees as :class:`SyntaxTreeArena` columns. From the
+    first range with an error on, parsing is sequential, so errors and
+    recovery match a plain :class:`Parser`, as does the tree. Returns the
+    parser after ``parse()``; use its ``errors`` and ``root``.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    tokens = parallel_tokenize(path, workers, engine=engine)
+    header = _header_end(tokens)
+    if header is None:
+        parser = Parser(TokenStream(tokens), build_tree=build_tree, sink=sink)
+        parser.parse()
+        return parser
+    cuts = top_level_cuts(tokens, header)
+    # Ranges of whole statements, about CHUNKS_PER_WORKER per worker.
+    step = max(MIN_PARSE_TOKENS, -(-(cuts[-1] - header) // (workers * CHUNKS_PER_WORKER)))
+    ranges = []
+    first = header
+    for cut in cuts[1:]:
+        if cut - first >= step or cut == cuts[-1]:
+            ranges.append((first, cut))
+            first = cut
+    offsets = tokens.offsets
+    jobs = []
+    for first, end in ranges:
+        end_offset = offsets[end] if end < len(offsets) else len(tokens.source)
+        jobs.append((path, offsets[first], end_offset, engine, build_tree, sink is not None))
+    statements = []
+    events = []
+    resume = header
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+    try:
+        results = pool.map(_parse_range, *zip(*jobs)) if pool is not None else (_parse_range(*job) for job in jobs)
+        for (_, end), result in zip(ranges, results):
+            if result is None:
+                break
+            arena, range_events = result
+            if arena is not None:
+                with _gc_paused():
+                    statements.extend(_arena_statements(arena, tokens))
+            for kind, offset in range_events:
+                events.append(_EVENTS[kind](tokens[bisect_left(offsets, offset)]))
+            resume = end
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    indexes = itertools.chain(range(header), range(resume, len(tokens)))
+    parser = _ResumedParser(
+        TokenStream(map(tokens.__getitem__, indexes)),
+        statements,
+        resume > header,
+        events,
+        build_tree=build_tree,
+        sink=sink,
+    )
+    parser.parse()
+    return parser
@@ -1,22 +1,62 @@
 from typing import Optional
 
+from lexical.events import AssignmentEvent, BlockParsedEvent, DeclarationEvent, NullSink, ReadEvent
+from lexical.grammar import FIRST, FOLLOW, RECOVERY, RECOVERY_ELSE, token_kind
 from lexical.scanner import Scanner
 from lexical.token import TokenType, Token
-from lexical.syntax_tree import SyntaxNode
+from lexical.syntax_tree import DISCARDED_NODE, SyntaxNode
+from lexical.tree_arena import SyntaxTreeArena
 
 class ParseError(Exception):
     pass
 
+def syntax_error(token: Optional[Token], message: str) -> str:
+    if token is None:
+        return f"[EOF] Erro sintático: {message}"
+    return f"[linha {token.line}, col {token.column}] Erro sintático perto de '{token.value}': {message}"
+
+def semantic_error(token: Token, message: str) -> str:
+    return f"[linha {token.line}, col {token.column}] Erro semântico perto de '{token.value}': {message}"
+
+_LISTA, _COMANDO, _BLOCO, _CONDICIONAL, _REPETICAO = range(5)
+_FRAME_LABELS = ("listaComandos", "comando", "bloco", "condicional", "repeticao")
+_RELACIONAL, _NAO, _PARENTESES = range(3)
+
+_ARITH_RULES = ("expressaoAritmetica", "termo")
+_ARITH_BINDING = {"+": 0, "-": 0, "*": 1, "/": 1}
+
 class Parser:
-    def __init__(self, scanner: Scanner):
+    def __init__(
+        self,
+        scanner: Scanner,
+        build_tree: bool = True,
+        sink: Optional[NullSink] = None,
+        arena: Optional[SyntaxTreeArena] = None,
+    ):
         self.scanner = scanner
+        self.build_tree = build_tree
+        self.sink = sink
+        self.arena = arena
         self.current = None
         self.errors = []
         self.root: Optional[SyntaxNode] = None
+        # Without a tree every rule gets the same shared stand-in node, so
+        # recognizing a program allocates nothing per rule or token.
+        if not build_tree:
+            self._node = self._discarded_node
+        elif arena is not None:
+            self._node = arena.node
+        else:
+            self._node = SyntaxNode
         self._advance()
 
+    @staticmethod
+    def _discarded_node(label: str, token: Optional[Token] = None):
+        return DISCARDED_NODE
+
     def _advance(self):
-        self.current = self.scanner.next_token()
+        token = self.current = self.scanner.next_token()
+        self.kind = token_kind(token)
 
     def _check(self, *types):
         return self.current is not None and self.current.type in types
@@ -25,12 +65,14 @@ class Parser:
         return self.current is not None and self.current.type == TokenType.RESERVED and self.current.value in kws
 
     def _token_node(self, token: Token, label: str | None = None) -> SyntaxNode:
+        if not self.build_tree:
+            return DISCARDED_NODE
         if label is None:
             if token.type == TokenType.RESERVED:
                 label = str(token.value)
             else:
-                label = token.type
-        return SyntaxNode(label, token=token)
+                label = token.type.name
+        return self._node(label, token=token)
 
     def _match(self, *types, capture: bool = True, label: str | None = None):
         if self._check(*types):
@@ -67,24 +109,23 @@ class Parser:
         raise ParseError()
 
     def _error_here(self, message):
-        if self.current is None:
-            self.errors.append(f"[EOF] Erro sintático: {message}")
-        else:
-            self.errors.append(f"[linha {self.current.line}, col {self.current.column}] Erro sintático perto de '{self.current.value}': {message}")
+        self.errors.append(syntax_error(self.current, message))
 
-    def _synchronize(self):
+    def _synchronize(self, recovery=frozenset()):
+        # Panic mode: skip to the end of the broken statement or to a token
+        # in *recovery*.
         while self.current is not None:
-            if self._match(TokenType.SEMICOLON, capture=False):
+            if self.kind == TokenType.SEMICOLON:
+                self._advance()
                 return
-            if self._check_kw("if", "while", "print", "input", "var"):
-                return
-            if self._check(TokenType.RBRACE):
+            if self.kind in recovery:
                 return
             self._advance()
 
     def parse(self):
         try:
-            self.root = self.programa()
+            root = self.programa()
+            self.root = root if self.build_tree else None
             if self.current is not None:
                 self._error_here("tokens após o fechamento de 'main'.")
         except ParseError:
@@ -93,7 +134,7 @@ class Parser:
         return self.errors
 
     def programa(self):
-        node = SyntaxNode("programa")
+        node = self._node("programa")
         node.add_child(self._consume_kw("main", "esperado 'main' no início do programa"))
         node.add_child(self._consume(TokenType.LBRACE, "esperado '{' após 'main'"))
         node.add_child(self.corpo())
@@ -101,14 +142,16 @@ class Parser:
         return node
 
     def corpo(self):
-        node = SyntaxNode("corpo")
+        node = self._node("corpo")
+        start = self.current
         node.add_child(self.secaoDeclaracoes())
         node.add_child(self.listaComandos())
-        print("Bloco de comandos analisado")
+        if self.sink is not None:
+            self.sink.emit(BlockParsedEvent(start))
         return node
 
     def secaoDeclaracoes(self):
-        node = SyntaxNode("secaoDeclaracoes")
+        node = self._node("secaoDeclaracoes")
         node.add_child(self._consume_kw("var", "esperado 'var' no início da seção de declarações"))
         node.add_child(self._consume(TokenType.LBRACE, "esperado '{' após 'var'"))
         node.add_child(self.listaDeclaracoes())
@@ -116,27 +159,27 @@ class Parser:
         return node
 
     def listaDeclaracoes(self):
-        node = SyntaxNode("listaDeclaracoes")
+        node = self._node("listaDeclaracoes")
         node.add_child(self.declaracao())
         while self._check(TokenType.IDENTIFIER):
             node.add_child(self.declaracao())
         return node
 
     def declaracao(self):
-        node = SyntaxNode("declaracao")
-        identificador = self._consume(
+        node = self._node("declaracao")
+        identificador = self.current
+        node.add_child(self._consume(
             TokenType.IDENTIFIER, "esperado identificador na declaração"
-        )
-        node.add_child(identificador)
-        if identificador is not None and identificador.token is not None:
-            print(f"Declarado identificador: {identificador.token.value}")
+        ))
+        if self.sink is not None:
+            self.sink.emit(DeclarationEvent(identificador))
         node.add_child(self._consume(TokenType.COLON, "esperado ':' após identificador"))
         node.add_child(self.tipo())
         node.add_child(self._consume(TokenType.SEMICOLON, "esperado ';' ao final da declaração"))
         return node
 
     def tipo(self):
-        node = SyntaxNode("tipo")
+        node = self._node("tipo")
         tipo_node = self._match_kw("int", "real")
         if tipo_node is None:
             self._error_here("esperado tipo 'int' ou 'real'")
@@ -145,69 +188,125 @@ class Parser:
         return node
 
     def listaComandos(self):
-        node = SyntaxNode("listaComandos")
-        node.add_child(self.comando())
-        while (
-            self._check(TokenType.LBRACE)
-            or self._check(TokenType.IDENTIFIER)
-            or self._check_kw("input", "print", "if", "while")
-        ):
-            node.add_child(self.comando())
-        return node
+        return self._statements(_LISTA, self._node("listaComandos"))
 
     def comando(self):
-        node = SyntaxNode("comando")
-        try:
-            if self._check(TokenType.IDENTIFIER):
-                node.add_child(self.atribuicao())
-            elif self._check_kw("input"):
-                node.add_child(self.leitura())
-            elif self._check_kw("print"):
-                node.add_child(self.escrita())
-            elif self._check_kw("if"):
-                node.add_child(self.condicional())
-            elif self._check_kw("while"):
-                node.add_child(self.repeticao())
-            elif self._check(TokenType.LBRACE):
-                node.add_child(self.bloco())
-            else:
-                self._error_here("comando inválido")
-                raise ParseError()
-        except ParseError:
-            self._synchronize()
+        return self._statements(_COMANDO, self._node("comando"))
+
+    def _statements(self, kind, node):
+        # Nested listaComandos / comando / bloco / condicional / repeticao
+        # rules run on an explicit stack of [kind, node, phase] frames, so
+        # nesting depth is bounded by memory rather than the recursion limit.
+        # A frame's node is attached to its parent only once the frame
+        # completes; a ParseError unwinds to the innermost comando, which
+        # synchronizes and completes as if its rule had returned.
+        stack = [[kind, node, 0]]
+        while True:
+            frame = stack[-1]
+            kind, node, phase = frame
+            try:
+                if kind == _LISTA:
+                    if phase == 0 or self.kind in self._COMANDO_FIRST:
+                        frame[2] = 1
+                        stack.append([_COMANDO, self._node("comando"), 0])
+                        continue
+                elif kind == _COMANDO:
+                    if phase == 0:
+                        frame[2] = 1
+                        if self._open_comando(node, stack):
+                            continue
+                elif kind == _CONDICIONAL:
+                    if phase == 1:
+                        else_node = self._match_kw("else")
+                        if else_node is not None:
+                            node.add_child(else_node)
+                            frame[2] = 2
+                            stack.append([_COMANDO, self._node("comando"), 0])
+                            continue
+                elif kind == _BLOCO:
+                    node.add_child(self._consume(TokenType.RBRACE, "esperado '}' para finalizar bloco"))
+            except ParseError:
+                while stack[-1][0] != _COMANDO:
+                    stack.pop()
+                # FOLLOW(comando), except that 'else' only counts when the
+                # enclosing condicional can still take it.
+                recovery = self._RECOVERY
+                if len(stack) > 1 and stack[-2][0] == _CONDICIONAL and stack[-2][2] == 1:
+                    recovery = self._RECOVERY_ELSE
+                self._synchronize(recovery)
+                kind, node = _COMANDO, stack[-1][1]
+            stack.pop()
+            if kind == _COMANDO and self._comando_done is not None:
+                self._comando_done(node)
+            if not stack:
+                return node
+            stack[-1][1].add_child(node)
+
+    def _open_comando(self, node, stack):
+        """Start the statement at the current token; return True if it pushed frames."""
+
+        rule = self._COMANDO_RULES.get(self.kind)
+        if rule is None:
+            self._error_here("comando inválido")
+            raise ParseError()
+        method, kind, body = rule
+        child = method(self)
+        if kind is None:
+            node.add_child(child)
+            return False
+        stack.append([kind, child, 1])
+        stack.append([body, self._node(_FRAME_LABELS[body]), 0])
+        return True
+
+    def _condicional_header(self):
+        node = self._node("condicional")
+        node.add_child(self._consume_kw("if", "esperado 'if'"))
+        node.add_child(self.expressaoRelacional())
+        node.add_child(self._consume_kw("then", "esperado 'then' após condição do if"))
+        return node
+
+    def _repeticao_header(self):
+        node = self._node("repeticao")
+        node.add_child(self._consume_kw("while", "esperado 'while'"))
+        node.add_child(self.expressaoRelacional())
+        return node
+
+    def _bloco_header(self):
+        node = self._node("bloco")
+        node.add_child(self._consume(TokenType.LBRACE, "esperado '{' para iniciar bloco"))
         return node
 
     def atribuicao(self):
-        node = SyntaxNode("atribuicao")
-        identificador = self._consume(
+        node = self._node("atribuicao")
+        identificador = self.current
+        node.add_child(self._consume(
             TokenType.IDENTIFIER, "esperado identificador na atribuição"
-        )
-        node.add_child(identificador)
+        ))
         node.add_child(self._consume(TokenType.ASSIGN_LEFT, "esperado '<-' após identificador"))
         node.add_child(self.expressaoAritmetica())
         node.add_child(self._consume(TokenType.SEMICOLON, "esperado ';' ao final da atribuição"))
-        if identificador is not None and identificador.token is not None:
-            print(f"Atribuição feita para: {identificador.token.value}")
+        if self.sink is not None:
+            self.sink.emit(AssignmentEvent(identificador))
         return node
 
     def leitura(self):
-        node = SyntaxNode("leitura")
+        node = self._node("leitura")
         node.add_child(self._consume_kw("input", "esperado 'input'"))
         node.add_child(self._consume(TokenType.LPAREN, "esperado '(' após 'input'"))
-        identificador = self._consume(
+        identificador = self.current
+        node.add_child(self._consume(
             TokenType.IDENTIFIER,
             "esperado identificador dentro de input(...)",
             label="IDENTIFIER",
-        )
-        node.add_child(identificador)
+        ))
         node.add_child(self._consume(TokenType.RPAREN, "esperado ')' após input(...)", label="RPAREN"))
         node.add_child(self._consume(TokenType.SEMICOLON, "esperado ';' ao final de input(...)"))
-        if identificador is not None and identificador.token is not None:
-            print(f"Leitura de variável: {identificador.token.value}")
+        if self.sink is not None:
+            self.sink.emit(ReadEvent(identificador))
         return node
 
     def escrita(self):
-        node = SyntaxNode("escrita")
+        node = self._node("escrita")
         node.add_child(self._consume_kw("print", "esperado 'print'"))
         node.add_child(self._consume(TokenType.LPAREN, "esperado '(' após 'print'"))
         value_node = self._match(TokenType.IDENTIFIER, TokenType.STRING)
@@ -219,101 +318,123 @@ class Parser:
         node.add_child(self._consume(TokenType.SEMICOLON, "esperado ';' ao final de print(...)"))
         return node
 
-    def condicional(self):
-        node = SyntaxNode("condicional")
-        node.add_child(self._consume_kw("if", "esperado 'if'"))
-        node.add_child(self.expressaoRelacional())
-        node.add_child(self._consume_kw("then", "esperado 'then' após condição do if"))
-        node.add_child(self.comando())
-        else_node = self._match_kw("else")
-        if else_node is not None:
-            node.add_child(else_node)
-            node.add_child(self.comando())
-        return node
-
-    def repeticao(self):
-        node = SyntaxNode("repeticao")
-        node.add_child(self._consume_kw("while", "esperado 'while'"))
-        node.add_child(self.expressaoRelacional())
-        node.add_child(self.comando())
-        return node
-
-    def bloco(self):
-        node = SyntaxNode("bloco")
-        node.add_child(self._consume(TokenType.LBRACE, "esperado '{' para iniciar bloco"))
-        node.add_child(self.listaComandos())
-        node.add_child(self._consume(TokenType.RBRACE, "esperado '}' para finalizar bloco"))
-        return node
-
     def expressaoAritmetica(self):
-        node = SyntaxNode("expressaoAritmetica")
-        node.add_child(self.termo())
-        while self._check(TokenType.MATH_OPERATOR) and self.current.value in {"+", "-"}:
-            op_token = self.current
-            self._advance()
-            node.add_child(self._token_node(op_token, label=str(op_token.value)))
-            node.add_child(self.termo())
-        return node
-
-    def termo(self):
-        node = SyntaxNode("termo")
-        node.add_child(self.fator())
-        while self._check(TokenType.MATH_OPERATOR) and self.current.value in {"*", "/"}:
+        # Precedence climbing over _ARITH_RULES: levels[i] is the open node
+        # of rule i (expressaoAritmetica, termo). An operator of binding b
+        # closes the deeper levels, joins levels[b] and reopens the rest.
+        # Parenthesized factors save the enclosing levels on a stack.
+        new_node = self._node
+        levels = [new_node(rule) for rule in _ARITH_RULES]
+        parens = []
+        while True:
+            node = new_node("fator")
+            value_node = self._match(TokenType.NUMINT, TokenType.NUMREAL)
+            if value_node is not None:
+                node.add_child(value_node)
+            elif self._check(TokenType.IDENTIFIER):
+                identifier = self.current
+                self._advance()
+                node.add_child(self._token_node(identifier))
+                inc_dec = self._match(TokenType.INCREMENT, TokenType.DECREMENT)
+                if inc_dec is not None:
+                    node.add_child(inc_dec)
+            elif self._check(TokenType.LPAREN):
+                node.add_child(self._consume(TokenType.LPAREN, "esperado '(' antes da expressão", label="LPAREN"))
+                parens.append((node, levels))
+                levels = [new_node(rule) for rule in _ARITH_RULES]
+                continue
+            else:
+                self._error_here("esperado fator (número, identificador ou '(expr)')")
+                raise ParseError()
+            while True:
+                levels[-1].add_child(node)
+                current = self.current
+                binding = None
+                if current is not None and current.type == TokenType.MATH_OPERATOR:
+                    binding = _ARITH_BINDING.get(current.value)
+                if binding is not None:
+                    break
+                for depth in range(len(levels) - 1, 0, -1):
+                    levels[depth - 1].add_child(levels[depth])
+                if not parens:
+                    return levels[0]
+                node, outer = parens.pop()
+                node.add_child(levels[0])
+                node.add_child(self._consume(TokenType.RPAREN, "esperado ')' após expressão", label="RPAREN"))
+                levels = outer
+            for depth in range(len(levels) - 1, binding, -1):
+                levels[depth - 1].add_child(levels[depth])
             op_token = self.current
             self._advance()
-            node.add_child(self._token_node(op_token, label=str(op_token.value)))
-            node.add_child(self.fator())
-        return node
-
-    def fator(self):
-        node = SyntaxNode("fator")
-        value_node = self._match(TokenType.NUMINT, TokenType.NUMREAL)
-        if value_node is not None:
-            node.add_child(value_node)
-            return node
-        if self._check(TokenType.IDENTIFIER):
-            identifier = self.current
-            self._advance()
-            node.add_child(self._token_node(identifier))
-            inc_dec = self._match(TokenType.INCREMENT, TokenType.DECREMENT)
-            if inc_dec is not None:
-                node.add_child(inc_dec)
-            return node
-        if self._check(TokenType.LPAREN):
-            node.add_child(self._consume(TokenType.LPAREN, "esperado '(' antes da expressão", label="LPAREN"))
-            node.add_child(self.expressaoAritmetica())
-            node.add_child(self._consume(TokenType.RPAREN, "esperado ')' após expressão", label="RPAREN"))
-            return node
-        self._error_here("esperado fator (número, identificador ou '(expr)')")
-        raise ParseError()
+            levels[binding].add_child(self._token_node(op_token, label=str(op_token.value)))
+            for depth in range(binding + 1, len(levels)):
+                levels[depth] = new_node(_ARITH_RULES[depth])
 
     def expressaoRelacional(self):
-        node = SyntaxNode("expressaoRelacional")
-        node.add_child(self.termoRelacional())
-        while self._check_kw("E", "OU"):
-            connector = self.current
-            self._advance()
-            node.add_child(self._token_node(connector, label=str(connector.value)))
-            node.add_child(self.termoRelacional())
-        return node
-
-    def termoRelacional(self):
-        node = SyntaxNode("termoRelacional")
-        nao_node = self._match_kw("NAO")
-        if nao_node is not None:
-            node.add_child(nao_node)
-            node.add_child(self.termoRelacional())
-            return node
-        if self._check(TokenType.LPAREN):
-            node.add_child(self._consume(TokenType.LPAREN, "esperado '(' antes da expressão relacional", label="LPAREN"))
-            node.add_child(self.expressaoRelacional())
-            node.add_child(self._consume(TokenType.RPAREN, "esperado ')' após expressão relacional", label="RPAREN"))
-            return node
-        node.add_child(self.expressaoAritmetica())
-        rel_op = self._match(TokenType.REL_OPERATOR)
-        if rel_op is None:
-            self._error_here("esperado operador relacional (>, <, >=, <=, ==, !=)")
-            raise ParseError()
-        node.add_child(rel_op)
-        node.add_child(self.expressaoAritmetica())
-        return node
+        # termoRelacional nests through NAO and parentheses; the open nodes
+        # wait on an explicit stack of (kind, node) frames instead of
+        # recursive calls.
+        stack = [(_RELACIONAL, self._node("expressaoRelacional"))]
+        while True:
+            term = self._node("termoRelacional")
+            nao_node = self._match_kw("NAO")
+            if nao_node is not None:
+                term.add_child(nao_node)
+                stack.append((_NAO, term))
+                continue
+            if self._check(TokenType.LPAREN):
+                term.add_child(self._consume(TokenType.LPAREN, "esperado '(' antes da expressão relacional", label="LPAREN"))
+                stack.append((_PARENTESES, term))
+                stack.append((_RELACIONAL, self._node("expressaoRelacional")))
+                continue
+            term.add_child(self.expressaoAritmetica())
+            rel_op = self._match(TokenType.REL_OPERATOR)
+            if rel_op is None:
+                self._error_here("esperado operador relacional (>, <, >=, <=, ==, !=)")
+                raise ParseError()
+            term.add_child(rel_op)
+            term.add_child(self.expressaoAritmetica())
+            done = term
+            while True:
+                kind, node = stack[-1]
+                if kind == _NAO:
+                    node.add_child(done)
+                    stack.pop()
+                    done = node
+                    continue
+                if kind == _PARENTESES:
+                    node.add_child(done)
+                    node.add_child(self._consume(TokenType.RPAREN, "esperado ')' após expressão relacional", label="RPAREN"))
+                    stack.pop()
+                    done = node
+                    continue
+                node.add_child(done)
+                if not self._check_kw("E", "OU"):
+                    stack.pop()
+                    if not stack:
+                        return node
+                    done = node
+                    continue
+                connector = self.current
+                self._advance()
+                node.add_child(self._token_node(connector, label=str(connector.value)))
+                break
+
+    FIRST = FIRST
+    FOLLOW = FOLLOW
+    _COMANDO_FIRST = FIRST["comando"]
+    _RECOVERY = RECOVERY
+    _RECOVERY_ELSE = RECOVERY_ELSE
+    # FIRST(comando) kind -> (rule, frame kind of a compound statement,
+    # frame kind of its body).
+    _COMANDO_RULES = {
+        TokenType.IDENTIFIER: (atribuicao, None, None),
+        "input": (leitura, None, None),
+        "print": (escrita, None, None),
+        "if": (_condicional_header, _CONDICIONAL, _COMANDO),
+        "while": (_repeticao_header, _REPETICAO, _COMANDO),
+        TokenType.LBRACE: (_bloco_header, _BLOCO, _LISTA),
+    }
+    # Called with each comando node as it completes; subclasses that track
+    # statements (see lexical.incremental) set it to a method.
+    _comando_done = None
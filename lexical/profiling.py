@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+from time import perf_counter
+from typing import Dict, List, TextIO
+
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+
+# Rule methods timed by ProfiledParser. Rules the parser runs inline
+# (termo, fator, termoRelacional, the body lists of blocos) are part of
+# the enclosing rule's self time.
+RULE_METHODS = (
+    "programa",
+    "corpo",
+    "secaoDeclaracoes",
+    "listaDeclaracoes",
+    "declaracao",
+    "tipo",
+    "listaComandos",
+    "atribuicao",
+    "leitura",
+    "escrita",
+    "expressaoAritmetica",
+    "expressaoRelacional",
+)
+# Headers of compound statements open their rule, which stays open until
+# the enclosing comando completes.
+HEADER_METHODS = {
+    "_condicional_header": "condicional",
+    "_repeticao_header": "repeticao",
+    "_bloco_header": "bloco",
+}
+SCANNER_FRAME = "next_token"
+STATE_NAMES = {0: "start", 1: "word", 3: "integer", 4: "real"}
+
+
+class RuleStats:
+    __slots__ = ("calls", "total", "self_time", "tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.tokens = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total,
+            "self_seconds": self.self_time,
+            "tokens": self.tokens,
+        }
+
+
+class Profile:
+    """Timings collected by :class:`ProfiledParser` and profiled scanners.
+
+    For each rule: calls, cumulative time (a rule already on the stack is
+    not counted twice), self time and tokens consumed. Self time is also
+    kept per rule stack, for flamegraph tools. For the scanner: tokens and
+    time per token type, and time per state of the character automaton.
+    """
+
+    def __init__(self):
+        self.rules: Dict[str, RuleStats] = {}
+        self.stacks: Dict[str, float] = {}
+        self.token_counts: Dict[str, int] = {}
+        self.token_seconds: Dict[str, float] = {}
+        self.state_seconds: Dict[str, float] = {}
+        # Open frames: [name, path, start time, child time, tokens at start].
+        self._frames: List[list] = []
+        self._active: Dict[str, int] = {}
+
+    def enter(self, name: str, tokens: int) -> None:
+        frames = self._frames
+        path = f"{frames[-1][1]};{name}" if frames else name
+        frames.append([name, path, perf_counter(), 0.0, tokens])
+        self._active[name] = self._active.get(name, 0) + 1
+
+    def exit(self, tokens: int) -> str:
+        now = perf_counter()
+        name, path, start, children, first_token = self._frames.pop()
+        elapsed = now - start
+        stats = self.rules.get(name)
+        if stats is None:
+            stats = self.rules[name] = RuleStats()
+        stats.calls += 1
+        stats.self_time += elapsed - children
+        active = self._active[name] = self._active[name] - 1
+        if not active:
+            stats.total += elapsed
+            stats.tokens += tokens - first_token
+        self.stacks[path] = self.stacks.get(path, 0.0) + elapsed - children
+        if self._frames:
+            self._frames[-1][3] += elapsed
+        return name
+
+    def to_dict(self) -> dict:
+        rules = sorted(self.rules.items(), key=lambda item: item[1].self_time, reverse=True)
+        return {
+            "rules": {name: stats.to_dict() for name, stats in rules},
+            "scanner": {
+                "tokens": {
+                    kind: {"count": count, "seconds": self.token_seconds[kind]}
+                    for kind, count in sorted(self.token_counts.items())
+                },
+                "states": dict(sorted(self.state_seconds.items())),
+            },
+        }
+
+    def write_json(self, stream: TextIO) -> None:
+        json.dump(self.to_dict(), stream, indent=2)
+        stream.write("\n")
+
+    def write_collapsed(self, stream: TextIO) -> None:
+        """One ``rule;rule;... microseconds`` line per stack (flamegraph.pl, speedscope)."""
+
+        for path, seconds in sorted(self.stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros:
+                stream.write(f"{path} {micros}\n")
+
+
+def _rule(method, name: str):
+    def profiled(self, *args, **kwargs):
+        self.profile.enter(name, self._consumed)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.profile.exit(self._consumed)
+
+    profiled.__name__ = method.__name__
+    return profiled
+
+
+def _header(method, name: str):
+    def profiled(self):
+        self.profile.enter(name, self._consumed)
+        return method(self)
+
+    profiled.__name__ = method.__name__
+    return profiled
+
+
+class ProfiledParser(Parser):
+    """:class:`Parser` that records a :class:`Profile` as it runs.
+
+    The rule methods are wrapped in this subclass only, so the plain parser
+    carries no instrumentation at all.
+    """
+
+    def __init__(self, scanner, build_tree=True, sink=None, arena=None, profile: Profile | None = None):
+        self.profile = Profile() if profile is None else profile
+        self._consumed = 0
+        super().__init__(scanner, build_tree=build_tree, sink=sink, arena=arena)
+
+    def _advance(self):
+        profile = self.profile
+        profile.enter(SCANNER_FRAME, self._consumed)
+        try:
+            super()._advance()
+            self._consumed += 1
+        finally:
+            profile.exit(self._consumed)
+
+    def _open_comando(self, node, stack):
+        self.profile.enter("comando", self._consumed)
+        return super()._open_comando(node, stack)
+
+    def _comando_done(self, node):
+        # Closes the comando and whichever compound rule its header opened.
+        while self.profile.exit(self._consumed) != "comando":
+            pass
+
+
+for _name in RULE_METHODS:
+    setattr(ProfiledParser, _name, _rule(getattr(Parser, _name), _name))
+for _name, _label in HEADER_METHODS.items():
+    setattr(ProfiledParser, _name, _header(getattr(Parser, _name), _label))
+# Statements are dispatched through this table, which holds the plain
+# parser's functions; point it at the wrapped ones.
+ProfiledParser._COMANDO_RULES = {
+    kind: (getattr(ProfiledParser, method.__name__), frame, body)
+    for kind, (method, frame, body) in Parser._COMANDO_RULES.items()
+}
+del _name, _label
+
+
+class _ScannerProfiling:
+    # Mixed in front of a scanner engine by profiled_scanner().
+    profile: Profile
+
+    def next_token(self):
+        start = self._mark = perf_counter()
+        self._mark_state = 0
+        token = super().next_token()
+        end = perf_counter()
+        self._charge(end)
+        if token is not None:
+            kind = token.type.name
+            profile = self.profile
+            profile.token_counts[kind] = profile.token_counts.get(kind, 0) + 1
+            profile.token_seconds[kind] = profile.token_seconds.get(kind, 0.0) + end - start
+        return token
+
+    def next_char(self):
+        # Time since the previous character was spent in the state the
+        # automaton was in when it read it.
+        self._charge(perf_counter())
+        self._mark_state = self.state
+        return super().next_char()
+
+    def _charge(self, now: float) -> None:
+        state = STATE_NAMES.get(self._mark_state, str(self._mark_state))
+        seconds = self.profile.state_seconds
+        seconds[state] = seconds.get(state, 0.0) + now - self._mark
+        self._mark = now
+
+
+_profiled_engines: Dict[type, type] = {}
+
+
+def profiled_scanner(engine: type, filename: str, profile: Profile) -> Scanner:
+    """An *engine* scanner over *filename* that records into *profile*."""
+
+    cls = _profiled_engines.get(engine)
+    if cls is None:
+        cls = _profiled_engines[engine] = type(f"Profiled{engine.__name__}", (_ScannerProfiling, engine), {})
+    scanner = cls(filename)
+    scanner.profile = profile
+    return scanner
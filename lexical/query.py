@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import heapq
+import re
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from lexical.token import TokenType
+
+# A compound selector: label (None for '*'), required token values and
+# :has() conditions as (children_only, selector list).
+Compound = Tuple[Optional[str], Tuple[str, ...], Tuple[Tuple[bool, tuple], ...]]
+# A selector: compounds joined by combinators (None for the first, " " for
+# descendant, ">" for child). A selector list is a tuple of selectors.
+Selector = Tuple[Tuple[Optional[str], Compound], ...]
+
+_SELECTOR_TOKEN = re.compile(
+    r'(?P<space>\s+)|(?P<has>:has\()|(?P<punct>[>,*\[\]=)])|"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<word>[^\s>,*\[\]=()":]+)'
+)
+
+
+class TreeIndex:
+    """Indexes of one syntax tree, built iteratively in one walk.
+
+    Nodes are numbered in pre-order; per number the index keeps the node,
+    its parent, its post-order number and the last number in its subtree,
+    so ancestor tests are O(1) and a subtree is a range of numbers. Node
+    lists per label and IDENTIFIER uses per name are in document order.
+    Nodes are found by identity (``SyntaxNode`` is not hashable), so look
+    up the node objects of the indexed tree itself.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.nodes: list = []
+        self.parents = array("i")
+        self.post = array("i")
+        self.last = array("i")
+        self.labels: Dict[str, List[int]] = {}
+        self.identifiers: Dict[str, List[int]] = {}
+        self._numbers: Dict[int, int] = {}
+        self._results: Dict[str, List[int]] = {}
+        nodes = self.nodes
+        parents = self.parents
+        post = self.post
+        last = self.last
+        labels = self.labels
+        identifiers = self.identifiers
+        numbers = self._numbers
+        depths = []
+        identifier = TokenType.IDENTIFIER
+        stack = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            number = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+            depths.append(depths[parent] + 1 if parent >= 0 else 0)
+            numbers[id(node)] = number
+            label_list = labels.get(node.label)
+            if label_list is None:
+                labels[node.label] = [number]
+            else:
+                label_list.append(number)
+            token = node.token
+            if token is not None and token.type is identifier:
+                uses = identifiers.get(token.value)
+                if uses is None:
+                    identifiers[token.value] = [number]
+                else:
+                    uses.append(number)
+            children = node.children
+            if children:
+                stack.extend([(child, number) for child in reversed(children)])
+        # Subtree sizes, children before parents. A node's subtree is the
+        # numbers up to number + size - 1, and of the nodes numbered before
+        # it all but its ancestors are finished first in post-order.
+        sizes = [1] * len(nodes)
+        for number in range(len(nodes) - 1, 0, -1):
+            sizes[parents[number]] += sizes[number]
+        last.extend([number + size - 1 for number, size in enumerate(sizes)])
+        post.extend([end - depth for end, depth in zip(last, depths)])
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def number(self, node) -> int:
+        return self._numbers[id(node)]
+
+    def parent(self, node):
+        parent = self.parents[self.number(node)]
+        return None if parent < 0 else self.nodes[parent]
+
+    def ancestors(self, node) -> Iterator:
+        """Parent, grandparent, ... up to the root."""
+
+        parents = self.parents
+        number = parents[self.number(node)]
+        while number >= 0:
+            yield self.nodes[number]
+            number = parents[number]
+
+    def is_ancestor(self, ancestor, node) -> bool:
+        """Whether *ancestor* is a proper ancestor of *node*."""
+
+        a = self.number(ancestor)
+        b = self.number(node)
+        return a < b and self.post[b] < self.post[a]
+
+    def enclosing(self, node, label: str):
+        """The nearest ancestor of *node* labelled *label*, or ``None``."""
+
+        for ancestor in self.ancestors(node):
+            if ancestor.label == label:
+                return ancestor
+        return None
+
+    def within(self, node, label: str) -> list:
+        """Nodes labelled *label* inside *node*'s subtree, found by bisection."""
+
+        number = self.number(node)
+        numbers = self.labels.get(label, [])
+        first = bisect_right(numbers, number)
+        end = bisect_right(numbers, self.last[number])
+        return [self.nodes[index] for index in numbers[first:end]]
+
+    def uses(self, name: str) -> list:
+        """IDENTIFIER leaves naming *name*, in document order."""
+
+        return [self.nodes[number] for number in self.identifiers.get(name, ())]
+
+    def select(self, selector: str) -> list:
+        """Nodes matching *selector*, in document order.
+
+        The language is a small subset of CSS selectors:
+
+        - ``label`` matches nodes with that label and ``*`` matches any node;
+        - ``[value=x]`` (or ``[value="x y"]``) requires the node's token
+          value to be ``x``;
+        - ``:has(S)`` keeps nodes with a descendant matched by ``S`` and
+          ``:has(> S)`` those with such a child, where ``S`` is matched
+          over the whole tree;
+        - ``A B`` matches ``B`` nodes inside an ``A``, ``A > B`` ``B`` children
+          of an ``A``, and ``S1, S2`` both.
+
+        ``atribuicao:has(> IDENTIFIER[value=x])`` finds the assignments to
+        ``x``, ``repeticao:has(leitura)`` the loops that read. Results are
+        cached per selector.
+        """
+
+        numbers = self._results.get(selector)
+        if numbers is None:
+            numbers = self._results[selector] = self._evaluate(parse_selector(selector))
+        nodes = self.nodes
+        return [nodes[number] for number in numbers]
+
+    def _evaluate(self, selectors: tuple) -> List[int]:
+        if len(selectors) == 1:
+            return self._selector(selectors[0])
+        return sorted(set().union(*(self._selector(selector) for selector in selectors)))
+
+    def _selector(self, selector: Selector) -> List[int]:
+        matches = self._compound(selector[0][1])
+        for combinator, compound in selector[1:]:
+            candidates = self._compound(compound)
+            if combinator == ">":
+                outer = set(matches)
+                parents = self.parents
+                matches = [number for number in candidates if parents[number] in outer]
+            else:
+                matches = self._inside(matches, candidates)
+        return matches
+
+    def _inside(self, outer: List[int], candidates: List[int]) -> List[int]:
+        # One sweep over both sorted lists, keeping the *outer* subtrees
+        # that are still open.
+        last = self.last
+        result = []
+        open_ends = []
+        position = 0
+        for number in candidates:
+            while position < len(outer) and outer[position] < number:
+                start = outer[position]
+                while open_ends and open_ends[-1] < start:
+                    open_ends.pop()
+                open_ends.append(last[start])
+                position += 1
+            while open_ends and open_ends[-1] < number:
+                open_ends.pop()
+            if open_ends:
+                result.append(number)
+        return result
+
+    def _compound(self, compound: Compound) -> List[int]:
+        label, values, conditions = compound
+        nodes = self.nodes
+        if label is None:
+            candidates = list(range(len(nodes)))
+        else:
+            candidates = self.labels.get(label, [])
+        for position, value in enumerate(values):
+            # The identifier index answers the first filter; later ones
+            # narrow what it returned.
+            if position == 0 and label == TokenType.IDENTIFIER.name:
+                candidates = self.identifiers.get(value, [])
+            else:
+                candidates = [
+                    number for number in candidates
+                    if nodes[number].token is not None and nodes[number].token.value == value
+                ]
+        for children_only, selectors in conditions:
+            inner = self._evaluate(selectors)
+            if children_only:
+                parents = self.parents
+                outer = {parents[number] for number in inner}
+                candidates = [number for number in candidates if number in outer]
+            else:
+                last = self.last
+                kept = []
+                for number in candidates:
+                    position = bisect_right(inner, number)
+                    if position < len(inner) and inner[position] <= last[number]:
+                        kept.append(number)
+                candidates = kept
+        return candidates
+
+
+@lru_cache(maxsize=256)
+def parse_selector(text: str) -> tuple:
+    """Compile *text* (see :meth:`TreeIndex.select`) into a selector list."""
+
+    tokens = []
+    position = 0
+    while position < len(text):
+        m = _SELECTOR_TOKEN.match(text, position)
+        if m is None:
+            raise ValueError(f"invalid selector {text!r} at position {position}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "quoted":
+            value = re.sub(r"\\(.)", r"\1", value)
+        tokens.append((kind, value))
+        position = m.end()
+    tokens.append(("end", None))
+    parser = _SelectorParser(text, tokens)
+    selectors = parser.selector_list(children_only=False)[1]
+    parser.expect("end")
+    return selectors
+
+
+class _SelectorParser:
+    def __init__(self, text: str, tokens: list):
+        self.text = text
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self, skip_space: bool = True) -> tuple:
+        if skip_space:
+            while self.tokens[self.index][0] == "space":
+                self.index += 1
+        return self.tokens[self.index]
+
+    def take(self) -> tuple:
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def expect(self, kind: str, value: Optional[str] = None) -> str:
+        token_kind, token_value = self.take()
+        if token_kind != kind or (value is not None and token_value != value):
+            raise ValueError(f"invalid selector {self.text!r}: expected {value or kind}, got {token_value or token_kind!r}")
+        return token_value
+
+    def selector_list(self, children_only: bool) -> tuple:
+        # Inside :has(), a leading '>' restricts matches to children.
+        if children_only and self.peek() == ("punct", ">"):
+            self.take()
+        else:
+            children_only = False
+        selectors = [self.selector()]
+        while self.peek() == ("punct", ","):
+            self.take()
+            selectors.append(self.selector())
+        return children_only, tuple(selectors)
+
+    def selector(self) -> Selector:
+        parts = [(None, self.compound())]
+        while True:
+            kind, value = self.peek(skip_space=False)
+            if kind == "space":
+                kind, value = self.peek()
+                if kind in ("word", "punct") and value not in (",", ")", "]", "="):
+                    combinator = ">" if value == ">" else " "
+                else:
+                    break
+            elif (kind, value) == ("punct", ">"):
+                combinator = ">"
+            else:
+                break
+            if combinator == ">":
+                self.take()
+            parts.append((combinator, self.compound()))
+        return tuple(parts)
+
+    def compound(self) -> Compound:
+        kind, value = self.take()
+        if (kind, value) == ("punct", "*"):
+            label = None
+        elif kind == "word":
+            label = value
+        else:
+            raise ValueError(f"invalid selector {self.text!r}: expected a label or '*', got {value!r}")
+        values = []
+        conditions = []
+        while True:
+            kind, value = self.peek(skip_space=False)
+            if (kind, value) == ("punct", "["):
+                self.take()
+                self.expect("word", "value")
+                self.expect("punct", "=")
+                kind, value = self.take()
+                if kind not in ("word", "quoted"):
+                    raise ValueError(f"invalid selector {self.text!r}: expected a value after '='")
+                values.append(value)
+                self.expect("punct", "]")
+            elif kind == "has":
+                self.take()
+                conditions.append(self.selector_list(children_only=True))
+                self.expect("punct", ")")
+            else:
+                return label, tuple(values), tuple(conditions)
+
+
+SKIP = object()
+"""Returned by a ``visit_*`` method to leave the node's children unvisited."""
+
+
+class Visitor:
+    """Iterative tree visitor with dispatch tables built once per class.
+
+    Subclasses define ``visit_<label>(node)``, called on the way down, and
+    ``leave_<label>(node)``, called once the node's subtree is done;
+    ``visit_default`` catches labels without a method (operator labels
+    such as ``+`` cannot be method names). The tables map labels to plain
+    functions when the class is created, so visiting a node is one dict
+    lookup and a call, with no ``getattr``.
+
+    Given a :class:`TreeIndex` and no ``leave_*`` or ``visit_default``
+    methods, :meth:`visit` only touches the nodes with a ``visit_*``
+    method, using the index's label lists.
+    """
+
+    _enter: Dict[str, Callable] = {}
+    _leave: Dict[str, Callable] = {}
+    _default: Optional[Callable] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        enter = {}
+        leave = {}
+        default = None
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if not callable(value):
+                    continue
+                if name == "visit_default":
+                    default = value
+                elif name.startswith("visit_"):
+                    enter[name[len("visit_"):]] = value
+                elif name.startswith("leave_"):
+                    leave[name[len("leave_"):]] = value
+        cls._enter = enter
+        cls._leave = leave
+        cls._default = default
+
+    def visit(self, target) -> None:
+        if isinstance(target, TreeIndex) and not self._leave and type(self)._default is None:
+            self._visit_indexed(target)
+        else:
+            self._visit_tree(target.root if isinstance(target, TreeIndex) else target)
+
+    def _visit_tree(self, root) -> None:
+        enter = self._enter
+        leave = self._leave
+        # Read through the class so the function is not bound.
+        default = type(self)._default
+        stack = [(root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                leave[node.label](self, node)
+                continue
+            function = enter.get(node.label, default)
+            if function is not None and function(self, node) is SKIP:
+                continue
+            if node.label in leave:
+                stack.append((node, True))
+            children = node.children
+            if children:
+                stack.extend((child, False) for child in reversed(children))
+
+    def _visit_indexed(self, index: TreeIndex) -> None:
+        enter = self._enter
+        lists = [index.labels[label] for label in enter if label in index.labels]
+        nodes = index.nodes
+        last = index.last
+        skip_until = -1
+        for number in heapq.merge(*lists):
+            if number <= skip_until:
+                continue
+            node = nodes[number]
+            if enter[node.label](self, node) is SKIP:
+                skip_until = last[number]
@@ -1,3 +1,7 @@
+import mmap
+import re
+
+from lexical.source_map import SourceMap
 from lexical.token import Token, TokenType
 
 class Scanner:
@@ -6,30 +10,77 @@ class Scanner:
         "while", "print", "input", "E", "OU", "NAO"
     }
 
-    def __init__(self, filename: str):
+    # The file's memory map, if the scanner opened one; see close().
+    _mapping = None
+
+    def __init__(self, filename: str, start: int = 0, end: int | None = None):
         try:
-            with open(filename, "r", encoding="utf-8") as f:
-                self.source_code = list(f.read())
-            self.pos = 0
-            self.line = 1
-            self.column = 1
-            self.state = 0
+            source = self._map_file(filename)
         except FileNotFoundError:
             print(f"Erro: arquivo '{filename}' não encontrado.")
-            self.source_code = []
-            self.pos = 0
-            self.line = 1
-            self.column = 1
-            self.state = 0
+            source = b""
+        if isinstance(source, mmap.mmap):
+            self._mapping = source
+        self._load(source, start, end)
+
+    @classmethod
+    def from_source(cls, source, start: int = 0, end: int | None = None, source_map: SourceMap | None = None):
+        """Scan *source* (bytes, or a str encoded as UTF-8) instead of a file."""
+
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        scanner = cls.__new__(cls)
+        scanner._load(source, start, end, source_map)
+        return scanner
+
+    def _load(self, source, start: int, end: int | None, source_map: SourceMap | None = None):
+        self.source_code = source
+        # Only [start, end) is scanned; offsets stay relative to the whole
+        # file so tokens from different ranges can be merged as they are.
+        self.size = len(source) if end is None else end
+        self.source_map = SourceMap(source) if source_map is None else source_map
+        self.pos = start
+        self.state = 0
+
+    @staticmethod
+    def _map_file(filename: str):
+        # The source stays as UTF-8 bytes backed by the page cache; characters
+        # are decoded only as the scanner reaches them.
+        # Empty files (ValueError) and pipes, FIFOs or /dev/stdin (OSError)
+        # cannot be mapped and are read whole instead.
+        with open(filename, "rb") as f:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                return f.read()
+
+    def close(self) -> None:
+        """Release the file's memory map, if any.
+
+        Token values are already decoded, but tokens and ``TokenBuffer``
+        values that still read the source (line, column, lazy lexemes) must
+        not be used afterwards.
+        """
+
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def next_token(self):
         content = ""
         self.state = 0
+        lexeme_offset = self.pos
         while not self.is_eof():
-            current_char = self.source_code[self.pos]
-            start_line = self.line
-            start_column = self.column
-            self.next_char()
+            start_offset = self.pos
+            if self.state == 0:
+                lexeme_offset = start_offset
+            current_char = self.next_char()
             match self.state:
                 case 0:
                     if self.is_letter(current_char):
@@ -46,62 +97,62 @@ class Scanner:
                         while not self.is_eof():
                             p = self.next_char()
                             if p == '"':
-                                return Token(TokenType.STRING, "".join(lex), start_line, start_column)
+                                return self._token(TokenType.STRING, "".join(lex), start_offset)
                             if p == "\n" or p == "":
-                                return Token(TokenType.ERROR, "string não fechada", start_line, start_column)
+                                return Token(TokenType.ERROR, "string não fechada", start_offset, self.pos - 1 - start_offset, self.source_map)
                             lex.append(p)
                     elif self.is_math_operator(current_char):
                         if current_char == "+" and self.peek() == "+":
                             self.next_char()
-                            return Token(TokenType.INCREMENT, "++", start_line, start_column)
+                            return self._token(TokenType.INCREMENT, "++", start_offset)
                         if current_char == "-" and self.peek() == "-":
                             self.next_char()
-                            return Token(TokenType.DECREMENT, "--", start_line, start_column)
-                        return Token(TokenType.MATH_OPERATOR, current_char, start_line, start_column)
+                            return self._token(TokenType.DECREMENT, "--", start_offset)
+                        return self._token(TokenType.MATH_OPERATOR, current_char, start_offset)
                     elif current_char == "<":
                         if self.peek() == "-":
                             self.next_char()
-                            return Token(TokenType.ASSIGN_LEFT, "<-", start_line, start_column)
+                            return self._token(TokenType.ASSIGN_LEFT, "<-", start_offset)
                         if self.peek() == "=":
                             self.next_char()
-                            return Token(TokenType.REL_OPERATOR, "<=", start_line, start_column)
-                        return Token(TokenType.REL_OPERATOR, "<", start_line, start_column)
+                            return self._token(TokenType.REL_OPERATOR, "<=", start_offset)
+                        return self._token(TokenType.REL_OPERATOR, "<", start_offset)
                     elif current_char == "=":
                         if self.peek() == "=":
                             self.next_char()
-                            return Token(TokenType.REL_OPERATOR, "==", start_line, start_column)
-                        return Token(TokenType.ASSIGNMENT, "=", start_line, start_column)
+                            return self._token(TokenType.REL_OPERATOR, "==", start_offset)
+                        return self._token(TokenType.ASSIGNMENT, "=", start_offset)
                     elif current_char == ">":
                         if self.peek() == "=":
                             self.next_char()
-                            return Token(TokenType.REL_OPERATOR, ">=", start_line, start_column)
-                        return Token(TokenType.REL_OPERATOR, ">", start_line, start_column)
+                            return self._token(TokenType.REL_OPERATOR, ">=", start_offset)
+                        return self._token(TokenType.REL_OPERATOR, ">", start_offset)
                     elif current_char == "!":
                         if self.peek() == "=":
                             self.next_char()
-                            return Token(TokenType.REL_OPERATOR, "!=", start_line, start_column)
-                        return Token(TokenType.ERROR, "!", start_line, start_column)
+                            return self._token(TokenType.REL_OPERATOR, "!=", start_offset)
+                        return self._token(TokenType.ERROR, "!", start_offset)
                     elif current_char == "(":
-                        return Token(TokenType.LPAREN, current_char, start_line, start_column)
+                        return self._token(TokenType.LPAREN, current_char, start_offset)
                     elif current_char == ")":
-                        return Token(TokenType.RPAREN, current_char, start_line, start_column)
+                        return self._token(TokenType.RPAREN, current_char, start_offset)
                     elif current_char == "{":
-                        return Token(TokenType.LBRACE, current_char, start_line, start_column)
+                        return self._token(TokenType.LBRACE, current_char, start_offset)
                     elif current_char == "}":
-                        return Token(TokenType.RBRACE, current_char, start_line, start_column)
+                        return self._token(TokenType.RBRACE, current_char, start_offset)
                     elif current_char == ":":
-                        return Token(TokenType.COLON, current_char, start_line, start_column)
+                        return self._token(TokenType.COLON, current_char, start_offset)
                     elif current_char == ";":
-                        return Token(TokenType.SEMICOLON, current_char, start_line, start_column)
+                        return self._token(TokenType.SEMICOLON, current_char, start_offset)
                     elif current_char == ",":
-                        return Token(TokenType.COMMA, current_char, start_line, start_column)
+                        return self._token(TokenType.COMMA, current_char, start_offset)
                     elif current_char == "#":
                         self.skip_line_comment()
                         continue
                     elif current_char.isspace():
                         continue
                     else:
-                        return Token(TokenType.ERROR, current_char, start_line, start_column)
+                        return self._token(TokenType.ERROR, current_char, start_offset)
                 case 1:
                     if self.is_letter(current_char) or self.is_digit(current_char):
                         content += current_char
@@ -109,9 +160,9 @@ class Scanner:
                         self.back()
                         self.state = 0
                         if content in self.KEYWORDS:
-                            return Token(TokenType.RESERVED, content, start_line, start_column)
+                            return self._token(TokenType.RESERVED, content, lexeme_offset)
                         else:
-                            return Token(TokenType.IDENTIFIER, content, start_line, start_column)
+                            return self._token(TokenType.IDENTIFIER, content, lexeme_offset)
                 case 3:
                     if self.is_digit(current_char):
                         content += current_char
@@ -121,16 +172,16 @@ class Scanner:
                     else:
                         self.back()
                         self.state = 0
-                        return Token(TokenType.NUMINT, content, start_line, start_column)
+                        return self._token(TokenType.NUMINT, content, lexeme_offset)
                 case 4:
                     if self.is_digit(current_char):
                         content += current_char
                     else:
                         if content[-1] == ".":
-                            return Token(TokenType.ERROR, content, start_line, start_column)
+                            return Token(TokenType.ERROR, content, lexeme_offset, start_offset - lexeme_offset, self.source_map)
                         self.back()
                         self.state = 0
-                        return Token(TokenType.NUMREAL, content, start_line, start_column)
+                        return self._token(TokenType.NUMREAL, content, lexeme_offset)
         return None
 
     def is_letter(self, c: str) -> bool:
@@ -145,29 +196,156 @@ class Scanner:
     def next_char(self) -> str:
         if self.is_eof():
             return ""
-        ch = self.source_code[self.pos]
-        self.pos += 1
-        if ch == "\n":
-            self.line += 1
-            self.column = 1
-        else:
-            self.column += 1
+        ch, width = self._decode_at(self.pos)
+        self.pos += width
         return ch
 
     def peek(self) -> str:
-        if self.pos < len(self.source_code):
-            return self.source_code[self.pos]
+        if self.pos < self.size:
+            return self._decode_at(self.pos)[0]
         return ""
 
     def back(self):
         self.pos -= 1
-        self.column -= 1
+        while self.source_code[self.pos] & 0xC0 == 0x80:
+            self.pos -= 1
 
     def is_eof(self) -> bool:
-        return self.pos >= len(self.source_code)
+        return self.pos >= self.size
 
     def skip_line_comment(self):
-        while not self.is_eof() and self.source_code[self.pos] != "\n":
-            self.next_char()
+        end = self.source_code.find(b"\n", self.pos, self.size)
+        self.pos = self.size if end == -1 else end
+
+    def _token(self, token_type, value, offset: int) -> Token:
+        return Token(token_type, value, offset, self.pos - offset, self.source_map)
+
+    def _decode_at(self, pos: int):
+        lead = self.source_code[pos]
+        if lead < 0x80:
+            return chr(lead), 1
+        width = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        return self.source_code[pos:pos + width].decode("utf-8"), width
+
+
+
+
+class RegexScanner(Scanner):
+    _OPERATORS = {
+        b"++": (TokenType.INCREMENT, "++"),
+        b"--": (TokenType.DECREMENT, "--"),
+        b"<-": (TokenType.ASSIGN_LEFT, "<-"),
+        b"<=": (TokenType.REL_OPERATOR, "<="),
+        b">=": (TokenType.REL_OPERATOR, ">="),
+        b"==": (TokenType.REL_OPERATOR, "=="),
+        b"!=": (TokenType.REL_OPERATOR, "!="),
+        b"<": (TokenType.REL_OPERATOR, "<"),
+        b">": (TokenType.REL_OPERATOR, ">"),
+        b"=": (TokenType.ASSIGNMENT, "="),
+        b"+": (TokenType.MATH_OPERATOR, "+"),
+        b"-": (TokenType.MATH_OPERATOR, "-"),
+        b"*": (TokenType.MATH_OPERATOR, "*"),
+        b"/": (TokenType.MATH_OPERATOR, "/"),
+        b"(": (TokenType.LPAREN, "("),
+        b")": (TokenType.RPAREN, ")"),
+        b"{": (TokenType.LBRACE, "{"),
+        b"}": (TokenType.RBRACE, "}"),
+        b":": (TokenType.COLON, ":"),
+        b";": (TokenType.SEMICOLON, ";"),
+        b",": (TokenType.COMMA, ","),
+        b"!": (TokenType.ERROR, "!"),
+    }
+
+    # Only ASCII is classified here; a lexeme touching any other byte is
+    # handed back to the character-by-character engine so both produce the
+    # same tokens.
+    _TOKEN_RE = re.compile(
+        rb"""
+        (?P<skip>(?:[\t\n\x0b\x0c\r\x1c-\x1f\x20]+|\#[^\n]*)*)
+        (?:
+            (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+          | (?P<number>[0-9]+(?:\.[0-9]*)?|\.[0-9]*)
+          | (?P<string>"[^"\n]*)
+          | (?P<operator>\+\+|--|<-|<=|>=|==|!=|[-+*/<>=!(){}:;,])
+          | (?P<other>.)
+        )?
+        """,
+        re.VERBOSE | re.DOTALL,
+    )
+
+    def _load(self, source, start: int, end: int | None, source_map: SourceMap | None = None):
+        super()._load(source, start, end, source_map)
+        self._tokens = self._scan()
+
+    def next_token(self):
+        return next(self._tokens, None)
+
+    def _scan(self):
+        text = self.source_code
+        size = self.size
+        source_map = self.source_map
+        match = self._TOKEN_RE.match
+        operators = self._OPERATORS
+        keywords = self.KEYWORDS
+        words = {}
+        pos = self.pos
+        while True:
+            m = match(text, pos, size)
+            kind = m.lastgroup
+            start, end = m.span(kind)
+            if kind == "operator":
+                token_type, lexeme = operators[text[start:end]]
+                pos = self.pos = end
+                yield Token(token_type, lexeme, start, end - start, source_map)
+                continue
+            if kind == "skip":
+                self.pos = size
+                return
+            if kind == "other" and text[start] < 0x80:
+                pos = self.pos = end
+                yield Token(TokenType.ERROR, chr(text[start]), start, 1, source_map)
+                continue
+            if end == size and kind != "other":
+                self.pos = size
+                return
+            delimiter = text[end] if end < size else 0
+            if kind == "string":
+                pos = self.pos = end + 1
+                if delimiter == 0x22:
+                    value = text[start + 1:end].decode("utf-8")
+                    yield Token(TokenType.STRING, value, start, end + 1 - start, source_map)
+                else:
+                    yield Token(TokenType.ERROR, "string não fechada", start, end - start, source_map)
+                continue
+            if kind == "other" or delimiter > 0x7F:
+                self.pos = start
+                token = Scanner.next_token(self)
+                if token is None:
+                    return
+                pos = self.pos
+                yield token
+                continue
+            raw = text[start:end]
+            lexeme = words.get(raw)
+            if lexeme is None:
+                lexeme = words[raw] = raw.decode("ascii")
+            if kind == "word":
+                token_type = TokenType.RESERVED if lexeme in keywords else TokenType.IDENTIFIER
+            elif lexeme[-1] == ".":
+                # Like the classic engine, the character after a dangling
+                # '.' is consumed along with the error.
+                pos = self.pos = end + 1
+                yield Token(TokenType.ERROR, lexeme, start, end - start, source_map)
+                continue
+            elif "." in lexeme:
+                token_type = TokenType.NUMREAL
+            else:
+                token_type = TokenType.NUMINT
+            pos = self.pos = end
+            yield Token(token_type, lexeme, start, end - start, source_map)
 
 
+ENGINES = {
+    "classic": Scanner,
+    "regex": RegexScanner,
+}
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from lexical.parser import Parser, semantic_error
+from lexical.token import Token, TokenType
+
+INT = "int"
+REAL = "real"
+LOGICO = "logico"
+
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    name: str
+    # None when the declaration broke off before its type.
+    type: Optional[str]
+    token: Token
+
+
+class SemanticParser(Parser):
+    """:class:`Parser` that checks declarations and types while it parses.
+
+    Declarations fill :attr:`symbols`; every identifier consumed after the
+    ``var`` section is looked up there. An arithmetic expression is
+    ``real`` as soon as one operand is (a real literal or a real
+    variable), otherwise ``int``; relational expressions are ``logico``.
+    A real expression assigned to an int variable is an error. Semantic
+    errors go to :attr:`errors` alongside the syntax errors, in token order.
+    Tokens skipped by error recovery are not checked.
+    """
+
+    def __init__(self, scanner, build_tree=True, sink=None, arena=None):
+        self.symbols: Dict[str, Symbol] = {}
+        # Type of the last expression parsed.
+        self.expression_type: Optional[str] = None
+        self._declaring = False
+        self._skipping = False
+        self._real = False
+        self._declared: Optional[Token] = None
+        self._declared_type: Optional[str] = None
+        super().__init__(scanner, build_tree=build_tree, sink=sink, arena=arena)
+
+    def _advance(self):
+        # Every consumed token passes through here, so identifier uses in
+        # expressions and statements are checked without touching the rules.
+        token = self.current
+        if token is not None and not self._skipping:
+            kind = token.type
+            if kind == TokenType.IDENTIFIER:
+                if self._declaring:
+                    self._declared = token
+                else:
+                    self._use(token)
+            elif kind == TokenType.NUMREAL:
+                self._real = True
+        super()._advance()
+
+    def _use(self, token: Token) -> None:
+        symbol = self.symbols.get(token.value)
+        if symbol is None:
+            self.errors.append(semantic_error(token, f"variável '{token.value}' não declarada"))
+        elif symbol.type == REAL:
+            self._real = True
+
+    def _synchronize(self, recovery=frozenset()):
+        self._skipping = True
+        try:
+            super()._synchronize(recovery)
+        finally:
+            self._skipping = False
+
+    def secaoDeclaracoes(self):
+        self._declaring = True
+        try:
+            return super().secaoDeclaracoes()
+        finally:
+            self._declaring = False
+
+    def declaracao(self):
+        self._declared = self._declared_type = None
+        try:
+            return super().declaracao()
+        finally:
+            token = self._declared
+            if token is not None:
+                previous = self.symbols.get(token.value)
+                if previous is not None:
+                    self.errors.append(semantic_error(
+                        token, f"variável '{token.value}' já declarada na linha {previous.token.line}"
+                    ))
+                else:
+                    self.symbols[token.value] = Symbol(token.value, self._declared_type, token)
+
+    def tipo(self):
+        current = self.current
+        node = super().tipo()
+        self._declared_type = current.value
+        return node
+
+    def atribuicao(self):
+        target = self.current
+        node = super().atribuicao()
+        symbol = self.symbols.get(target.value)
+        if symbol is not None and symbol.type == INT and self.expression_type == REAL:
+            self.errors.append(semantic_error(
+                target, f"atribuição de expressão real à variável inteira '{target.value}'"
+            ))
+        return node
+
+    def expressaoAritmetica(self):
+        # Relational terms parse one expression at a time, so a single flag
+        # is enough: no arithmetic expression nests inside another call.
+        self._real = False
+        node = super().expressaoAritmetica()
+        self.expression_type = REAL if self._real else INT
+        return node
+
+    def expressaoRelacional(self):
+        node = super().expressaoRelacional()
+        self.expression_type = LOGICO
+        return node
+
+
+# Statements are dispatched through this table, which holds the plain
+# parser's functions; point it at the overrides.
+SemanticParser._COMANDO_RULES = {
+    kind: (getattr(SemanticParser, method.__name__), frame, body)
+    for kind, (method, frame, body) in Parser._COMANDO_RULES.items()
+}
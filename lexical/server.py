@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+import json
+import os
+import stat
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from lexical.cache import parse_path, parse_source
+from lexical.ll1 import PARSER_ENGINES
+from lexical.scanner import ENGINES
+from lexical.syntax_tree import EXPORT_FORMATS, write_binary, write_dot, write_jsonl
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_PENDING = 64
+LATENCY_WINDOW = 10_000
+# Requests larger than this are rejected instead of being buffered.
+MAX_REQUEST_BYTES = 64 << 20
+
+# JSON-RPC 2.0 error codes.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+TIMEOUT = -32001
+
+_TREE_WRITERS = {"dot": write_dot, "jsonl": write_jsonl}
+_WARM_UP_SOURCE = "main {\nvar {\nx: int;\n}\nx <- 1;\n}\n"
+
+
+class RequestError(Exception):
+    """A request that gets a JSON-RPC error response."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _serialize_tree(root, fmt: str) -> str:
+    if fmt == "bin":
+        buffer = io.BytesIO()
+        write_binary(root, buffer)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+    buffer = io.StringIO()
+    _TREE_WRITERS[fmt](root, buffer)
+    return buffer.getvalue()
+
+
+def run_request(method: str, params: dict) -> dict:
+    """Parse one request's source in a worker; *params* are already validated.
+
+    The tree never leaves the worker as objects: it is returned serialized
+    in the requested format (``bin`` as base64), or not at all.
+    """
+
+    build_tree = method == "parse" and params.get("tree") is not None
+    options = (params.get("lexer", "classic"), params.get("parser", "recursive"), build_tree)
+    if "source" in params:
+        result = parse_source(params["source"], *options)
+    elif not os.path.isfile(params["path"]):
+        raise FileNotFoundError(f"arquivo '{params['path']}' não encontrado")
+    else:
+        result = parse_path(params["path"], *options)
+    tree = None
+    if build_tree and result.root is not None and not result.errors:
+        tree = _serialize_tree(result.root, params["tree"])
+    return {
+        "valid": not result.errors,
+        "errors": result.errors,
+        "tokens": result.tokens,
+        "tree": tree,
+    }
+
+
+def _warm_up() -> None:
+    # Runs once per worker so the first real request does not pay for
+    # imports and compiled patterns. Stray prints must not end up in the
+    # responses on stdout.
+    sys.stdout = sys.stderr
+    for lexer in ENGINES:
+        parse_source(_WARM_UP_SOURCE, lexer)
+
+
+def validate_params(method: str, params) -> dict:
+    if not isinstance(params, dict):
+        raise RequestError(INVALID_PARAMS, "parâmetros devem ser um objeto")
+    if ("source" in params) == ("path" in params):
+        raise RequestError(INVALID_PARAMS, "informe 'source' ou 'path'")
+    if not isinstance(params.get("source", params.get("path")), str):
+        raise RequestError(INVALID_PARAMS, "'source' e 'path' devem ser texto")
+    # Checked as text first: a list or object is unhashable and would break
+    # the membership tests.
+    lexer = params.get("lexer", "classic")
+    if not isinstance(lexer, str) or lexer not in ENGINES:
+        raise RequestError(INVALID_PARAMS, f"lexer desconhecido: {lexer!r}")
+    parser = params.get("parser", "recursive")
+    if not isinstance(parser, str) or parser not in PARSER_ENGINES:
+        raise RequestError(INVALID_PARAMS, f"parser desconhecido: {parser!r}")
+    tree = params.get("tree")
+    if method == "parse" and tree is not None and (not isinstance(tree, str) or tree not in EXPORT_FORMATS):
+        raise RequestError(INVALID_PARAMS, f"formato de árvore desconhecido: {tree!r}")
+    return params
+
+
+def _is_regular_file(stream) -> bool:
+    return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+
+
+async def _feed_from_file(reader: asyncio.StreamReader, stream) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        data = await loop.run_in_executor(None, stream.read1, 1 << 16)
+        if not data:
+            reader.feed_eof()
+            return
+        reader.feed_data(data)
+
+
+class _FileWriter:
+    """The part of ``asyncio.StreamWriter`` the server uses, over a blocking file."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data: bytes) -> None:
+        self.stream.write(data)
+
+    async def drain(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class ServerMetrics:
+    """Request counters and a sliding window of latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        self.requests += 1
+        self.failed += failed
+        self.latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self.started
+        ordered = sorted(self.latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "uptime_seconds": uptime,
+            "requests_per_second": self.requests / uptime if uptime else None,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+
+class ParseServer:
+    """JSON-RPC 2.0 parse server: one request or batch per line.
+
+    Methods are ``parse`` (``tree`` selects an export format for the tree),
+    ``check`` (validation only), ``metrics`` and ``shutdown``. Source goes inline as
+    ``source`` or by ``path``; ``lexer`` and ``parser`` pick the engines.
+    Parsing runs on *executor*, normally a pool of warm worker processes,
+    with at most *max_pending* requests in flight, counting each request
+    of a batch: past that, connections are not read, and the rest of a
+    batch waits, until a worker frees up. A request that takes longer than
+    *timeout* seconds gets an error; its worker finishes the parse anyway.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.executor = executor
+        self.timeout = timeout
+        self.metrics = ServerMetrics()
+        # Lines being answered, for backpressure on reading, and requests
+        # handed to the executor, so a batch cannot exceed max_pending.
+        self._slots = asyncio.Semaphore(max_pending)
+        self._jobs = asyncio.Semaphore(max_pending)
+        self._stopped = asyncio.Event()
+
+    async def handle(self, request, running: Optional[list] = None) -> Optional[dict]:
+        """Answer one decoded request; ``None`` for notifications.
+
+        Work handed to the executor is appended to *running*, so callers can
+        tell when a timed-out request has really finished.
+        """
+
+        start = time.perf_counter()
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+                raise RequestError(INVALID_REQUEST, "requisição inválida")
+            result = await self._dispatch(request["method"], request.get("params", {}), running)
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+            failed = False
+        except RequestError as exc:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": exc.code, "message": exc.message}}
+            failed = True
+        except Exception as exc:
+            # Whatever goes wrong, the request still gets an answer.
+            message = f"{type(exc).__name__}: {exc}"
+            response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": message}}
+            failed = True
+        self.metrics.record(time.perf_counter() - start, failed)
+        if isinstance(request, dict) and "id" not in request:
+            return None
+        return response
+
+    async def _dispatch(self, method: str, params, running: Optional[list]) -> dict:
+        if method == "metrics":
+            return self.metrics.snapshot()
+        if method == "shutdown":
+            self._stopped.set()
+            return {}
+        if method not in ("parse", "check"):
+            raise RequestError(METHOD_NOT_FOUND, f"método desconhecido: {method!r}")
+        params = validate_params(method, params)
+        loop = asyncio.get_running_loop()
+        await self._jobs.acquire()
+        try:
+            future = loop.run_in_executor(self.executor, run_request, method, params)
+        except BaseException:
+            self._jobs.release()
+            raise
+        # Released when the worker is done, even after a timeout.
+        future.add_done_callback(lambda _: self._jobs.release())
+        if running is not None:
+            running.append(future)
+        self.metrics.in_flight += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise RequestError(TIMEOUT, f"tempo esgotado após {self.timeout:g} s") from None
+        except Exception as exc:
+            raise RequestError(INTERNAL_ERROR, f"{type(exc).__name__}: {exc}") from None
+        finally:
+            self.metrics.in_flight -= 1
+
+    async def _answer(self, line: bytes, send) -> None:
+        running = []
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "JSON inválido"}}
+            else:
+                if isinstance(request, list) and request:
+                    responses = await asyncio.gather(*(self.handle(item, running) for item in request))
+                    response = [item for item in responses if item is not None] or None
+                else:
+                    response = await self.handle(request, running)
+            if response is not None:
+                await send(response)
+            # The slot stays taken until the executor is done with the
+            # request, even if it was answered with a timeout.
+            if running:
+                await asyncio.wait(running)
+        finally:
+            self._slots.release()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read requests from *reader* until EOF, answering each as it completes."""
+
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(response) -> None:
+            async with lock:
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        try:
+            while not self._stopped.is_set():
+                # Backpressure: no new request is read while every slot is busy.
+                await self._slots.acquire()
+                try:
+                    line = await self._next_line(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    self._slots.release()
+                    await send({"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "requisição grande demais"}})
+                    break
+                if line is None:
+                    self._slots.release()
+                    break
+                if not line.strip():
+                    self._slots.release()
+                    if not line:
+                        break
+                    continue
+                task = asyncio.create_task(self._answer(line, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _next_line(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        # The next line, or None once the server is told to shut down.
+        read = asyncio.ensure_future(reader.readline())
+        stopped = asyncio.ensure_future(self._stopped.wait())
+        await asyncio.wait((read, stopped), return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if not read.done():
+            read.cancel()
+            return None
+        return read.result()
+
+    async def serve_stdio(self) -> None:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_REQUEST_BYTES)
+        # The pipe transports only take pipes, sockets and terminals, so
+        # redirected regular files are read on a thread and written
+        # directly, which never blocks for long.
+        feeding = None
+        if _is_regular_file(sys.stdin):
+            feeding = asyncio.create_task(_feed_from_file(reader, sys.stdin.buffer))
+        else:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        if _is_regular_file(sys.stdout):
+            writer = _FileWriter(sys.stdout.buffer)
+        else:
+            transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+            writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        try:
+            await self.serve_connection(reader, writer)
+        finally:
+            if feeding is not None:
+                feeding.cancel()
+
+    async def serve_unix(self, path: str) -> None:
+        server = await asyncio.start_unix_server(self.serve_connection, path, limit=MAX_REQUEST_BYTES)
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def worker_pool(jobs: Optional[int] = None) -> ProcessPoolExecutor:
+    """Worker processes that have imported and exercised the parsers."""
+
+    return ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1, initializer=_warm_up)
+
+
+async def serve(
+    socket_path: Optional[str] = None,
+    jobs: Optional[int] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_pending: int = DEFAULT_MAX_PENDING,
+) -> ServerMetrics:
+    """Serve on *socket_path*, or on stdin/stdout without one, until EOF or ``shutdown``."""
+
+    with worker_pool(jobs) as executor:
+        server = ParseServer(executor, timeout, max_pending)
+        if socket_path is None:
+            await server.serve_stdio()
+        else:
+            await server.serve_unix(socket_path)
+        return server.metrics
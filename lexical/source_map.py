@@ -0,0 +1,46 @@
+from array import array
+from bisect import bisect_right
+
+
+class SourceMap:
+    """Translate byte offsets of a UTF-8 source into line and column numbers.
+
+    The index of line starts is built the first time a position is asked
+    for, so scanning never pays for line/column bookkeeping. Lines and
+    columns are 1-based; columns count characters, not bytes.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._line_starts = None
+
+    def reset(self, source) -> None:
+        """Point the map at a new version of the source."""
+
+        self.source = source
+        self._line_starts = None
+
+    def _build_index(self) -> array:
+        starts = array("q", [0])
+        find = self.source.find
+        pos = find(b"\n")
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find(b"\n", pos + 1)
+        self._line_starts = starts
+        return starts
+
+    def line(self, offset: int) -> int:
+        starts = self._line_starts
+        if starts is None:
+            starts = self._build_index()
+        return bisect_right(starts, offset)
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Return the ``(line, column)`` of *offset*."""
+
+        line = self.line(offset)
+        prefix = self.source[self._line_starts[line - 1]:offset]
+        if prefix.isascii():
+            return line, len(prefix) + 1
+        return line, len(prefix.decode("utf-8", "replace")) + 1
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, List, Optional
+
+from lexical.events import NullSink
+from lexical.ll1 import LL1Parser
+from lexical.scanner import RegexScanner, Scanner
+from lexical.syntax_tree import SyntaxNode
+from lexical.token import Token, TokenType
+
+DEFAULT_CHUNK_SIZE = 64 << 10
+
+
+class StreamingSourceMap:
+    """Line and column lookups for a source that is only seen chunk by chunk.
+
+    Unlike :class:`~lexical.source_map.SourceMap` it keeps no source text:
+    just the offsets of line starts and of UTF-8 continuation bytes (none
+    for ASCII sources), recorded by :meth:`feed` as the chunks go by.
+    """
+
+    def __init__(self):
+        self._line_starts = array("q", [0])
+        self._continuations = array("q")
+        self._size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        base = self._size
+        starts = self._line_starts
+        find = chunk.find
+        pos = find(b"\n")
+        while pos != -1:
+            starts.append(base + pos + 1)
+            pos = find(b"\n", pos + 1)
+        if not chunk.isascii():
+            self._continuations.extend(base + index for index, byte in enumerate(chunk) if byte & 0xC0 == 0x80)
+        self._size += len(chunk)
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self._line_starts, offset)
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Return the ``(line, column)`` of *offset*."""
+
+        line = self.line(offset)
+        start = self._line_starts[line - 1]
+        continuations = self._continuations
+        if continuations:
+            skipped = bisect_left(continuations, offset) - bisect_left(continuations, start)
+        else:
+            skipped = 0
+        return line, offset - start - skipped + 1
+
+
+class PushScanner:
+    """Resumable scanner: :meth:`feed` it chunks, :meth:`close` it at the end.
+
+    Each call returns the tokens completed so far, the same tokens
+    :class:`~lexical.scanner.RegexScanner` finds in the whole source. A
+    lexeme that reaches the end of the data fed so far waits for the next
+    chunk, so the scanner only holds the unscanned tail, plus whether that
+    tail starts inside a comment. Offsets count from the start of the
+    stream.
+    """
+
+    def __init__(self):
+        self.source_map = StreamingSourceMap()
+        self.closed = False
+        self._buffer = bytearray()
+        # Stream offset of _buffer[0].
+        self._base = 0
+        self._in_comment = False
+
+    def feed(self, chunk) -> List[Token]:
+        tokens = []
+        self.feed_to(chunk, tokens.append)
+        return tokens
+
+    def close(self) -> List[Token]:
+        tokens = []
+        self.close_to(tokens.append)
+        return tokens
+
+    def feed_to(self, chunk, emit: Callable[[Token], object]) -> None:
+        """Like :meth:`feed`, but hand each token to *emit* as soon as it is complete."""
+
+        if self.closed:
+            raise ValueError("feed() after close()")
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        self.source_map.feed(chunk)
+        self._buffer += chunk
+        self._drain(False, emit)
+
+    def close_to(self, emit: Callable[[Token], object]) -> None:
+        self.closed = True
+        self._drain(True, emit)
+
+    def _drain(self, final: bool, append) -> None:
+        # RegexScanner._scan over the buffer, stopping instead at anything
+        # the next chunk could still change.
+        text = self._buffer
+        size = len(text)
+        base = self._base
+        source_map = self.source_map
+        match = RegexScanner._TOKEN_RE.match
+        operators = RegexScanner._OPERATORS
+        keywords = Scanner.KEYWORDS
+        pos = 0
+        if self._in_comment:
+            newline = text.find(b"\n")
+            if newline == -1:
+                pos = size
+            else:
+                pos = newline
+                self._in_comment = False
+        while pos < size:
+            m = match(text, pos, size)
+            kind = m.lastgroup
+            start, end = m.span(kind)
+            if kind == "skip":
+                if not final:
+                    line_start = max(text.rfind(b"\n", pos, size) + 1, pos)
+                    self._in_comment = text.find(b"#", line_start, size) != -1
+                pos = size
+                break
+            if end == size and not final:
+                pos = start
+                break
+            if kind == "operator":
+                token_type, lexeme = operators[bytes(text[start:end])]
+                append(Token(token_type, lexeme, base + start, end - start, source_map))
+                pos = end
+                continue
+            if kind == "other" and text[start] < 0x80:
+                append(Token(TokenType.ERROR, chr(text[start]), base + start, 1, source_map))
+                pos = end
+                continue
+            if end == size and kind != "other":
+                # Like the other engines, a lexeme cut off by the end of the
+                # source is dropped.
+                pos = size
+                break
+            delimiter = text[end] if end < size else 0
+            if kind == "string":
+                pos = end + 1
+                if delimiter == 0x22:
+                    value = text[start + 1:end].decode("utf-8")
+                    append(Token(TokenType.STRING, value, base + start, end + 1 - start, source_map))
+                else:
+                    append(Token(TokenType.ERROR, "string não fechada", base + start, end - start, source_map))
+                continue
+            if kind == "other" or delimiter > 0x7F:
+                # Non-ASCII goes through the character engine, as in
+                # RegexScanner; none of its lexemes runs past a newline.
+                line_end = text.find(b"\n", start)
+                if line_end == -1:
+                    if not final:
+                        pos = start
+                        break
+                    line_end = size
+                piece = bytes(text[start:line_end + 1])
+                scanner = Scanner.from_source(piece, source_map=source_map)
+                token = scanner.next_token()
+                if token is None:
+                    pos = start + len(piece)
+                    continue
+                token.offset += base + start
+                append(token)
+                pos = start + scanner.pos
+                continue
+            lexeme = text[start:end].decode("ascii")
+            if kind == "word":
+                token_type = TokenType.RESERVED if lexeme in keywords else TokenType.IDENTIFIER
+            elif lexeme[-1] == ".":
+                pos = end + 1
+                append(Token(TokenType.ERROR, lexeme, base + start, end - start, source_map))
+                continue
+            elif "." in lexeme:
+                token_type = TokenType.NUMREAL
+            else:
+                token_type = TokenType.NUMINT
+            append(Token(token_type, lexeme, base + start, end - start, source_map))
+            pos = end
+        del text[:pos]
+        self._base = base + pos
+
+
+class PushParser:
+    """Parses a source as it arrives, reporting syntax errors as soon as they are found.
+
+    Tokens from a :class:`PushScanner` are sent one by one into the LL(1)
+    engine's driver, which keeps its parse stack between chunks (the
+    recursive-descent engine pulls its tokens and cannot be resumed).
+    :meth:`feed` and :meth:`close` return the errors found in that step;
+    :attr:`errors` has them all. Without a tree, memory stays bounded by
+    the unscanned tail and the parse stack.
+    """
+
+    def __init__(self, build_tree: bool = False, sink: Optional[NullSink] = None):
+        self.scanner = PushScanner()
+        self._parser = LL1Parser(self.scanner, build_tree=build_tree, sink=sink)
+        self._driver = self._parser._drive()
+        next(self._driver)
+        self.done = False
+
+    @property
+    def errors(self) -> List[str]:
+        return self._parser.errors
+
+    @property
+    def root(self) -> Optional[SyntaxNode]:
+        return self._parser.root
+
+    def feed(self, chunk) -> List[str]:
+        return self._run(self.scanner.feed_to, chunk)
+
+    def close(self) -> List[str]:
+        return self._run(self._finish)
+
+    def _finish(self, send) -> None:
+        self.scanner.close_to(send)
+        # None tells the driver the source has ended.
+        send(None)
+
+    def _run(self, step, *args) -> List[str]:
+        # Tokens go straight from the scanner into the driver, so no list
+        # of a chunk's tokens is ever built.
+        errors = self._parser.errors
+        before = len(errors)
+        if not self.done:
+            try:
+                step(*args, self._driver.send)
+            except StopIteration:
+                # The program is complete; anything after 'main { ... }'
+                # was reported by the driver as it finished.
+                self.done = True
+        return errors[before:]
+
+
+async def parse_stream(
+    reader: asyncio.StreamReader,
+    build_tree: bool = False,
+    sink: Optional[NullSink] = None,
+    on_error: Optional[Callable[[str], None]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> PushParser:
+    """Parse everything *reader* delivers until EOF; *on_error* sees each error as it is found."""
+
+    parser = PushParser(build_tree=build_tree, sink=sink)
+    while True:
+        chunk = await reader.read(chunk_size)
+        errors = parser.feed(chunk) if chunk else parser.close()
+        if on_error is not None:
+            for error in errors:
+                on_error(error)
+        if not chunk:
+            return parser
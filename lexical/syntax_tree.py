@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import gc
+import io
+import json
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import BinaryIO, Iterator, List, Optional, TextIO
 
-from lexical.token import Token
+from lexical.token import Token, TokenType
 
 
 @dataclass
@@ -21,38 +25,357 @@ class SyntaxNode:
             self.children.append(child)
 
 
+class _DiscardedNode:
+    """Stand-in returned by a parser that does not build a tree."""
+
+    __slots__ = ()
+
+    label = None
+    children = ()
+    token = None
+
+    def add_child(self, child: Optional["SyntaxNode"]) -> None:
+        pass
+
+
+DISCARDED_NODE = _DiscardedNode()
+
+
+EXPORT_FORMATS = ("dot", "jsonl", "bin")
+
+_BINARY_MAGIC = b"MCST\x01"
+_CHUNK_PIECES = 4096
+
+
 def _escape(value: str) -> str:
     return value.replace("\\", "\\\\").replace("\"", "\\\"")
 
 
-def syntax_tree_to_dot(root: SyntaxNode) -> str:
-    """Create a Graphviz DOT representation of the syntax tree."""
+def iter_syntax_tree(
+    root: SyntaxNode,
+    collapse_chains: bool = False,
+    max_depth: Optional[int] = None,
+) -> Iterator[tuple]:
+    """Walk *root* iteratively in pre-order.
+
+    Yields ``(node_id, parent_id, label, token, child_count)`` when a node is
+    entered and ``(node_id, parent_id)`` once its subtree is done; the root's
+    parent is ``None``. With *collapse_chains*, a token-less node with a
+    single child is merged with it and the labels are joined with ``" / "``.
+    Nodes at *max_depth* are emitted without children, their label suffixed
+    with ``" …"``.
+    """
 
-    lines: List[str] = ["digraph SyntaxTree {", "    node [shape=box];"]
-    counter = 0
+    def resolve(node, depth):
+        children = node.children
+        if collapse_chains and len(children) == 1 and node.token is None:
+            labels = [node.label]
+            while len(children) == 1 and node.token is None:
+                node = children[0]
+                labels.append(node.label)
+                children = node.children
+            label = " / ".join(labels)
+        else:
+            label = node.label
+        if max_depth is not None and depth >= max_depth and children:
+            return f"{label} …", node.token, ()
+        return label, node.token, children
 
-    def visit(node: SyntaxNode) -> str:
-        nonlocal counter
-        node_id = f"n{counter}"
+    plain = not collapse_chains and max_depth is None
+    if plain:
+        label, token, children = root.label, root.token, root.children
+    else:
+        label, token, children = resolve(root, 0)
+    yield 0, None, label, token, len(children)
+    counter = 1
+    stack = [(0, None, iter(children))]
+    while stack:
+        node_id, parent_id, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield node_id, parent_id
+            continue
+        if plain:
+            label, token, grandchildren = child.label, child.token, child.children
+        else:
+            label, token, grandchildren = resolve(child, len(stack))
+        yield counter, node_id, label, token, len(grandchildren)
+        stack.append((counter, node_id, iter(grandchildren)))
         counter += 1
-        label_parts = [node.label]
-        if node.token is not None and node.token.value is not None:
-            label_parts.append(str(node.token.value))
-        label = "\\n".join(label_parts)
-        lines.append(f'    {node_id} [label="{_escape(label)}"];')
-        for child in node.children:
-            child_id = visit(child)
-            lines.append(f"    {node_id} -> {child_id};")
-        return node_id
-
-    visit(root)
-    lines.append("}")
-    return "\n".join(lines)
-
-
-def export_syntax_tree(root: SyntaxNode, filepath: str) -> None:
-    """Persist the DOT representation of *root* into *filepath*."""
-
-    dot_source = syntax_tree_to_dot(root)
-    with open(filepath, "w", encoding="utf-8") as dot_file:
-        dot_file.write(dot_source)
+
+
+class _ChunkedWriter:
+    """Collect small pieces and hand them to *stream* in large chunks."""
+
+    def __init__(self, stream, pieces: int = _CHUNK_PIECES):
+        self.stream = stream
+        self.pieces = pieces
+        self.pending = []
+
+    def write(self, piece) -> None:
+        pending = self.pending
+        pending.append(piece)
+        if len(pending) >= self.pieces:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.stream.write(self.pending[0][:0].join(self.pending))
+            self.pending.clear()
+
+
+def write_dot(root: SyntaxNode, stream: TextIO, **options) -> None:
+    """Stream the Graphviz DOT representation of *root* into *stream*."""
+
+    writer = _ChunkedWriter(stream)
+    pending = writer.pending
+    limit = writer.pieces
+    labels = {}
+    pending.append("digraph SyntaxTree {\n    node [shape=box];")
+    for event in iter_syntax_tree(root, **options):
+        if len(event) == 2:
+            if event[1] is not None:
+                pending.append(f"\n    n{event[1]} -> n{event[0]};")
+            continue
+        node_id, _, label, token, _ = event
+        escaped = labels.get(label)
+        if escaped is None:
+            escaped = labels[label] = _escape(label)
+        if token is not None and token.value is not None:
+            value = str(token.value)
+            if "\\" in value or '"' in value:
+                value = _escape(value)
+            pending.append(f'\n    n{node_id} [label="{escaped}\\\\n{value}"];')
+        else:
+            pending.append(f'\n    n{node_id} [label="{escaped}"];')
+        if len(pending) >= limit:
+            writer.flush()
+    pending.append("\n}")
+    writer.flush()
+
+
+def write_jsonl(root: SyntaxNode, stream: TextIO, **options) -> None:
+    """Stream *root* as one JSON object per node, in pre-order."""
+
+    writer = _ChunkedWriter(stream)
+    write = writer.write
+    labels = {}
+    for event in iter_syntax_tree(root, **options):
+        if len(event) == 2:
+            continue
+        node_id, parent_id, label, token, child_count = event
+        encoded = labels.get(label)
+        if encoded is None:
+            encoded = labels[label] = json.dumps(label, ensure_ascii=False)
+        parent = "null" if parent_id is None else parent_id
+        if token is None:
+            write(f'{{"id": {node_id}, "parent": {parent}, "label": {encoded}, "children": {child_count}}}\n')
+            continue
+        write(
+            f'{{"id": {node_id}, "parent": {parent}, "label": {encoded}, "children": {child_count}, '
+            f'"token": {{"type": "{token.type.name}", "value": {json.dumps(token.value, ensure_ascii=False)}, '
+            f'"offset": {json.dumps(token.offset)}, "length": {json.dumps(token.length)}}}}}\n'
+        )
+    writer.flush()
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def write_binary(root: SyntaxNode, stream: BinaryIO, **options) -> None:
+    """Stream *root* in the compact binary format read by :func:`read_binary`.
+
+    Nodes are written in pre-order as varints: label id (a new id is
+    followed by the label text), child count, then the token type (0 when
+    there is no token) followed by offset + 1, length + 1 and the value.
+    """
+
+    writer = _ChunkedWriter(stream)
+    write = writer.write
+    write(_BINARY_MAGIC)
+    label_ids = {}
+    for event in iter_syntax_tree(root, **options):
+        if len(event) == 2:
+            continue
+        _, _, label, token, child_count = event
+        label_id = label_ids.get(label)
+        if label_id is None:
+            label_id = label_ids[label] = len(label_ids)
+            encoded = label.encode("utf-8")
+            write(_varint(label_id) + _varint(len(encoded)) + encoded)
+        else:
+            write(_varint(label_id))
+        if token is None:
+            write(_varint(child_count) + b"\x00")
+            continue
+        value = token.value.encode("utf-8")
+        write(
+            _varint(child_count)
+            + _varint(int(token.type))
+            + _varint(0 if token.offset is None else token.offset + 1)
+            + _varint(0 if token.length is None else token.length + 1)
+            + _varint(len(value))
+            + value
+        )
+    writer.flush()
+
+
+def _varint_at(data: bytes, pos: int, first: int) -> tuple:
+    # Continue a varint whose first byte (already read) is >= 0x80.
+    result = first & 0x7F
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+_TOKEN_TYPES = {int(token_type): token_type for token_type in TokenType}
+
+
+@contextmanager
+def _gc_paused():
+    # The rebuilt tree has no reference cycles; letting the collector walk
+    # it over and over while millions of nodes are allocated only costs time.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_binary(data: bytes, source_map=None) -> SyntaxNode:
+    """Rebuild a :class:`SyntaxNode` tree written by :func:`write_binary`.
+
+    Tokens get *source_map*, if given, so their line and column resolve.
+    """
+
+    with _gc_paused():
+        return _read_binary(data, source_map)
+
+
+def _read_binary(data: bytes, source_map) -> SyntaxNode:
+    if not data.startswith(_BINARY_MAGIC):
+        raise ValueError("not a binary syntax tree")
+    pos = len(_BINARY_MAGIC)
+    end = len(data)
+    token_types = _TOKEN_TYPES
+    labels: List[str] = []
+    values = {}
+    root = None
+    # Single-byte varints are decoded inline; longer ones go to _varint_at.
+    stack = []
+    siblings = None
+    remaining = 0
+    try:
+        while pos < end:
+            label_id = data[pos]
+            pos += 1
+            if label_id >= 0x80:
+                label_id, pos = _varint_at(data, pos, label_id)
+            if label_id == len(labels):
+                size = data[pos]
+                pos += 1
+                if size >= 0x80:
+                    size, pos = _varint_at(data, pos, size)
+                labels.append(data[pos:pos + size].decode("utf-8"))
+                pos += size
+            child_count = data[pos]
+            pos += 1
+            if child_count >= 0x80:
+                child_count, pos = _varint_at(data, pos, child_count)
+            token_type = data[pos]
+            pos += 1
+            token = None
+            if token_type:
+                if token_type >= 0x80:
+                    token_type, pos = _varint_at(data, pos, token_type)
+                offset = data[pos]
+                pos += 1
+                if offset >= 0x80:
+                    offset, pos = _varint_at(data, pos, offset)
+                length = data[pos]
+                pos += 1
+                if length >= 0x80:
+                    length, pos = _varint_at(data, pos, length)
+                size = data[pos]
+                pos += 1
+                if size >= 0x80:
+                    size, pos = _varint_at(data, pos, size)
+                raw = data[pos:pos + size]
+                pos += size
+                value = values.get(raw)
+                if value is None:
+                    value = values[raw] = raw.decode("utf-8")
+                token = Token(
+                    token_types[token_type],
+                    value,
+                    offset - 1 if offset else None,
+                    length - 1 if length else None,
+                    source_map,
+                )
+            node = SyntaxNode(labels[label_id], [], token)
+            if siblings is None:
+                if root is not None:
+                    raise ValueError("trailing data after binary syntax tree")
+                root = node
+            else:
+                siblings.append(node)
+                remaining -= 1
+                while remaining == 0 and stack:
+                    siblings, remaining = stack.pop()
+                if remaining == 0:
+                    siblings = None
+            if child_count:
+                if siblings is not None:
+                    stack.append((siblings, remaining))
+                siblings = node.children
+                remaining = child_count
+    except IndexError:
+        raise ValueError("truncated binary syntax tree") from None
+    if root is None or siblings is not None or pos > end:
+        raise ValueError("truncated binary syntax tree")
+    return root
+
+
+_WRITERS = {
+    "dot": write_dot,
+    "jsonl": write_jsonl,
+    "bin": write_binary,
+}
+
+
+def syntax_tree_to_dot(root: SyntaxNode, **options) -> str:
+    """Create a Graphviz DOT representation of the syntax tree."""
+
+    buffer = io.StringIO()
+    write_dot(root, buffer, **options)
+    return buffer.getvalue()
+
+
+def export_syntax_tree(root: SyntaxNode, filepath: str, fmt: str = "dot", **options) -> None:
+    """Stream *root* into *filepath* in one of :data:`EXPORT_FORMATS`.
+
+    *options* are passed to :func:`iter_syntax_tree` (``collapse_chains``,
+    ``max_depth``).
+    """
+
+    writer = _WRITERS[fmt]
+    if fmt == "bin":
+        with open(filepath, "wb") as tree_file:
+            writer(root, tree_file, **options)
+    else:
+        with open(filepath, "w", encoding="utf-8") as tree_file:
+            writer(root, tree_file, **options)
@@ -1,36 +1,154 @@
-class TokenType:
-    IDENTIFIER = "IDENTIFIER"
-    NUMINT = "NUMINT"
-    NUMREAL = "NUMREAL"
-    RESERVED = "RESERVED"
-    STRING = "STRING"
-    MATH_OPERATOR = "MATH_OPERATOR"
-    REL_OPERATOR = "REL_OPERATOR"
-    ASSIGNMENT = "ASSIGNMENT"
-    ASSIGN_LEFT = "ASSIGN_LEFT"
-    INCREMENT = "INCREMENT"
-    DECREMENT = "DECREMENT"
-    LPAREN = "LPAREN"
-    RPAREN = "RPAREN"
-    LBRACE = "LBRACE"
-    RBRACE = "RBRACE"
-    COLON = "COLON"
-    SEMICOLON = "SEMICOLON"
-    COMMA = "COMMA"
-    ERROR = "ERROR"
+from array import array
+from enum import IntEnum
+
+
+class TokenType(IntEnum):
+    IDENTIFIER = 1
+    NUMINT = 2
+    NUMREAL = 3
+    RESERVED = 4
+    STRING = 5
+    MATH_OPERATOR = 6
+    REL_OPERATOR = 7
+    ASSIGNMENT = 8
+    ASSIGN_LEFT = 9
+    INCREMENT = 10
+    DECREMENT = 11
+    LPAREN = 12
+    RPAREN = 13
+    LBRACE = 14
+    RBRACE = 15
+    COLON = 16
+    SEMICOLON = 17
+    COMMA = 18
+    ERROR = 19
 
 class Token:
-    def __init__(self, type_, value, line=None, column=None):
+    __slots__ = ("type", "value", "offset", "length", "source_map")
+
+    def __init__(self, type_, value, offset=None, length=None, source_map=None):
         self.type = type_
         self.value = value
-        self.line = line
-        self.column = column
+        self.offset = offset
+        self.length = length
+        self.source_map = source_map
+
+    @property
+    def line(self):
+        if self.source_map is None or self.offset is None:
+            return None
+        return self.source_map.line(self.offset)
+
+    @property
+    def column(self):
+        if self.source_map is None or self.offset is None:
+            return None
+        return self.source_map.position(self.offset)[1]
 
     def __str__(self):
-        if self.type == TokenType.ERROR and self.line is not None and self.column is not None:
-            return f"<{self.type}, {self.value}, line={self.line}, col={self.column}>"
+        if self.type == TokenType.ERROR and self.source_map is not None and self.offset is not None:
+            line, column = self.source_map.position(self.offset)
+            return f"<{self.type.name}, {self.value}, line={line}, col={column}>"
         else:
-            return f"<{self.type}, {self.value}>"
+            return f"<{self.type.name}, {self.value}>"
+
+
+class TokenBuffer:
+    """Struct-of-arrays token storage over the scanner's source buffer.
+
+    Each column is an array indexed by token position: ``'i'`` for types,
+    ``'q'`` for offsets and lengths so that sources past 2 GiB fit; line
+    and column come from *source_map* when needed. Values are sliced from
+    *source* when a :class:`Token` is materialized; only ERROR tokens, whose
+    value is a message rather than source text, keep it aside.
+    """
+
+    def __init__(self, source, source_map=None):
+        self.source = source
+        self.source_map = source_map
+        self.types = array("i")
+        self.offsets = array("q")
+        self.lengths = array("q")
+        self._error_values = {}
+        self._lexemes = {}
+
+    @classmethod
+    def from_scanner(cls, scanner) -> "TokenBuffer":
+        """Drain *scanner* into a new buffer."""
+
+        buffer = cls(scanner.source_code, scanner.source_map)
+        append = buffer.append
+        token = scanner.next_token()
+        while token is not None:
+            append(token)
+            token = scanner.next_token()
+        return buffer
+
+    def __getstate__(self):
+        # The source buffer may be a memory map; the receiver reattaches its
+        # own through ``extend``.
+        return self.types, self.offsets, self.lengths, self._error_values
+
+    def __setstate__(self, state):
+        self.types, self.offsets, self.lengths, self._error_values = state
+        self.source = None
+        self.source_map = None
+        self._lexemes = {}
+
+    def append(self, token: Token) -> None:
+        if token.type == TokenType.ERROR:
+            self._error_values[len(self.types)] = token.value
+        self.types.append(token.type)
+        self.offsets.append(token.offset)
+        self.lengths.append(token.length)
+
+    def extend(self, other: "TokenBuffer") -> None:
+        """Append the tokens of *other*, which must index the same source."""
+
+        base = len(self.types)
+        for index, value in other._error_values.items():
+            self._error_values[base + index] = value
+        self.types.extend(other.types)
+        self.offsets.extend(other.offsets)
+        self.lengths.extend(other.lengths)
+
+    def value(self, index: int) -> str:
+        token_type = self.types[index]
+        if token_type == TokenType.ERROR:
+            return self._error_values[index]
+        offset = self.offsets[index]
+        raw = self.source[offset:offset + self.lengths[index]]
+        if token_type == TokenType.STRING:
+            return raw[1:-1].decode("utf-8")
+        lexeme = self._lexemes.get(raw)
+        if lexeme is None:
+            lexeme = self._lexemes[raw] = raw.decode("utf-8")
+        return lexeme
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        return Token(
+            TokenType(self.types[index]),
+            self.value(index),
+            self.offsets[index],
+            self.lengths[index],
+            self.source_map,
+        )
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
+
 
+class TokenStream:
+    """Adapt a sequence of tokens to the scanner's ``next_token`` interface."""
 
+    def __init__(self, tokens):
+        self._tokens = iter(tokens)
 
+    def next_token(self):
+        return next(self._tokens, None)
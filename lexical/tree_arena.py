@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, List, Optional
+
+from lexical.token import Token, TokenBuffer
+
+NO_NODE = -1
+
+
+class SyntaxTreeArena:
+    """Flat storage for a syntax tree.
+
+    Nodes are rows in parallel array columns: label id (``'i'``), then
+    token index and first-child / last-child / next-sibling links
+    (``'q'``, so trees past 2**31 nodes or tokens fit). Tokens are kept in a
+    :class:`TokenBuffer`. :class:`ArenaNode` views expose the same ``label``,
+    ``children``, ``token`` and ``add_child`` API as ``SyntaxNode``.
+    """
+
+    def __init__(self, tokens: Optional[TokenBuffer] = None):
+        self.tokens = tokens
+        self.label_names: List[str] = []
+        self._label_ids: Dict[str, int] = {}
+        self.labels = array("i")
+        self.token_indexes = array("q")
+        self.first_child = array("q")
+        self.last_child = array("q")
+        self.next_sibling = array("q")
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def node(self, label: str, token: Optional[Token] = None) -> "ArenaNode":
+        """Allocate a node and return its view; the parser's node factory."""
+
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self.label_names)
+            self.label_names.append(label)
+        token_index = NO_NODE
+        if token is not None:
+            if self.tokens is None:
+                source_map = token.source_map
+                self.tokens = TokenBuffer(source_map.source, source_map)
+            token_index = len(self.tokens)
+            self.tokens.append(token)
+        index = len(self.labels)
+        self.labels.append(label_id)
+        self.token_indexes.append(token_index)
+        self.first_child.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        return ArenaNode(self, index)
+
+    def link(self, parent: int, child: int) -> None:
+        last = self.last_child[parent]
+        if last == NO_NODE:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[last] = child
+        self.last_child[parent] = child
+
+    def child_indexes(self, index: int) -> List[int]:
+        indexes = []
+        child = self.first_child[index]
+        while child != NO_NODE:
+            indexes.append(child)
+            child = self.next_sibling[child]
+        return indexes
+
+
+class ArenaNode:
+    """Lightweight view of one node stored in a :class:`SyntaxTreeArena`."""
+
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena: SyntaxTreeArena, index: int):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def label(self) -> str:
+        return self.arena.label_names[self.arena.labels[self.index]]
+
+    @property
+    def token(self) -> Optional[Token]:
+        token_index = self.arena.token_indexes[self.index]
+        if token_index == NO_NODE:
+            return None
+        return self.arena.tokens[token_index]
+
+    @property
+    def children(self) -> List["ArenaNode"]:
+        arena = self.arena
+        return [ArenaNode(arena, index) for index in arena.child_indexes(self.index)]
+
+    def add_child(self, child: Optional["ArenaNode"]) -> None:
+        """Append a child node if it is not ``None``."""
+
+        if child is not None:
+            self.arena.link(self.index, child.index)
+
+    def __repr__(self) -> str:
+        return f"ArenaNode({self.label!r}, index={self.index})"
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import sys
+from typing import Dict, Optional, TextIO
+
+from lexical.compiler import (
+    ADD,
+    COMPARE,
+    DIV,
+    DIV_INT,
+    HALT,
+    INPUT,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_TRUE,
+    LOAD_CONST,
+    LOAD_VAR,
+    MUL,
+    POST_DEC,
+    POST_INC,
+    PRINT,
+    STORE_VAR,
+    SUB,
+    TO_INT,
+    TO_REAL,
+    Bytecode,
+    divide_int,
+    truncate,
+)
+from lexical.semantic import INT, REAL
+
+
+class ExecutionError(Exception):
+    """A run-time error of a .mc program, with the line it happened on."""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+    def __str__(self) -> str:
+        if self.line is None:
+            return f"Erro de execução: {self.message}"
+        return f"[linha {self.line}] Erro de execução: {self.message}"
+
+
+def read_value(stream: TextIO, type_: str, name: str):
+    """The next line of *stream* as a value of *type_*, for ``input(name)``."""
+
+    line = stream.readline()
+    if not line:
+        raise ExecutionError(f"fim da entrada ao ler '{name}'")
+    text = line.strip()
+    try:
+        return int(text) if type_ == INT else float(text)
+    except ValueError:
+        raise ExecutionError(f"valor inválido para '{name}' ({type_}): {text!r}") from None
+
+
+def initial_value(type_: str):
+    return 0.0 if type_ == REAL else 0
+
+
+def execute(bytecode: Bytecode, stdin: TextIO | None = None, stdout: TextIO | None = None) -> Dict[str, object]:
+    """Run *bytecode*, reading ``input`` lines from *stdin*; return the final variables."""
+
+    stdin = sys.stdin if stdin is None else stdin
+    write = (sys.stdout if stdout is None else stdout).write
+    instructions = bytecode.instructions()
+    constants = bytecode.constants
+    names = bytecode.names
+    types = bytecode.types
+    variables = [initial_value(type_) for type_ in types]
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    pc = 0
+    try:
+        # Opcodes are tested roughly from the most to the least frequent.
+        while True:
+            op, arg = instructions[pc]
+            pc += 1
+            if op == LOAD_VAR:
+                push(variables[arg])
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == STORE_VAR:
+                variables[arg] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == COMPARE:
+                right = pop()
+                left = stack[-1]
+                if arg == 0:
+                    stack[-1] = left > right
+                elif arg == 1:
+                    stack[-1] = left < right
+                elif arg == 2:
+                    stack[-1] = left >= right
+                elif arg == 3:
+                    stack[-1] = left <= right
+                elif arg == 4:
+                    stack[-1] = left == right
+                else:
+                    stack[-1] = left != right
+            elif op == ADD:
+                right = pop()
+                stack[-1] += right
+            elif op == SUB:
+                right = pop()
+                stack[-1] -= right
+            elif op == MUL:
+                right = pop()
+                stack[-1] *= right
+            elif op == JUMP:
+                pc = arg
+            elif op == POST_INC:
+                value = variables[arg]
+                push(value)
+                variables[arg] = value + 1
+            elif op == POST_DEC:
+                value = variables[arg]
+                push(value)
+                variables[arg] = value - 1
+            elif op == DIV_INT:
+                right = pop()
+                stack[-1] = divide_int(stack[-1], right)
+            elif op == DIV:
+                right = pop()
+                stack[-1] /= right
+            elif op == TO_INT:
+                stack[-1] = truncate(stack[-1])
+            elif op == TO_REAL:
+                stack[-1] = float(stack[-1])
+            elif op == PRINT:
+                write(f"{pop()}\n")
+            elif op == INPUT:
+                variables[arg] = read_value(stdin, types[arg], names[arg])
+            elif op == HALT:
+                break
+            else:
+                raise ValueError(f"unknown opcode {op} at {pc - 1}")
+    except ZeroDivisionError:
+        raise ExecutionError("divisão por zero", bytecode.lines[pc - 1]) from None
+    except OverflowError:
+        raise ExecutionError("valor fora do intervalo representável", bytecode.lines[pc - 1]) from None
+    except ExecutionError as exc:
+        exc.line = bytecode.lines[pc - 1]
+        raise
+    return dict(zip(names, variables))
@@ -3,25 +3,398 @@
 # Patrick Luan Ventura Aragão - 29432294
 # Júlio Pedro Santos Monteiro - 30199115
 
+import argparse
+import json
+import os
 import sys
-from lexical.scanner import Scanner
-from lexical.parser import Parser
-from lexical.syntax_tree import export_syntax_tree
+from lexical.events import ConsoleSink, JsonLinesSink, NullSink
+from lexical.ll1 import PARSER_ENGINES
+from lexical.scanner import ENGINES
+from lexical.syntax_tree import EXPORT_FORMATS, export_syntax_tree
+
+# Everything else is imported by the option that needs it, so a plain
+# parse starts as fast as before the batch, server and VM modes existed.
+
+EVENT_SINKS = {
+    "console": ConsoleSink,
+    "jsonl": lambda: JsonLinesSink(sys.stdout),
+    "none": NullSink,
+}
 
 def main():
-    filename = sys.argv[1] if len(sys.argv) > 1 else r"programa.mc"
-    scanner = Scanner(filename)
-    parser = Parser(scanner)
-    errors = parser.parse()
+    arg_parser = argparse.ArgumentParser(description="Analisador sintático de programas .mc")
+    arg_parser.add_argument("filename", nargs="?", default=r"programa.mc")
+    arg_parser.add_argument(
+        "--lexer",
+        choices=sorted(ENGINES),
+        default="classic",
+        help="motor do analisador léxico (padrão: classic)",
+    )
+    arg_parser.add_argument(
+        "--lex-workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help="analisa o léxico em N processos (0: processo único)",
+    )
+    arg_parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        metavar="N",
+        help="analisa os comandos de nível superior em N processos (0: processo único)",
+    )
+    arg_parser.add_argument(
+        "--parser",
+        choices=sorted(PARSER_ENGINES),
+        help="motor do analisador sintático (padrão: recursive; com --stream, sempre ll1)",
+    )
+    arg_parser.add_argument(
+        "--check",
+        action="store_true",
+        help="apenas valida a sintaxe, sem construir nem exportar a árvore",
+    )
+    arg_parser.add_argument(
+        "--semantic",
+        action="store_true",
+        help="verifica também declarações e tipos durante a análise sintática",
+    )
+    arg_parser.add_argument(
+        "--run",
+        action="store_true",
+        help="compila o programa para bytecode e o executa (com --cache, reaproveita o bytecode)",
+    )
+    arg_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="analisa o arquivo em blocos à medida que é lido (sempre com o motor ll1), "
+        "mostrando os erros assim que aparecem; '-' lê da entrada padrão",
+    )
+    arg_parser.add_argument(
+        "--events",
+        choices=sorted(EVENT_SINKS),
+        default="console",
+        help="destino dos eventos de análise (padrão: console)",
+    )
+    arg_parser.add_argument(
+        "--arena",
+        action="store_true",
+        help="constrói a árvore em arrays compactos (SyntaxTreeArena)",
+    )
+    arg_parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default="dot",
+        help="formato de exportação da árvore (padrão: dot)",
+    )
+    arg_parser.add_argument("--output", help="arquivo de saída da árvore (padrão: syntax_tree.<formato>)")
+    arg_parser.add_argument(
+        "--collapse-chains",
+        action="store_true",
+        help="funde cadeias de nós com um único filho",
+    )
+    arg_parser.add_argument(
+        "--max-depth",
+        type=int,
+        metavar="N",
+        help="limita a profundidade exportada da árvore",
+    )
+    arg_parser.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="CAMINHO",
+        help="analisa em lote arquivos, diretórios (*.mc) e globs",
+    )
+    arg_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="processos do modo lote e do servidor (0: um por núcleo)",
+    )
+    arg_parser.add_argument(
+        "--output-dir",
+        default="saida",
+        help="diretório das árvores do modo lote (padrão: saida)",
+    )
+    arg_parser.add_argument(
+        "--report",
+        help="relatório JSON do modo lote (padrão: <output-dir>/relatorio.json; '-' para a saída padrão)",
+    )
+    arg_parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        help="reaproveita resultados de análises anteriores guardados em DIR",
+    )
+    arg_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="tamanho máximo do cache em MB (padrão: 256)",
+    )
+    arg_parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="atende requisições JSON-RPC pela entrada padrão ou por --socket",
+    )
+    arg_parser.add_argument("--socket", metavar="CAMINHO", help="socket Unix do servidor")
+    arg_parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="S",
+        help="tempo máximo por requisição do servidor, em segundos",
+    )
+    arg_parser.add_argument(
+        "--max-pending",
+        type=int,
+        metavar="N",
+        help="máximo de requisições simultâneas do servidor",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="perfil.json",
+        metavar="ARQUIVO",
+        help="mede regras do parser e tokens do léxico; grava JSON em ARQUIVO "
+        "(padrão: perfil.json) e pilhas para flamegraph em ARQUIVO com extensão .folded",
+    )
+    args = arg_parser.parse_args()
+    if args.stream and args.parser not in (None, "ll1"):
+        arg_parser.error("--stream usa sempre o motor ll1; não pode ser usado com --parser recursive")
+    if args.parser is None:
+        args.parser = "ll1" if args.stream else "recursive"
+    if args.profile and (args.parser != "recursive" or args.lex_workers or args.cache or args.batch or args.serve):
+        arg_parser.error("--profile requer --parser recursive, sem --lex-workers, --cache, --batch ou --serve")
+    if args.semantic and (args.parser != "recursive" or args.profile or args.cache or args.batch or args.serve):
+        arg_parser.error("--semantic requer --parser recursive, sem --profile, --cache, --batch ou --serve")
+    if args.run and (args.lex_workers or args.profile or args.batch or args.serve):
+        arg_parser.error("--run não pode ser usado com --lex-workers, --profile, --batch ou --serve")
+    if args.stream and (args.lex_workers or args.profile or args.batch or args.serve or args.run or args.cache or args.semantic or args.arena):
+        arg_parser.error("--stream não pode ser usado com --lex-workers, --profile, --batch, --serve, --run, --cache, --semantic ou --arena")
+    if args.parse_workers and (
+        args.parser != "recursive" or args.lex_workers or args.profile or args.semantic or args.cache
+        or args.arena or args.batch or args.serve or args.run or args.stream
+    ):
+        arg_parser.error(
+            "--parse-workers requer --parser recursive, sem --lex-workers, --profile, --semantic, "
+            "--cache, --arena, --batch, --serve, --run ou --stream"
+        )
+    if args.run:
+        run_program(args)
+        return
+    if args.serve:
+        if args.socket:
+            print(f"Servidor ouvindo em '{args.socket}'.", file=sys.stderr)
+        import asyncio
+        from lexical.server import serve
+
+        # Unset options keep serve()'s defaults.
+        options = {"timeout": args.timeout, "max_pending": args.max_pending}
+        options = {name: value for name, value in options.items() if value is not None}
+        asyncio.run(serve(args.socket, args.jobs or None, **options))
+        return
+    if args.batch:
+        batch(args)
+        return
+    if args.cache:
+        from lexical.cache import ParseCache
+
+        cache = ParseCache(args.cache, args.cache_size << 20)
+        result = cache.parse(
+            args.filename,
+            args.lexer,
+            args.parser,
+            build_tree=not args.check,
+            sink=EVENT_SINKS[args.events](),
+        )
+        errors, root = result.errors, result.root
+        stats = cache.stats
+        print(f"Cache: {'acerto' if result.cached else 'falha'} ({stats.hits} acertos, {stats.misses} falhas).")
+    elif args.stream:
+        parser = stream_file(args)
+        errors = parser.errors
+        root = parser.root
+    elif args.parse_workers:
+        from lexical.parallel import parallel_parse
+
+        parser = parallel_parse(
+            args.filename,
+            args.parse_workers,
+            engine=args.lexer,
+            build_tree=not args.check,
+            sink=EVENT_SINKS[args.events](),
+        )
+        errors = parser.errors
+        root = parser.root
+    elif args.profile:
+        from lexical.profiling import ProfiledParser, Profile, profiled_scanner
+        from lexical.tree_arena import SyntaxTreeArena
+
+        profile = Profile()
+        parser = ProfiledParser(
+            profiled_scanner(ENGINES[args.lexer], args.filename, profile),
+            build_tree=not args.check,
+            sink=EVENT_SINKS[args.events](),
+            arena=SyntaxTreeArena() if args.arena else None,
+            profile=profile,
+        )
+        errors = parser.parse()
+        root = parser.root
+        write_profile(profile, args.profile)
+    else:
+        if args.lex_workers:
+            from lexical.parallel import parallel_tokenize
+            from lexical.token import TokenStream
+
+            scanner = TokenStream(parallel_tokenize(args.filename, args.lex_workers, engine=args.lexer))
+        else:
+            scanner = ENGINES[args.lexer](args.filename)
+        arena = None
+        if args.arena:
+            from lexical.tree_arena import SyntaxTreeArena
+
+            arena = SyntaxTreeArena()
+        parser = _parser_class(args)(
+            scanner,
+            build_tree=not args.check,
+            sink=EVENT_SINKS[args.events](),
+            arena=arena,
+        )
+        errors = parser.parse()
+        root = parser.root
     if errors:
-        print("Erros sintáticos encontrados:")
+        # --stream has already shown them.
+        if not args.stream:
+            print("Erros encontrados:" if args.semantic else "Erros sintáticos encontrados:")
+            for e in errors:
+                print("-", e)
+        raise SystemExit(1)
+    print("Programa válido (sintaxe e tipos OK)." if args.semantic else "Programa válido (sintaxe OK).")
+    if root is not None:
+        output = args.output or f"syntax_tree.{args.format}"
+        export_syntax_tree(
+            root,
+            output,
+            args.format,
+            collapse_chains=args.collapse_chains,
+            max_depth=args.max_depth,
+        )
+        print(f"Árvore sintática exportada para '{output}'.")
+
+def _parser_class(args):
+    if args.semantic:
+        from lexical.semantic import SemanticParser
+
+        return SemanticParser
+    return PARSER_ENGINES[args.parser]
+
+def stream_file(args):
+    from lexical.stream import DEFAULT_CHUNK_SIZE, PushParser
+
+    parser = PushParser(build_tree=not args.check, sink=EVENT_SINKS[args.events]())
+
+    def report(errors):
         for e in errors:
-            print("-", e)
+            if e is parser.errors[0]:
+                print("Erros sintáticos encontrados:")
+            print("-", e, flush=True)
+
+    try:
+        source = sys.stdin.buffer if args.filename == "-" else open(args.filename, "rb")
+    except FileNotFoundError:
+        print(f"Erro: arquivo '{args.filename}' não encontrado.")
+    else:
+        with source:
+            chunk = source.read1(DEFAULT_CHUNK_SIZE)
+            while chunk:
+                report(parser.feed(chunk))
+                chunk = source.read1(DEFAULT_CHUNK_SIZE)
+    report(parser.close())
+    return parser
+
+def run_program(args):
+    from lexical.compiler import BytecodeCache, compile_tree
+    from lexical.vm import ExecutionError, execute
+
+    try:
+        with open(args.filename, "rb") as source_file:
+            source = source_file.read()
+    except FileNotFoundError:
+        print(f"Erro: arquivo '{args.filename}' não encontrado.")
+        raise SystemExit(1)
+    cache = BytecodeCache(args.cache) if args.cache else None
+    bytecode = None
+    if cache is not None:
+        key = cache.key(source, args.lexer, args.parser)
+        bytecode = cache.get(key)
+    if bytecode is None:
+        parser = _parser_class(args)(ENGINES[args.lexer].from_source(source))
+        errors = parser.parse()
+        if not errors:
+            errors, bytecode = compile_tree(parser.root)
+        if errors:
+            print("Erros encontrados:")
+            for e in errors:
+                print("-", e)
+            raise SystemExit(1)
+        if cache is not None:
+            cache.put(key, bytecode)
+    try:
+        execute(bytecode)
+    except ExecutionError as exc:
+        sys.stdout.flush()
+        print(exc, file=sys.stderr)
+        raise SystemExit(1)
+
+def write_profile(profile, path):
+    with open(path, "w", encoding="utf-8") as profile_file:
+        profile.write_json(profile_file)
+    folded = os.path.splitext(path)[0] + ".folded"
+    with open(folded, "w", encoding="utf-8") as folded_file:
+        profile.write_collapsed(folded_file)
+    print(f"Perfil gravado em '{path}' e '{folded}'.")
+    print(f"{'regra':<22} {'chamadas':>9} {'total s':>8} {'próprio s':>9} {'tokens':>8}")
+    for name, stats in list(profile.to_dict()["rules"].items())[:10]:
+        print(
+            f"{name:<22} {stats['calls']:>9} {stats['total_seconds']:>8.3f} "
+            f"{stats['self_seconds']:>9.3f} {stats['tokens']:>8}"
+        )
+
+def batch(args):
+    from lexical.batch import BatchOptions, run_batch
+
+    options = BatchOptions(
+        output_dir=args.output_dir,
+        lexer=args.lexer,
+        parser=args.parser,
+        check=args.check,
+        fmt=args.format,
+        collapse_chains=args.collapse_chains,
+        max_depth=args.max_depth,
+        cache_dir=args.cache,
+        cache_max_bytes=args.cache_size << 20,
+    )
+    report = run_batch(args.batch, options, jobs=args.jobs or None)
+    summary = report["summary"]
+    if args.report == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        report_path = args.report or os.path.join(args.output_dir, "relatorio.json")
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+        print(f"Relatório gravado em '{report_path}'.")
+    failed = summary["error"] + summary["failure"]
+    print(
+        f"{summary['files']} arquivos: {summary['ok']} válidos, {failed} com erros "
+        f"({summary['seconds']:.2f} s, {summary['jobs']} processos)."
+    )
+    if args.cache:
+        print(f"Cache: {summary['cache_hits']} acertos, {summary['cache_misses']} falhas.")
+    if failed:
         raise SystemExit(1)
-    print("Programa válido (sintaxe OK).")
-    if parser.root is not None:
-        export_syntax_tree(parser.root, "syntax_tree.dot")
-        print("Árvore sintática exportada para 'syntax_tree.dot'.")
 
 if __name__ == "__main__":
     main()
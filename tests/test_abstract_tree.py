@@ -0,0 +1,39 @@
+"""lower must build a pure abstract tree or refuse the concrete one with ValueError."""
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.abstract_tree import Node, Program, iter_nodes, lower
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+
+
+def concrete(source):
+    parser = Parser(Scanner.from_source(source))
+    return parser.parse(), parser.root
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_lower_clean(seed):
+    errors, root = concrete(generate(ProgramShape(5, 40, depth=3, seed=seed)))
+    assert errors == []
+    program = lower(root)
+    assert isinstance(program, Program)
+    assert all(isinstance(node, Node) for node in iter_nodes(program))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_lower_errors(seed):
+    errors, root = concrete(generate(ProgramShape(5, 40, depth=3, error_rate=0.1, seed=seed)))
+    assert errors
+    with pytest.raises(ValueError):
+        lower(root)
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["", "main { var { } x <- 1; }", "main { var { x: int; } }", "main { var { x: int; } if x > then { } }"],
+)
+def test_lower_broken(source):
+    with pytest.raises(ValueError):
+        lower(concrete(source)[1])
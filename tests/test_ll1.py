@@ -0,0 +1,52 @@
+"""The LL(1) engine must match the recursive-descent parser: errors, tree and events."""
+
+import random
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.events import ListSink
+from lexical.ll1 import LL1Parser
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.syntax_tree import syntax_tree_to_dot
+
+BROKEN = [
+    "",
+    "main",
+    "main { var { x: int; } }",
+    "main { var { x: int; } x <- ; }",
+    "main { var { x int; } x <- 1; }",
+    "main { var { x: int; } if x > 1 then x <- 1; else else x <- 2; }",
+    "main { var { x: int; } while x < (1 + 2 { x <- x + 1; } }",
+    "main { var { x: int; } x <- 1; } x <- 2;",
+    "main { var { x: int; } { x <- 1; ",
+]
+
+
+def parse(parser_class, source, build_tree):
+    sink = ListSink()
+    parser = parser_class(Scanner.from_source(source), build_tree=build_tree, sink=sink)
+    errors = parser.parse()
+    tree = syntax_tree_to_dot(parser.root) if parser.root is not None else None
+    events = [(event.kind, event.token and event.token.offset) for event in sink.events]
+    return errors, tree, events
+
+
+def sources():
+    rng = random.Random(10)
+    for seed in range(40):
+        shape = ProgramShape(
+            5,
+            rng.choice([1, 10, 40]),
+            depth=rng.choice([1, 3, 5]),
+            error_rate=rng.choice([0.0, 0.05, 0.3]),
+            seed=seed,
+        )
+        yield generate(shape)
+
+
+@pytest.mark.parametrize("build_tree", [True, False])
+@pytest.mark.parametrize("source", BROKEN + list(sources()))
+def test_matches_recursive_parser(source, build_tree):
+    assert parse(LL1Parser, source, build_tree) == parse(Parser, source, build_tree)
@@ -0,0 +1,73 @@
+"""parallel_parse must match the sequential Parser: errors, tree and events."""
+
+import random
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from lexical import parallel
+from lexical.events import ListSink
+from lexical.parser import Parser
+from lexical.scanner import ENGINES
+from lexical.syntax_tree import syntax_tree_to_dot
+
+DAMAGE = ["}", "{", "else x <- 1;", "", "x", "main", "; ;", "var { a: int; }"]
+
+
+def source(seed):
+    rng = random.Random(seed)
+    shape = ProgramShape(
+        5,
+        rng.choice([1, 5, 40, 200]),
+        depth=rng.choice([1, 3]),
+        error_rate=rng.choice([0.0, 0.0, 0.01, 0.1]),
+        seed=seed,
+    )
+    text = generate(shape)
+    if rng.random() < 0.3:
+        lines = text.split("\n")
+        line = rng.randrange(len(lines))
+        lines[line] = rng.choice(DAMAGE) + lines[line]
+        text = "\n".join(lines)
+    if rng.random() < 0.1:
+        text = text[: rng.randrange(len(text))]
+    return text
+
+
+def run(parse):
+    sink = ListSink()
+    parser = parse(sink)
+    tree = syntax_tree_to_dot(parser.root) if parser.root is not None else None
+    events = [(event.kind, event.token and event.token.offset) for event in sink.events]
+    return parser.errors, tree, events
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_PARSE_TOKENS", 50)
+
+
+def check(path, workers, engine, build_tree):
+    def sequential(sink):
+        parser = Parser(ENGINES[engine](path), build_tree=build_tree, sink=sink)
+        parser.parse()
+        return parser
+
+    expected = run(sequential)
+    result = run(lambda sink: parallel.parallel_parse(path, workers, engine, build_tree, sink))
+    assert result == expected
+
+
+@pytest.mark.parametrize("build_tree", [True, False])
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+@pytest.mark.parametrize("seed", range(30))
+def test_parallel_parse(tmp_path, seed, engine, build_tree):
+    path = tmp_path / "programa.mc"
+    path.write_text(source(seed), encoding="utf-8")
+    check(str(path), 1, engine, build_tree)
+
+
+def test_parallel_parse_pool(tmp_path):
+    path = tmp_path / "programa.mc"
+    path.write_text(generate(ProgramShape(5, 400, seed=7, error_rate=0.01)), encoding="utf-8")
+    check(str(path), 2, "regex", True)
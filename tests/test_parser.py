@@ -0,0 +1,120 @@
+"""The recursive-descent Parser: deep nesting without RecursionError, and fixed trees and errors.
+
+The expected DOT files in tests/golden/ come from the parser as it was
+before the explicit-stack rewrite, which still had termo, fator,
+termoRelacional, condicional, repeticao and bloco as recursive rules.
+"""
+
+import os
+
+import pytest
+
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.syntax_tree import syntax_tree_to_dot
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "golden")
+DEPTH = 5000
+HEAD = "main {\nvar { a: int; }\n"
+
+# name -> (source, expected errors); a tree is expected in GOLDEN/<name>.dot
+# unless the parser gives up on the root.
+PROGRAMS = {
+    "precedence": (
+        "main {\nvar { a: int; b: real; }\na <- 1 + 2 * 3 - 4 / (5 + a) * a++;\nb <- (a) - 1 * (2);\n}\n",
+        [],
+    ),
+    "relational": (
+        HEAD + "if NAO (a > 1 E a < 2) OU NAO a == 3 E (a != 4) then a <- 1;\n"
+        "while (a <= 2) OU a >= 9 { a <- a + 1; }\n}\n",
+        [],
+    ),
+    "nested": (
+        HEAD + 'if a > 1 then if a > 2 then { a <- 1; { print("x"); } } else while a < 3 a <- a - 1; '
+        "else { input(a); }\n{ print(a); }\n}\n",
+        [],
+    ),
+    "missing_semicolon": (
+        HEAD + "a <- 1\na <- 2;\nprint(a);\n}\n",
+        ["[linha 4, col 1] Erro sintático perto de 'a': esperado ';' ao final da atribuição"],
+    ),
+    "bad_factor": (
+        HEAD + "a <- 1 + * 2;\nif a > then a <- 1;\nwhile NAO { a <- 2; }\n}\n",
+        [
+            "[linha 3, col 10] Erro sintático perto de '*': esperado fator (número, identificador ou '(expr)')",
+            "[linha 4, col 8] Erro sintático perto de 'then': esperado fator (número, identificador ou '(expr)')",
+            "[linha 5, col 11] Erro sintático perto de '{': esperado fator (número, identificador ou '(expr)')",
+            "[linha 6, col 1] Erro sintático perto de '}': tokens após o fechamento de 'main'.",
+        ],
+    ),
+    "unclosed_paren": (
+        HEAD + "a <- (1 + (2 * 3;\nif (a > 1 then a <- 2;\nprint(a);\n}\n",
+        [
+            "[linha 3, col 17] Erro sintático perto de ';': esperado ')' após expressão",
+            "[linha 4, col 11] Erro sintático perto de 'then': esperado ')' após expressão relacional",
+        ],
+    ),
+    "dangling_else": (
+        HEAD + "else a <- 1;\nif a > 1 a <- 2; else a <- 3;\nwhile a { }\n}\n",
+        [
+            "[linha 3, col 1] Erro sintático perto de 'else': comando inválido",
+            "[linha 4, col 10] Erro sintático perto de 'a': esperado 'then' após condição do if",
+            "[linha 4, col 18] Erro sintático perto de 'else': esperado '}' ao final do programa",
+        ],
+    ),
+    "unclosed_block": (
+        HEAD + "{ a <- 1;\nif a > 1 then { while a < 2 { a <- a + 1;\n",
+        ["[EOF] Erro sintático: esperado '}' para finalizar bloco"] * 3
+        + ["[EOF] Erro sintático: esperado '}' ao final do programa"],
+    ),
+}
+
+NESTED = {
+    "parênteses": HEAD + "a <- " + "(" * DEPTH + "1" + ")" * DEPTH + ";\n}\n",
+    "blocos": HEAD + "{" * DEPTH + "a <- 1;" + "}" * DEPTH + "\n}\n",
+    "if": HEAD + "if a > 1 then " * DEPTH + "a <- 1;\n}\n",
+    "if/else": HEAD + "if a > 1 then " * DEPTH + "a <- 1;" + " else a <- 2;" * DEPTH + "\n}\n",
+    "while": HEAD + "while a > 1 " * DEPTH + "a <- 1;\n}\n",
+    "NAO": HEAD + "if " + "NAO " * DEPTH + "a > 1 then a <- 1;\n}\n",
+    "parênteses relacionais": HEAD + "if " + "(" * DEPTH + "a > 1" + ")" * DEPTH + " then a <- 1;\n}\n",
+}
+
+
+def depth(root):
+    deepest = 0
+    stack = [(root, 1)]
+    while stack:
+        node, level = stack.pop()
+        deepest = max(deepest, level)
+        stack.extend((child, level + 1) for child in node.children)
+    return deepest
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_golden(name):
+    source, expected = PROGRAMS[name]
+    parser = Parser(Scanner.from_source(source))
+    assert parser.parse() == expected
+    path = os.path.join(GOLDEN, f"{name}.dot")
+    if parser.root is None:
+        assert not os.path.exists(path)
+    else:
+        with open(path, encoding="utf-8") as golden:
+            assert syntax_tree_to_dot(parser.root) == golden.read()
+    assert Parser(Scanner.from_source(source), build_tree=False).parse() == expected
+
+
+@pytest.mark.parametrize("name", sorted(NESTED))
+def test_deep_nesting(name):
+    parser = Parser(Scanner.from_source(NESTED[name]))
+    assert parser.parse() == []
+    assert depth(parser.root) > DEPTH
+
+
+@pytest.mark.parametrize("name", sorted(NESTED))
+def test_deep_nesting_unclosed(name):
+    # Cut before the innermost statement: every level is left open.
+    source = NESTED[name]
+    source = source[: source.index("a <- 1") if "a <- 1" in source else source.index("1)")]
+    errors = Parser(Scanner.from_source(source)).parse()
+    assert errors
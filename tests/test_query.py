@@ -0,0 +1,52 @@
+"""TreeIndex.select must match recursive walks of the tree."""
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.parser import Parser
+from lexical.query import TreeIndex
+from lexical.scanner import Scanner
+
+
+def walk(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+@pytest.fixture(scope="module")
+def tree():
+    parser = Parser(Scanner.from_source(generate(ProgramShape(5, 200, depth=3, seed=3))))
+    assert parser.parse() == []
+    return parser.root, TreeIndex(parser.root)
+
+
+def identifiers(root, *names):
+    return [
+        node for node in walk(root)
+        if node.label == "IDENTIFIER" and all(node.token.value == name for name in names)
+    ]
+
+
+@pytest.mark.parametrize(
+    "names", [("v0",), ("v1",), ("v0", "v0"), ("v0", "v1"), ("v1", "v0"), ("v0", "v1", "v0"), ("nenhuma",)]
+)
+def test_identifier_filters(tree, names):
+    root, index = tree
+    selector = "IDENTIFIER" + "".join(f"[value={name}]" for name in names)
+    expected = identifiers(root, *names)
+    assert [id(node) for node in index.select(selector)] == [id(node) for node in expected]
+    assert bool(expected) == (len(set(names)) == 1 and names[0] != "nenhuma")
+
+
+def test_combined_filter_in_has(tree):
+    root, index = tree
+    assert index.select("atribuicao:has(> IDENTIFIER[value=v0][value=v1])") == []
+    expected = [
+        node for node in walk(root)
+        if node.label == "atribuicao" and node.children[0].token.value == "v0"
+    ]
+    found = index.select("atribuicao:has(> IDENTIFIER[value=v0][value=v0])")
+    assert [id(node) for node in found] == [id(node) for node in expected]
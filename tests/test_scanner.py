@@ -0,0 +1,62 @@
+"""RegexScanner must produce exactly the classic Scanner's tokens."""
+
+import random
+
+import pytest
+
+from lexical.scanner import RegexScanner, Scanner
+
+# Every operator and delimiter the classic engine knows, plus '!' alone.
+OPERATORS = ["++", "--", "<-", "<=", ">=", "==", "!=", "<", ">", "=", "+", "-", "*", "/",
+             "(", ")", "{", "}", ":", ";", ",", "!"]
+
+EDGE_CASES = [
+    "",
+    "x",
+    "main { var { x: int; } x <- 1; }\n",
+    " ".join(OPERATORS) + "\n",
+    "".join(OPERATORS) + "\n",
+    "a+++b--c<--d<=e>=f==g!=h\n",
+    '"abc\n',
+    '"abc',
+    'print("sem fim);\nx <- 1;\n',
+    '"" "a b" "#não comentário"\n',
+    "1. x\n",
+    "1.;",
+    ".5 . 3.14 42 7.\n",
+    "x # comentário no fim",
+    "x # comentário\n# outro\ny\n",
+    "#",
+    "ação <- ç1 + _x2;\n",
+    'print("olá, mundo");\n',
+    "é\n",
+    "x€y @ $ ? ~\n",
+    "x\ty\r\nz\x0bw\x0cq\n",
+    "main{var{x:int;}x<-1;}",
+]
+
+
+def tokens(engine, source):
+    scanner = engine.from_source(source)
+    result = []
+    token = scanner.next_token()
+    while token is not None:
+        result.append((token.type, token.value, token.offset, token.length, token.line, token.column))
+        token = scanner.next_token()
+    return result
+
+
+@pytest.mark.parametrize("source", EDGE_CASES)
+def test_edge_cases(source):
+    assert tokens(RegexScanner, source) == tokens(Scanner, source)
+
+
+def test_random_sources():
+    rng = random.Random(1234)
+    pieces = OPERATORS + [
+        " ", " ", "\n", "\t", "x", "var", "main", "if", "E", "ab_1", "12", "3.5", "7.", ".", "#c",
+        '"', '"txt"', "ã", "ç", "€", "@", "\r", "é1",
+    ]
+    for _ in range(500):
+        source = "".join(rng.choice(pieces) for _ in range(rng.randrange(1, 40)))
+        assert tokens(RegexScanner, source) == tokens(Scanner, source), source
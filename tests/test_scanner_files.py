@@ -0,0 +1,49 @@
+"""Scanners over files: memory maps, and inputs that cannot be mapped."""
+
+import os
+import threading
+
+import pytest
+
+from lexical.scanner import ENGINES
+
+SOURCE = 'main { var { x: int; } x <- 1; print("olá"); }\n'
+
+
+def values(scanner):
+    result = []
+    token = scanner.next_token()
+    while token is not None:
+        result.append((token.type, token.value, token.offset, token.line, token.column))
+        token = scanner.next_token()
+    return result
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_fifo(tmp_path, engine):
+    path = str(tmp_path / "programa.mc")
+    os.mkfifo(path)
+    writer = threading.Thread(target=lambda: open(path, "w", encoding="utf-8").write(SOURCE))
+    writer.start()
+    scanner = ENGINES[engine](path)
+    writer.join()
+    assert values(scanner) == values(ENGINES[engine].from_source(SOURCE))
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_empty_file(tmp_path, engine):
+    path = tmp_path / "programa.mc"
+    path.write_bytes(b"")
+    with ENGINES[engine](str(path)) as scanner:
+        assert scanner.next_token() is None
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_close(tmp_path, engine):
+    path = tmp_path / "programa.mc"
+    path.write_text(SOURCE, encoding="utf-8")
+    with ENGINES[engine](str(path)) as scanner:
+        mapping = scanner.source_code
+        assert values(scanner) == values(ENGINES[engine].from_source(SOURCE))
+    assert mapping.closed
+    scanner.close()
@@ -0,0 +1,112 @@
+"""PushScanner and PushParser must match the whole-source engines, whatever the chunking."""
+
+import asyncio
+import random
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from lexical.ll1 import LL1Parser
+from lexical.scanner import RegexScanner
+from lexical.stream import PushParser, PushScanner, parse_stream
+from lexical.syntax_tree import syntax_tree_to_dot
+from lexical.token import TokenStream
+
+# Spliced into generated programs: non-ASCII, comments, broken numbers
+# and strings, stray characters.
+EXTRA = ["ação", "é", "# comentário ç\n", '"texto ã"', "12.", ".5", "x.", "!", "@", '"aberta\n',
+         "v1é ", "ñ", "  #c", "\t", "é1", "1é"]
+
+
+def key(token):
+    return token.type, token.value, token.offset, token.length, token.line, token.column
+
+
+def whole_tokens(data):
+    scanner = RegexScanner.from_source(data)
+    tokens = []
+    token = scanner.next_token()
+    while token is not None:
+        tokens.append(token)
+        token = scanner.next_token()
+    return tokens
+
+
+def chunks(data, rng, sizes):
+    pos = 0
+    while pos < len(data):
+        size = rng.choice(sizes)
+        yield data[pos:pos + size]
+        pos += size
+
+
+def source(seed):
+    rng = random.Random(seed)
+    parts = generate(ProgramShape(6, 40, 2, 2, 0.05, seed)).split(" ")
+    for _ in range(10):
+        index = rng.randrange(len(parts))
+        parts[index] += rng.choice(EXTRA)
+    text = " ".join(parts)
+    # Sometimes a lexeme runs into the end of the source.
+    if rng.random() < 0.3:
+        text = text.rstrip("\n")
+    return text.encode("utf-8")
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_push_scanner(seed):
+    data = source(seed)
+    rng = random.Random(seed)
+    scanner = PushScanner()
+    tokens = []
+    for chunk in chunks(data, rng, [1, 2, 3, 7, 50, 500]):
+        tokens += scanner.feed(chunk)
+    tokens += scanner.close()
+    assert [key(token) for token in tokens] == [key(token) for token in whole_tokens(data)]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_push_parser(seed):
+    data = source(seed)
+    rng = random.Random(seed)
+    reference = LL1Parser(TokenStream(whole_tokens(data)))
+    reference.parse()
+    parser = PushParser(build_tree=True)
+    errors = []
+    for chunk in chunks(data, rng, [1, 5, 64, 4096]):
+        errors += parser.feed(chunk)
+    errors += parser.close()
+    assert errors == parser.errors == reference.errors
+    if reference.root is None:
+        assert parser.root is None
+    else:
+        assert syntax_tree_to_dot(parser.root) == syntax_tree_to_dot(reference.root)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_push_parser_tree(seed):
+    data = generate(ProgramShape(6, 40, seed=seed)).encode("utf-8")
+    reference = LL1Parser(TokenStream(whole_tokens(data)))
+    assert reference.parse() == []
+    parser = PushParser(build_tree=True)
+    for chunk in chunks(data, random.Random(seed), [1, 5, 64, 4096]):
+        parser.feed(chunk)
+    assert parser.close() == []
+    assert syntax_tree_to_dot(parser.root) == syntax_tree_to_dot(reference.root)
+
+
+def test_parse_stream():
+    data = source(7)
+    reference = LL1Parser(TokenStream(whole_tokens(data)), build_tree=False)
+    reference.parse()
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        seen = []
+        parser = await parse_stream(reader, on_error=seen.append, chunk_size=100)
+        return seen, parser.errors
+
+    seen, errors = asyncio.run(run())
+    assert seen == errors == reference.errors
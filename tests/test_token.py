@@ -0,0 +1,15 @@
+"""TokenBuffer columns must hold offsets and lengths past 2 GiB."""
+
+import pickle
+
+from lexical.token import Token, TokenBuffer, TokenType
+
+
+def test_token_buffer_large_offsets():
+    buffer = TokenBuffer(b"")
+    buffer.append(Token(TokenType.ERROR, "string não terminada", 3 << 30, 5 << 30))
+    copy = TokenBuffer(b"")
+    copy.extend(pickle.loads(pickle.dumps(buffer)))
+    for tokens in (buffer, copy):
+        token = tokens[0]
+        assert (token.offset, token.length, token.value) == (3 << 30, 5 << 30, "string não terminada")
@@ -0,0 +1,78 @@
+"""The bytecode VM must behave like the tree-walking interpreter."""
+
+import io
+import random
+import re
+
+import pytest
+
+from benchmarks.generator import ProgramShape, generate
+from benchmarks.vm import PROGRAMS
+from lexical.compiler import Bytecode, compile_tree
+from lexical.interpreter import TreeInterpreter
+from lexical.parser import Parser
+from lexical.scanner import Scanner
+from lexical.vm import ExecutionError, execute
+
+
+def run_both(source, stdin=""):
+    parser = Parser(Scanner.from_source(source))
+    assert parser.parse() == []
+    errors, bytecode = compile_tree(parser.root)
+    assert errors == []
+    # Through the serialized form, as the bytecode cache loads it.
+    bytecode = Bytecode.from_bytes(bytecode.to_bytes())
+    results = []
+    for run in (
+        lambda stdin, stdout: execute(bytecode, stdin, stdout),
+        lambda stdin, stdout: TreeInterpreter(parser.root, stdin, stdout).run(),
+    ):
+        stdout = io.StringIO()
+        try:
+            variables = run(io.StringIO(stdin), stdout)
+        except ExecutionError as exc:
+            variables = str(exc)
+        results.append((variables, stdout.getvalue()))
+    return results
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_benchmark_programs(name):
+    vm, tree = run_both(PROGRAMS[name].replace("{n}", "12"))
+    assert vm == tree
+
+
+def test_runtime_errors():
+    source = "main {\nvar { x: int; y: real; }\ninput(x);\ny <- 1 / x;\nprint(y);\n}\n"
+    vm, tree = run_both(source, "0\n")
+    assert vm == tree
+    assert "linha 4" in vm[0]
+    assert run_both(source, "")[0] == run_both(source, "")[1]
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_generated_programs(seed):
+    source = generate(ProgramShape(8, 60, seed=seed))
+    # Generated loop conditions need not terminate; run their bodies once.
+    source = re.sub(r"^(\s*)while (.*)$", r"\1if \2 then", source, flags=re.M)
+    rng = random.Random(seed)
+    stdin = "".join(
+        f"{rng.randint(-5, 9)}\n" if rng.random() < 0.7 else f"{rng.uniform(-5, 5):.2f}\n" for _ in range(200)
+    )
+    vm, tree = run_both(source, stdin)
+    assert repr(vm) == repr(tree)
+
+
+HUGE = "9" * 200 + ".0"
+
+
+@pytest.mark.parametrize(
+    "assignment",
+    [f"x <- {HUGE} * {HUGE}", f"x <- {HUGE} * {HUGE} - {HUGE} * {HUGE}", f"y <- {'9' * 400}"],
+)
+def test_constant_overflow(assignment):
+    # Folding gives up on these; the VM reports them with the line.
+    source = f"main {{\nvar {{ x: int; y: real; }}\nx <- 1;\n{assignment};\n}}\n"
+    vm, tree = run_both(source)
+    assert vm == tree
+    assert vm[0] == "[linha 4] Erro de execução: valor fora do intervalo representável"